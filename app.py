@@ -1,648 +1,601 @@
-from flask import Flask, render_template, request, send_file, Response
-from PIL import Image, ImageDraw, ImageFont
+from flask import Blueprint, Flask, abort, current_app, g, jsonify, render_template, request, Response
 import os
-import urllib.request
-from io import BytesIO
+import sys
 from datetime import datetime
-import random
+import time
 
-app = Flask(__name__)
+from batch import RosterError, notice_filename, read_roster, spool_upload, stream_notices_pdf, stream_notices_zip
+from disk_cache import DiskCache
+from encoders import ENCODER_PROFILES, profile_type, resolve_profile
+from jobs import JobQueue, QueueFullError
+from logo_cache import logo_cache, logo_revision
+from manifest import template_version
+from metrics import CONTENT_TYPE, SIZE_BUCKETS, MetricsRegistry
+from preview import DEFAULT_PREVIEW_DPI, PREVIEW_FORMATS, clamp_dpi, resolve_preview_format
+from render_cache import RenderCache, content_etag
+from render_modes import RENDER_MODES
+from render_pool import RenderPool, RenderPoolError, RenderTimeout
+from render_tasks import (
+    DEFAULT_TENANT, render_notice, render_notice_preview, render_notice_strips, render_pdf_letterhead,
+    render_vector_notice, warm_render_worker
+)
+from responses import client_has, file_response, file_etags, not_modified_response, notice_response
+from roster import RosterDbError, arrears_rows
+from tenants import tenant_registry
+from vector import VECTOR_FORMATS
 
-def get_logo(local_path="static/brandon_logo.png", 
-             download_url="https://placehold.co/200x100/789/fff?text=Brandon"):
+# The routes, registered on an app by create_app. Nothing imported above loads
+# Pillow: the renderer is imported by the first render, in the worker that runs it
+notices = Blueprint('notices', __name__)
+
+# Identifies the notice template and drawing code, so cached notices, which can outlive
+# the process on disk, are never served once a deploy changes how notices look
+TEMPLATE_VERSION = template_version()
+
+# Encoded notices shared by /preview and /generate, bounded by RENDER_CACHE_BYTES
+render_cache = RenderCache(max_bytes=int(os.environ.get('RENDER_CACHE_BYTES', 64 * 1024 * 1024)))
+
+# Encoded notices shared by every server process through RENDER_DISK_CACHE_DIR, bounded by
+# RENDER_DISK_CACHE_BYTES. Unset, each process only has its own render_cache
+disk_cache = (
+    DiskCache(os.environ['RENDER_DISK_CACHE_DIR'],
+              max_bytes=int(os.environ.get('RENDER_DISK_CACHE_BYTES', 1024 * 1024 * 1024)))
+    if os.environ.get('RENDER_DISK_CACHE_DIR') else None
+)
+
+# Resolution /preview renders at unless the request asks for another one
+PREVIEW_DPI = int(os.environ.get('PREVIEW_DPI', DEFAULT_PREVIEW_DPI))
+
+# Seconds browsers may reuse logos and templates before revalidating them by ETag
+STATIC_MAX_AGE = int(os.environ.get('STATIC_MAX_AGE', 3600))
+
+# SQLite roster of units, residents, rent charges and payments that /generate/arrears reads
+ROSTER_DB = os.environ.get('ROSTER_DB', 'roster.db')
+
+# Renders queued through /jobs: RENDER_WORKERS threads working through at most
+# JOB_QUEUE_SIZE waiting jobs; beyond that clients get a 429 with Retry-After.
+# At most JOB_MAX_RESULTS finished notices are kept for their clients to collect
+job_queue = JobQueue(
+    workers=int(os.environ.get('RENDER_WORKERS', os.cpu_count() or 1)),
+    max_pending=int(os.environ.get('JOB_QUEUE_SIZE', 32)),
+    max_results=int(os.environ.get('JOB_MAX_RESULTS', 128))
+)
+
+# Renders run in RENDER_PROCESSES worker processes (default: one per CPU core; 0 renders
+# in the request thread instead). Each worker is replaced after RENDER_MAX_RENDERS renders,
+# and a render taking longer than RENDER_TIMEOUT seconds is abandoned and its worker killed
+render_pool = RenderPool(
+    processes=int(os.environ.get('RENDER_PROCESSES', os.cpu_count() or 1)),
+    initializer=warm_render_worker,
+    max_renders=int(os.environ.get('RENDER_MAX_RENDERS', 500)),
+    timeout=float(os.environ.get('RENDER_TIMEOUT', 30))
+)
+
+# Request, render and cache metrics, served at /metrics in the Prometheus text format
+metrics = MetricsRegistry()
+http_requests = metrics.counter(
+    'notice_http_requests_total', 'HTTP requests by route, method and status.', ('route', 'method', 'status')
+)
+http_latency = metrics.histogram(
+    'notice_http_request_duration_seconds',
+    'Seconds to produce a response; streamed batches count only until the response starts, before any notice renders.',
+    ('route',)
+)
+pool_latency = metrics.histogram(
+    'notice_render_pool_seconds',
+    'Seconds from handing a render to the pool until its result is back, waiting for a free worker included.',
+    ('kind',)
+)
+render_latency = metrics.histogram('notice_render_seconds', 'Seconds a render worker spent drawing the page.', ('kind',))
+encode_latency = metrics.histogram(
+    'notice_encode_seconds', 'Seconds a render worker spent encoding the page (cutting strips for PDF pages).',
+    ('kind', 'profile')
+)
+output_bytes = metrics.histogram(
+    'notice_output_bytes', 'Size of encoded notices and previews.', ('kind', 'profile'), buckets=SIZE_BUCKETS
+)
+renders_in_flight = metrics.gauge('notice_renders_in_flight', 'Renders handed to the pool and not yet finished.')
+
+def loaded_cache(module, name):
     """
-    Attempts to load the logo from a local file.
-    If the file doesn't exist, downloads a placeholder from the provided URL.
+    Returns a function giving module.name, or None while nothing in this process
+    has imported module. For caches in modules that load Pillow, which the
+    serving process only imports once it renders itself.
     """
-    # Make sure the static directory exists
-    os.makedirs('static', exist_ok=True)
-    
-    if os.path.exists(local_path):
-        try:
-            return Image.open(local_path).convert("RGBA")
-        except Exception as e:
-            print(f"Error opening local logo file '{local_path}': {e}")
-    
-    try:
-        with urllib.request.urlopen(download_url) as response:
-            logo_data = response.read()
-        logo = Image.open(BytesIO(logo_data)).convert('RGBA')
-        logo.save(local_path)
-        return logo
-    except Exception as e:
-        print(f"Could not download logo from URL: {e}")
-        return None
-
-def create_rent_reminder(resident_name="Resident", unit_number="", amount_due="", due_date="1st"):
-    """
-    Creates a formal rent reminder notice styled like an A4 letter.
-    Returns the image as a BytesIO object.
-    """
-    # Approximate A4 size at 300 dpi for higher quality: 2480 x 3508 pixels
-    a4_width, a4_height = 2480, 3508
-    image = Image.new('RGB', (a4_width, a4_height), color='white')
-    draw = ImageDraw.Draw(image)
-    
-    # Scale all dimensions for higher resolution
-    scale_factor = 4  # Since we went from ~72dpi to 300dpi
-    
-    # Margins and Layout
-    margin_left   = 200 * scale_factor // 4
-    margin_right  = 200 * scale_factor // 4
-    margin_top    = 240 * scale_factor // 4
-    margin_bottom = 240 * scale_factor // 4
-    
-    # Colors
-    accent_color = (51, 102, 153)       # Parkview blue
-    light_gray   = (230, 230, 230)      # Divider lines
-    black        = (0, 0, 0)
-    
-    # Try to use professional serif fonts
-    try:
-        # For Windows/Mac common fonts
-        header_font = ImageFont.truetype("Times New Roman.ttf", 24 * scale_factor // 3)
-        subheader_font = ImageFont.truetype("Times New Roman.ttf", 16 * scale_factor // 3)
-        text_font = ImageFont.truetype("Times New Roman.ttf", 16 * scale_factor // 3)
-        footer_font = ImageFont.truetype("Times New Roman.ttf", 14 * scale_factor // 3)
-        small_font = ImageFont.truetype("Times New Roman.ttf", 12 * scale_factor // 3)
-    except IOError:
-        try:
-            # Try common Linux fonts
-            header_font = ImageFont.truetype("DejaVuSerif.ttf", 24 * scale_factor // 3)
-            subheader_font = ImageFont.truetype("DejaVuSerif.ttf", 16 * scale_factor // 3)
-            text_font = ImageFont.truetype("DejaVuSerif.ttf", 16 * scale_factor // 3)
-            footer_font = ImageFont.truetype("DejaVuSerif.ttf", 14 * scale_factor // 3)
-            small_font = ImageFont.truetype("DejaVuSerif.ttf", 12 * scale_factor // 3)
-        except IOError:
-            # Fallback to default
-            print("Warning: Preferred fonts not found, using default fonts")
-            header_font = ImageFont.load_default()
-            subheader_font = ImageFont.load_default()
-            text_font = ImageFont.load_default()
-            footer_font = ImageFont.load_default()
-            small_font = ImageFont.load_default()
-    
-    # ----------------------------
-    # 1) HEADER SECTION
-    # ----------------------------
-    header_height = 100 * scale_factor // 3
-    
-    # Create subtle letterhead with very light gray
-    draw.rectangle(
-        [(0, 0), (a4_width, header_height)],
-        fill=(248, 248, 248)  # very light gray for the header bar
+    return lambda: getattr(sys.modules.get(module), name, None)
+
+metrics.cache('render', render_cache)
+metrics.cache('letterhead', loaded_cache('letterhead', 'letterhead_cache'))
+metrics.cache('logo', logo_cache)
+metrics.cache('layout', loaded_cache('layout', 'layout_cache'))
+metrics.cache('tenant', tenant_registry)
+metrics.cache('file_etag', file_etags)
+if disk_cache is not None:
+    metrics.cache('disk', disk_cache)
+
+@metrics.collector
+def queue_metrics():
+    """
+    Job queue and render pool state, read from their counters at scrape time.
+    """
+    jobs = job_queue.stats()
+    pool = render_pool.stats()
+    return [
+        ('notice_job_queue_depth', 'gauge', 'Jobs waiting for a job worker.', [({}, jobs['queued'])]),
+        ('notice_job_queue_capacity', 'gauge', 'Waiting jobs accepted before /jobs answers 429.',
+         [({}, jobs['max_pending'])]),
+        ('notice_jobs_running', 'gauge', 'Jobs being rendered.', [({}, jobs['running'])]),
+        ('notice_jobs_total', 'counter', 'Jobs by outcome.', [
+            ({'outcome': outcome}, jobs[outcome]) for outcome in ('submitted', 'rejected', 'completed', 'failed')
+        ]),
+        ('notice_render_workers', 'gauge', 'Render worker processes by state.', [
+            ({'state': 'alive'}, pool['alive']), ({'state': 'idle'}, pool['idle'])
+        ]),
+        ('notice_render_pool_renders_total', 'counter', 'Renders completed by the pool.', [({}, pool['renders'])]),
+        ('notice_render_worker_restarts_total', 'counter', 'Render workers replaced, by reason.', [
+            ({'reason': 'recycled'}, pool['recycled']),
+            ({'reason': 'timeout'}, pool['timeouts']),
+            ({'reason': 'crash'}, pool['crashes'])
+        ]),
+        ('notice_render_pool_wait_timeouts_total', 'counter',
+         'Renders that gave up waiting for a free render worker.', [({}, pool['wait_timeouts'])]),
+    ]
+
+# What the render workers' Pillow can write, from the first worker asked; see render_capabilities
+_render_capabilities = None
+
+def render_capabilities():
+    """
+    Returns what the render workers' Pillow can write, {"webp": bool}, asking a
+    worker the first time, so the server never loads Pillow to decide which
+    format a profile or preview gets.
+    """
+    global _render_capabilities
+    if _render_capabilities is None:
+        _render_capabilities = render_pool.run(warm_render_worker)
+    return _render_capabilities
+
+def run_render(kind, output, func, *args, **kwargs):
+    """
+    Runs one of the functions in render_tasks in the render pool and returns its result,
+    recording the round trip, the worker's render and encode time and the output size.
+    kind (notice, vector, preview, pdf_letterhead or pdf_page) and output (the encoder profile,
+    vector format or preview format) label the metrics.
+    """
+    with renders_in_flight.track(), pool_latency.time(kind=kind):
+        result, timings = render_pool.run(func, *args, **kwargs)
+    render_latency.observe(timings['render'], kind=kind)
+    encode_latency.observe(timings['encode'], kind=kind, profile=output)
+    if isinstance(result, bytes):
+        output_bytes.observe(len(result), kind=kind, profile=output)
+    return result
+
+def notice_key(tenant, options, resident_name, unit_number, amount_due, due_date):
+    """
+    Returns (render cache key, issue date) of today's notice from tenant for these
+    inputs and output options. Notices are deterministic, so the key fixes their bytes.
+    The logo's revision is part of it: a notice drawn with the fallback box while the
+    logo was still downloading isn't served once the logo is there. So is
+    TEMPLATE_VERSION, for notices in the disk cache from before a deploy.
+    """
+    issue_date = datetime.now().date()
+    key = (TEMPLATE_VERSION, tenant["id"], tenant["revision"], logo_revision(tenant["branding"]["logo_path"]),
+           *options, resident_name, unit_number, amount_due, due_date, issue_date.isoformat())
+    return key, issue_date
+
+def shared_render(key, kind, output, func, *args, **kwargs):
+    """
+    Returns the notice under key from the disk cache the server processes share,
+    rendering it with run_render and storing it there only if no process has yet.
+    Without a disk cache this is just run_render.
+    """
+    data = disk_cache.get(key) if disk_cache is not None else None
+    if data is None:
+        data = run_render(kind, output, func, *args, **kwargs)
+        if disk_cache is not None:
+            disk_cache.put(key, data)
+    return data
+
+def cached_render(key, revalidate, kind, output, func, *args, **kwargs):
+    """
+    Returns (data, etag) of the notice under key in the render cache, falling back to
+    shared_render only if it isn't there. If revalidate (e.g. responses.client_has) is
+    true for its known ETag, returns (None, etag) without reading or rendering it.
+    """
+    etag = render_cache.etag(key)
+    if etag is not None and revalidate is not None and revalidate(etag):
+        return None, etag
+    data = render_cache.get(key)
+    if data is None:
+        # The encoded bytes go into the cache and out in responses as the same object
+        data = shared_render(key, kind, output, func, *args, **kwargs)
+        etag = render_cache.put(key, data)
+    return data, etag or content_etag(data)
+
+def cached_rent_reminder(tenant, resident_name="Resident", unit_number="", amount_due="", due_date=None,
+                         mode="RGB", profile=None, revalidate=None):
+    """
+    Returns (data, etag) of today's deterministic notice from tenant for these inputs
+    in the given image mode and encoder profile, rendering it only if it isn't in the
+    render cache yet. See cached_render for revalidate.
+    """
+    due_date = due_date or tenant["notice"]["default_due_date"]
+    key, issue_date = notice_key(tenant, (mode, profile), resident_name, unit_number, amount_due, due_date)
+    return cached_render(
+        key, revalidate, 'notice', resolve_profile(profile), render_notice, tenant["id"], resident_name, unit_number,
+        amount_due, due_date, issue_date=issue_date, deterministic=True, mode=mode, profile=profile
     )
-    
-    # Load/Insert Logo
-    logo = get_logo()
-    if logo:
-        # Resize logo to fit nicely in the header
-        max_logo_width, max_logo_height = 120 * scale_factor // 3, 50 * scale_factor // 3
-        logo.thumbnail((max_logo_width, max_logo_height), resample=Image.LANCZOS)
-        # Place the logo near the left margin, vertically centered in the header
-        logo_x = margin_left
-        logo_y = (header_height - logo.height) // 2
-        # Composite for handling transparency
-        logo_bg = Image.new('RGBA', logo.size, (255, 255, 255, 0))  # Transparent background
-        logo_composite = Image.alpha_composite(logo_bg, logo)
-        image.paste(logo_composite.convert('RGB'), (logo_x, logo_y), logo_composite.getchannel('A'))
-    else:
-        # Fallback if no logo
-        fallback_width, fallback_height = 120 * scale_factor // 3, 50 * scale_factor // 3
-        fallback_x = margin_left
-        fallback_y = (header_height - fallback_height) // 2
-        draw.rectangle(
-            [(fallback_x, fallback_y), (fallback_x + fallback_width, fallback_y + fallback_height)],
-            fill=accent_color
-        )
-        draw.text(
-            (fallback_x + 10, fallback_y + 10),
-            "Brandon",
-            fill='white',
-            font=subheader_font
-        )
-    
-    # Draw the main header text on the right
-    org_text = "Brandon Apartments\nQuality Living Spaces"
-    org_lines = org_text.split("\n")
-    line_y = margin_top - 30 * scale_factor // 3
-    for line in org_lines:
-        bbox = draw.textbbox((0, 0), line, font=subheader_font)
-        w, h = bbox[2] - bbox[0], bbox[3] - bbox[1]
-        draw.text(
-            (a4_width - margin_right - w, line_y),
-            line,
-            fill=black,
-            font=subheader_font
-        )
-        line_y += h + 5
-    
-    # Add a dividing line after the header
-    draw.line(
-        [(margin_left, header_height + 10 * scale_factor // 3), 
-         (a4_width - margin_right, header_height + 10 * scale_factor // 3)],
-        fill=light_gray, 
-        width=1
+
+def cached_vector_notice(tenant, resident_name="Resident", unit_number="", amount_due="", due_date=None,
+                         vector_format="pdf", revalidate=None):
+    """
+    Returns (data, etag) of today's deterministic notice from tenant for these inputs
+    as a vector PDF or SVG, drawing it only if it isn't in the render cache yet.
+    """
+    due_date = due_date or tenant["notice"]["default_due_date"]
+    key, issue_date = notice_key(
+        tenant, ('vector', vector_format), resident_name, unit_number, amount_due, due_date
     )
-    
-    # Add a large centered header text just below
-    header_str = "RENT REMINDER NOTICE"
-    bbox = draw.textbbox((0, 0), header_str, font=header_font)
-    w_header, h_header = bbox[2] - bbox[0], bbox[3] - bbox[1]
-    header_x = (a4_width - w_header) // 2
-    header_y = header_height + 60 * scale_factor // 3
-    draw.text((header_x, header_y), header_str, fill=black, font=header_font)
-    
-    # ----------------------------
-    # 2) MAIN CONTENT
-    # ----------------------------
-    # Start main content below header
-    content_start_y = header_y + h_header + 30 * scale_factor // 3
-    
-    # Add a reference number and date at the top right of content area
-    current_date = datetime.now().strftime("%d/%m/%Y")
-    ref_num = f"RN/{random.randint(1000, 9999)}/{datetime.now().year}"
-    
-    date_text = f"Date: {current_date}"
-    ref_text = f"Reference: {ref_num}"
-    
-    # Position these elements on the right side
-    bbox = draw.textbbox((0, 0), date_text, font=text_font)
-    date_w = bbox[2] - bbox[0]
-    draw.text(
-        (a4_width - margin_right - date_w, content_start_y),
-        date_text,
-        fill=black,
-        font=text_font
+    return cached_render(
+        key, revalidate, 'vector', vector_format, render_vector_notice, tenant["id"], resident_name, unit_number,
+        amount_due, due_date, issue_date=issue_date, deterministic=True, vector_format=vector_format
     )
-    
-    bbox = draw.textbbox((0, 0), ref_text, font=text_font)
-    ref_w = bbox[2] - bbox[0]
-    ref_h = bbox[3] - bbox[1]
-    draw.text(
-        (a4_width - margin_right - ref_w, content_start_y + ref_h + 10),
-        ref_text,
-        fill=black,
-        font=text_font
+
+def cached_preview(tenant, resident_name="Resident", unit_number="", amount_due="", due_date=None,
+                   dpi=PREVIEW_DPI, image_format=None, revalidate=None):
+    """
+    Returns (data, etag) of a screen-resolution WebP/JPEG preview of today's notice from
+    tenant (image_format: webp or jpeg, as resolve_preview_format picks by default).
+    The page is laid out at print resolution and scaled down, so it matches the download.
+    """
+    due_date = due_date or tenant["notice"]["default_due_date"]
+    image_format = resolve_preview_format(image_format, webp=render_capabilities()['webp'])
+    key, issue_date = notice_key(
+        tenant, ('preview', dpi, image_format), resident_name, unit_number, amount_due, due_date
     )
+    return cached_render(
+        key, revalidate, 'preview', image_format, render_notice_preview, tenant["id"], resident_name, unit_number,
+        amount_due, due_date, issue_date, dpi, image_format
+    )
+
+def request_tenant(tenant_id=None):
+    """
+    Returns the profile of the tenant a request is for: the one named in the URL,
+    or the app's default tenant for the routes without a tenant prefix.
+    Unknown tenants abort the request with a 404.
+    """
+    tenant = tenant_registry.get(tenant_id or current_app.config['DEFAULT_TENANT'])
+    if tenant is None:
+        abort(Response(f"Unknown tenant {tenant_id!r}.", status=404, mimetype='text/plain'))
+    return tenant
+
+def notice_fields(tenant):
+    """
+    Returns (resident_name, unit_number, amount_due, due_date) from the request form,
+    or from the query string of a GET. The unit may also be sent as room_number;
+    the due date defaults to the tenant's.
+    """
+    return (
+        request.values.get('resident_name', 'Resident'),
+        request.values.get('unit_number', request.values.get('room_number', '')),
+        request.values.get('amount_due', ''),
+        request.values.get('due_date', tenant['notice']['default_due_date'])
+    )
+
+def output_options():
+    """
+    Returns (mode, profile) from the request: the image mode (RGB by default, or L / P / 1
+    for smaller files) and the encoder profile (print, fast, archive or email).
+    Unknown values abort the request with a 400.
+    """
+    mode = request.values.get('mode', 'RGB')
+    if mode not in RENDER_MODES:
+        abort(Response(f"Unknown mode; use one of {', '.join(RENDER_MODES)}.", status=400, mimetype='text/plain'))
     
-    # Address block on left
-    address_start_y = content_start_y + 40 * scale_factor // 3
-    
-    address_lines = [
-        "Brandon Apartments",
-        "123 Maple Avenue",
-        "P.O. Box 45678, Cityville",
-        "Tel: (555) 123-4567",
-        "Email: info@brandonapts.com"
-    ]
-    
-    for line in address_lines:
-        bbox = draw.textbbox((0, 0), line, font=text_font)
-        h_line = bbox[3] - bbox[1]
-        draw.text((margin_left, address_start_y), line, fill=black, font=text_font)
-        address_start_y += h_line + 5
-    
-    # Add some space
-    content_start_y = address_start_y + 60 * scale_factor // 3
+    profile = request.values.get('profile', 'print')
+    if profile not in ENCODER_PROFILES:
+        abort(Response(f"Unknown profile; use one of {', '.join(ENCODER_PROFILES)}.", status=400, mimetype='text/plain'))
     
-    # Resident information in a subtle box
-    if unit_number:
-        resident_info = f"Unit Number: {unit_number}"
-        if resident_name and resident_name.lower() != "resident":
-            resident_info = f"Resident: {resident_name}\n{resident_info}"
-        
-        # Draw a light box around resident info
-        bbox = draw.multiline_textbbox((0, 0), resident_info, font=text_font)
-        info_height = bbox[3] - bbox[1] + 20 * scale_factor // 3
-        info_width = a4_width - margin_left - margin_right
-        
-        draw.rectangle(
-            [(margin_left, content_start_y), 
-             (margin_left + info_width, content_start_y + info_height)],
-            fill=(248, 248, 248),  # Very light gray
-            outline=(220, 220, 220)  # Slightly darker for border
+    return mode, profile
+
+def vector_option():
+    """
+    Returns the vector format the request asks for with format (pdf or svg),
+    or None for a raster notice. Unknown values abort the request with a 400.
+    """
+    vector_format = request.values.get('format')
+    if vector_format is not None and vector_format not in VECTOR_FORMATS:
+        abort(Response(f"Unknown format; use one of {', '.join(VECTOR_FORMATS)}.", status=400, mimetype='text/plain'))
+    return vector_format
+
+@notices.app_errorhandler(RenderPoolError)
+def render_failed(e):
+    # A timeout means the workers are saturated or a render hung; the client may retry
+    if isinstance(e, RenderTimeout):
+        return Response(str(e), status=504, mimetype='text/plain', headers={'Retry-After': '5'})
+    return Response(str(e), status=500, mimetype='text/plain')
+
+@notices.before_app_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@notices.after_app_request
+def record_request(response):
+    # Labelled by URL rule rather than path, so /jobs/<job_id> is one route
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    http_requests.inc(route=route, method=request.method, status=response.status_code)
+    start = g.pop('request_start', None)
+    if start is not None:
+        http_latency.observe(time.perf_counter() - start, route=route)
+    return response
+
+@notices.route('/metrics')
+def metrics_endpoint():
+    """
+    Request counts, render and encode latency, output sizes, in-flight renders,
+    job queue depth and cache hit rates in the Prometheus text format.
+    """
+    return Response(metrics.render(), content_type=CONTENT_TYPE)
+
+@notices.route('/')
+@notices.route('/t/<tenant_id>/')
+def index(tenant_id=None):
+    tenant = request_tenant(tenant_id)
+    # The form posts back to the same tenant's routes
+    return render_template(
+        'index.html',
+        now=datetime.now(),
+        tenant=tenant,
+        page=tenant['page'],
+        base=f'/t/{tenant_id}' if tenant_id else ''
+    )
+
+@notices.route('/generate', methods=['GET', 'POST'])
+@notices.route('/t/<tenant_id>/generate', methods=['GET', 'POST'])
+def generate_reminder(tenant_id=None):
+    tenant = request_tenant(tenant_id)
+    resident_name, unit_number, amount_due, due_date = notice_fields(tenant)
+    vector_format = vector_option()
+    
+    if vector_format:
+        # format=pdf or svg: the same notice with its text kept as text, never rasterized
+        data, etag = cached_vector_notice(
+            tenant, resident_name, unit_number, amount_due, due_date, vector_format, revalidate=client_has
         )
+        mimetype, extension = VECTOR_FORMATS[vector_format]
+    else:
+        mode, profile = output_options()
         
-        # Draw the resident info text
-        draw.multiline_text(
-            (margin_left + 10 * scale_factor // 3, content_start_y + 10 * scale_factor // 3),
-            resident_info,
-            fill=black,
-            font=text_font
+        # Generate the notice image
+        data, etag = cached_rent_reminder(
+            tenant, resident_name, unit_number, amount_due, due_date, mode, profile, revalidate=client_has
         )
         
-        content_start_y += info_height + 20 * scale_factor // 3
-    
-    # Greeting
-    greeting_text = f"Dear {resident_name},"
-    draw.text((margin_left, content_start_y), greeting_text, fill=black, font=text_font)
-    bbox = draw.textbbox((0, 0), greeting_text, font=text_font)
-    g_h = bbox[3] - bbox[1]
-    content_start_y += g_h + 15 * scale_factor // 3
-    
-    # Body text - create more professional and detailed message
-    body_text = f"""This is a formal reminder that your rent payment for the current month is due by the {due_date} of this month."""
-    
-    if amount_due:
-        body_text += f" The amount due is KSH{amount_due}."
-    
-    body_text += """
-
-Please ensure your payment is submitted on time to avoid any late fee charges that may be applicable according to your lease agreement.
-
-Payment can be made through the following methods:
-• Online payment portal: www.brandonapts.com/pay
-• Direct deposit to our bank account
-• Check payment at the management office during office hours
+        # Option to download as PNG (or WebP/JPEG for the email profile), served from the cached bytes
+        mimetype, extension = profile_type(profile, webp=render_capabilities()['webp'])
+    if data is None:
+        return not_modified_response(etag)
+    return notice_response(
+        data,
+        mimetype,
+        download_name=f'rent_reminder_{resident_name.replace(" ", "_")}.{extension}',
+        etag=etag
+    )
 
-If you have already made your payment, kindly disregard this notice and provide proof of payment to the management office for our records.
-"""
-    
-    # Draw body text with proper line spacing
-    lines = body_text.split('\n')
-    for line in lines:
-        if not line:  # Empty line for paragraph break
-            content_start_y += 15 * scale_factor // 3
-            continue
-            
-        # Handle text wrapping for long lines
-        words = line.split()
-        if words:
-            current_line = words[0]
-            for word in words[1:]:
-                test_line = current_line + " " + word
-                bbox = draw.textbbox((0, 0), test_line, font=text_font)
-                test_width = bbox[2] - bbox[0]
-                
-                if test_width <= a4_width - margin_left - margin_right:
-                    current_line = test_line
-                else:
-                    # Draw current line and start a new one
-                    draw.text((margin_left, content_start_y), current_line, fill=black, font=text_font)
-                    bbox = draw.textbbox((0, 0), current_line, font=text_font)
-                    line_height = bbox[3] - bbox[1]
-                    content_start_y += line_height + 5
-                    current_line = word
-                    
-            # Draw the last line
-            draw.text((margin_left, content_start_y), current_line, fill=black, font=text_font)
-            bbox = draw.textbbox((0, 0), current_line, font=text_font)
-            line_height = bbox[3] - bbox[1]
-            content_start_y += line_height + 5
-    
-    # Closing and signature
-    content_start_y += 30 * scale_factor // 3
-    closing_text = "Thank you for your prompt attention to this matter."
-    draw.text((margin_left, content_start_y), closing_text, fill=black, font=text_font)
-    
-    # Add signature space
-    content_start_y += 80 * scale_factor // 3
-    signature_text = "Brandon Apartments Management"
-    draw.text((margin_left, content_start_y), signature_text, fill=black, font=text_font)
-    
-    # Add a manager name and title
-    content_start_y += 25 * scale_factor // 3
-    manager_text = "Bran Don\nProperty Manager"
-    draw.text((margin_left, content_start_y), manager_text, fill=black, font=small_font)
-    
-    # ----------------------------
-    # 3) FOOTER SECTION
-    # ----------------------------
-    footer_height = 50 * scale_factor // 3
-    footer_y = a4_height - footer_height - margin_bottom
-    
-    # Light gray line to separate content from footer
-    draw.line([(margin_left, footer_y), (a4_width - margin_right, footer_y)], fill=light_gray, width=1)
-    
-    # Footer text with disclaimer and reference number
-    footer_text = "This is an automated notice generated by our system. If you have questions, please contact the management office."
-    ref_str = f"Ref: PV-RR-{datetime.now().year}-{random.randint(100, 999)}"
-    
-    # Print date at bottom-left
-    bbox = draw.textbbox((0, 0), footer_text, font=footer_font)
-    footer_text_h = bbox[3] - bbox[1]
-    draw.text(
-        (margin_left, footer_y + (footer_height - footer_text_h) // 2),
-        footer_text,
-        fill=(100, 100, 100),  # Darker gray for footer text
-        font=footer_font
+@notices.route('/preview', methods=['GET', 'POST'])
+@notices.route('/t/<tenant_id>/preview', methods=['GET', 'POST'])
+def preview_reminder(tenant_id=None):
+    tenant = request_tenant(tenant_id)
+    resident_name, unit_number, amount_due, due_date = notice_fields(tenant)
+    
+    # Screen-resolution preview; dpi and format (webp or jpeg) can be overridden per request.
+    # dpi is clamped here, so out-of-range values share the cache entry of the one they render
+    dpi = clamp_dpi(request.values.get('dpi', PREVIEW_DPI, type=int))
+    image_format = resolve_preview_format(request.values.get('format'), webp=render_capabilities()['webp'])
+    data, etag = cached_preview(
+        tenant, resident_name, unit_number, amount_due, due_date, dpi, image_format, revalidate=client_has
     )
     
-    # Print reference at bottom-right
-    bbox = draw.textbbox((0, 0), ref_str, font=footer_font)
-    ref_w, ref_h = bbox[2] - bbox[0], bbox[3] - bbox[1]
-    draw.text(
-        (a4_width - margin_right - ref_w, footer_y + footer_height + 10),
-        ref_str,
-        fill=(100, 100, 100),  # Darker gray
-        font=footer_font
-    )
+    # An unchanged preview the browser already has costs only the ETag lookup
+    if data is None:
+        return not_modified_response(etag)
+    return notice_response(data, PREVIEW_FORMATS[image_format][1], etag=etag)
+
+def batch_response(tenant, rows, mode, profile):
+    """
+    Streams a notice for every row dict (resident_name, unit_number, amount_due,
+    due_date) back as a ZIP of PNGs, or as a single multi-page PDF with format=pdf.
+    Rows are read as the notices are rendered, so they can come straight from an
+    upload or a database cursor.
+    """
+    default_due_date = tenant['notice']['default_due_date']
+    # Resolved once, so the metrics label names the profile None stands for
+    profile = resolve_profile(profile)
+    
+    if request.form.get('format', request.args.get('format')) == 'pdf':
+        # One PDF for the whole batch, with the letterhead embedded once. A worker
+        # encodes it, and every page's strips are checked against its revision
+        revision, *base = run_render('pdf_letterhead', 'pdf', render_pdf_letterhead, tenant['id'])
+        
+        def render_page(index, row):
+            return run_render(
+                'pdf_page', 'pdf', render_notice_strips,
+                tenant['id'],
+                row['resident_name'] or 'Resident',
+                row['unit_number'],
+                row['amount_due'],
+                row['due_date'] or default_due_date,
+                base_revision=revision
+            )
+        
+        return Response(
+            stream_notices_pdf(rows, render_page, tuple(base)),
+            mimetype='application/pdf',
+            headers={'Content-Disposition': 'attachment; filename=rent_reminders.pdf'}
+        )
     
-    # Add a subtle watermark or background element for authenticity
-    watermark_text = "OFFICIAL NOTICE"
-    watermark_font = subheader_font
-    bbox = draw.textbbox((0, 0), watermark_text, font=watermark_font)
-    w_mark, h_mark = bbox[2] - bbox[0], bbox[3] - bbox[1]
+    _, extension = profile_type(profile, webp=render_capabilities()['webp'])
     
-    # Position at an angle in the background
-    # We'll just put it in the center, very light
-    draw.text(
-        ((a4_width - w_mark) // 2, (a4_height - h_mark) // 2),
-        watermark_text,
-        fill=(245, 245, 245),  # Very light gray
-        font=watermark_font
+    def render_row(index, row):
+        resident_name = row['resident_name'] or 'Resident'
+        due_date = row['due_date'] or default_due_date
+        # The same notice /generate would give for the row, so either can reuse the
+        # other's renders from the disk cache. Not kept in render_cache, which a
+        # large roster would flush
+        key, issue_date = notice_key(
+            tenant, (mode, profile), resident_name, row['unit_number'], row['amount_due'], due_date
+        )
+        data = shared_render(
+            key, 'notice', profile, render_notice,
+            tenant['id'],
+            resident_name,
+            row['unit_number'],
+            row['amount_due'],
+            due_date,
+            issue_date=issue_date,
+            deterministic=True,
+            mode=mode,
+            profile=profile
+        )
+        return notice_filename(index, row['resident_name'], extension), data
+    
+    return Response(
+        stream_notices_zip(rows, render_row),
+        mimetype='application/zip',
+        headers={'Content-Disposition': 'attachment; filename=rent_reminders.zip'}
     )
+
+@notices.route('/generate/batch', methods=['POST'])
+@notices.route('/t/<tenant_id>/generate/batch', methods=['POST'])
+def generate_batch(tenant_id=None):
+    """
+    Renders a notice for every row of an uploaded CSV roster and streams them back
+    as a ZIP of PNGs, or as a single multi-page PDF with format=pdf.
+    The roster may name the unit column room_number instead of unit_number.
+    The PNGs are rendered in the image mode given by mode (default RGB) and
+    encoded with the encoder profile given by profile (default print).
+    """
+    roster = request.files.get('roster')
+    if roster is None:
+        return Response("Upload a CSV roster in the 'roster' field.", status=400, mimetype='text/plain')
     
-    # Optional: Add subtle texture or noise for a more printed look
-    if random.random() > 0.5:  # 50% chance to add noise
-        # Add very slight noise to simulate paper texture
-        for _ in range(5000):
-            x = random.randint(0, a4_width - 1)
-            y = random.randint(0, a4_height - 1)
-            # Very subtle light gray dots
-            image.putpixel((x, y), (240, 240, 240))
+    tenant = request_tenant(tenant_id)
+    mode, profile = output_options()
     
-    # Save the image to a BytesIO object for direct serving
-    img_io = BytesIO()
-    image.save(img_io, 'PNG', dpi=(300, 300))
-    img_io.seek(0)
+    try:
+        rows = read_roster(spool_upload(roster.stream), aliases={'room_number': 'unit_number'})
+    except RosterError as e:
+        return Response(str(e), status=400, mimetype='text/plain')
     
-    return img_io
-
-@app.route('/')
-def index():
-    return render_template('index.html', now=datetime.now())
-
-@app.route('/generate', methods=['POST'])
-def generate_reminder():
-    resident_name = request.form.get('resident_name', 'Resident')
-    unit_number = request.form.get('unit_number', '')
-    amount_due = request.form.get('amount_due', '')
-    due_date = request.form.get('due_date', '1st')
+    return batch_response(tenant, rows, mode, profile)
+
+@notices.route('/generate/arrears', methods=['GET', 'POST'])
+@notices.route('/t/<tenant_id>/generate/arrears', methods=['GET', 'POST'])
+def generate_arrears(tenant_id=None):
+    """
+    Renders a notice for every resident of the tenant's property who still owes
+    part of this month's rent (or month=YYYY-MM's), read from the ROSTER_DB
+    roster, each for what is left to pay. Streamed back like /generate/batch,
+    with the same mode, profile and format options.
+    """
+    tenant = request_tenant(tenant_id)
+    mode, profile = output_options()
+    if not os.path.exists(ROSTER_DB):
+        return Response("No roster database; see roster.py.", status=404, mimetype='text/plain')
     
-    # Generate the notice image
-    img_io = create_rent_reminder(
-        resident_name=resident_name,
-        unit_number=unit_number,
-        amount_due=amount_due,
-        due_date=due_date
-    )
+    try:
+        rows = arrears_rows(ROSTER_DB, tenant['id'], request.values.get('month'))
+    except RosterDbError as e:
+        return Response(str(e), status=400, mimetype='text/plain')
     
-    # Option to download as PNG
-    return send_file(
-        img_io,
-        mimetype='image/png',
-        download_name=f'rent_reminder_{resident_name.replace(" ", "_")}.png',
-        as_attachment=True
-    )
+    return batch_response(tenant, rows, mode, profile)
 
-@app.route('/preview', methods=['POST'])
-def preview_reminder():
-    resident_name = request.form.get('resident_name', 'Resident')
-    unit_number = request.form.get('unit_number', '')
-    amount_due = request.form.get('amount_due', '')
-    due_date = request.form.get('due_date', '1st')
-    
-    # Generate the notice image but serve it directly for preview
-    img_io = create_rent_reminder(
-        resident_name=resident_name,
-        unit_number=unit_number,
-        amount_due=amount_due,
-        due_date=due_date
-    )
+@notices.route('/jobs', methods=['POST'])
+@notices.route('/t/<tenant_id>/jobs', methods=['POST'])
+def submit_job(tenant_id=None):
+    """
+    Queues a notice render and returns 202 with the job id straight away.
+    Takes the same fields as /generate; poll GET /jobs/<id> for the result.
+    When the queue is full, answers 429 with a Retry-After estimate.
+    """
+    tenant = request_tenant(tenant_id)
+    resident_name, unit_number, amount_due, due_date = notice_fields(tenant)
+    vector_format = vector_option()
     
-    # Return the image for display in browser
-    return Response(img_io.getvalue(), mimetype='image/png')
+    if vector_format:
+        mimetype, extension = VECTOR_FORMATS[vector_format]
+        render, options = cached_vector_notice, (vector_format,)
+    else:
+        mode, profile = output_options()
+        mimetype, extension = profile_type(profile, webp=render_capabilities()['webp'])
+        render, options = cached_rent_reminder, (mode, profile)
+    try:
+        job = job_queue.submit(
+            render, tenant, resident_name, unit_number, amount_due, due_date, *options,
+            meta={
+                'mimetype': mimetype,
+                'download_name': f'rent_reminder_{resident_name.replace(" ", "_")}.{extension}'
+            }
+        )
+    except QueueFullError as e:
+        response = jsonify(error=str(e), retry_after=e.retry_after)
+        response.status_code = 429
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+    
+    response = jsonify(dict(job.to_dict(), status_url=f'/jobs/{job.id}'))
+    response.status_code = 202
+    response.headers['Location'] = f'/jobs/{job.id}'
+    return response
+
+@notices.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """
+    Returns the job's status while it is queued or running (with a Retry-After
+    polling hint), the notice itself once it is done, or 500 if it failed.
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        response = jsonify(error="Unknown or expired job")
+        response.status_code = 404
+        return response
+    
+    if job.status == 'done':
+        data, etag = job.result
+        return notice_response(data, job.meta['mimetype'], download_name=job.meta['download_name'], etag=etag)
+    
+    response = jsonify(job.to_dict())
+    if job.status == 'failed':
+        response.status_code = 500
+    else:
+        response.headers['Retry-After'] = str(job_queue.retry_after())
+    return response
 
 # Templates directory setup
-@app.route('/templates/<path:path>')
+@notices.route('/templates/<path:path>')
 def send_template(path):
-    return send_file(f'templates/{path}')
+    return file_response(os.path.join(current_app.root_path, 'templates'), path, STATIC_MAX_AGE)
+
+# Logos and other static files, served with content ETags instead of Flask's own static route
+@notices.route('/static/<path:filename>')
+def send_static(filename):
+    return file_response(os.path.join(current_app.root_path, 'static'), filename, STATIC_MAX_AGE)
+
+def create_app(default_tenant=None):
+    """
+    Returns the web app, serving default_tenant (default: DEFAULT_TENANT) on the
+    routes without a /t/<tenant_id> prefix and every other tenant under its prefix.
+    Pages are rendered from templates/index.html, which is only ever read.
+    Raises TenantError if there is no such tenant.
+    """
+    app = Flask(__name__, static_folder=None)
+    app.config['DEFAULT_TENANT'] = default_tenant or DEFAULT_TENANT
+    # Load the default tenant (and start fetching its logo) at startup
+    tenant_registry.require(app.config['DEFAULT_TENANT'])
+    app.register_blueprint(notices)
+    return app
+
+app = create_app()
 
 if __name__ == '__main__':
-    # Create templates directory if it doesn't exist
-    os.makedirs('templates', exist_ok=True)
-    
-    # Create HTML form template
-    with open('templates/index.html', 'w') as f:
-        f.write('''
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>ResidenceReminder - Rent Notice Generator</title>
-    <style>
-        body {
-            font-family: Arial, sans-serif;
-            line-height: 1.6;
-            margin: 0;
-            padding: 20px;
-            background-color: #f5f5f5;
-            color: #333;
-        }
-        .container {
-            max-width: 800px;
-            margin: 0 auto;
-            background: white;
-            padding: 20px;
-            border-radius: 10px;
-            box-shadow: 0 0 10px rgba(0,0,0,0.1);
-        }
-        h1 {
-            color: #336699;
-            text-align: center;
-            margin-bottom: 30px;
-        }
-        .form-group {
-            margin-bottom: 15px;
-        }
-        label {
-            display: block;
-            margin-bottom: 5px;
-            font-weight: bold;
-        }
-        input[type="text"], select {
-            width: 100%;
-            padding: 8px;
-            border: 1px solid #ddd;
-            border-radius: 4px;
-            box-sizing: border-box;
-        }
-        .buttons {
-            display: flex;
-            justify-content: space-between;
-            margin-top: 20px;
-        }
-        button {
-            background-color: #336699;
-            color: white;
-            border: none;
-            padding: 10px 15px;
-            cursor: pointer;
-            border-radius: 4px;
-            font-size: 16px;
-        }
-        button:hover {
-            background-color: #264d73;
-        }
-        .preview {
-            margin-top: 30px;
-            text-align: center;
-        }
-        .preview img {
-            max-width: 100%;
-            border: 1px solid #ddd;
-            box-shadow: 0 0 5px rgba(0,0,0,0.2);
-        }
-        .preview-container {
-            display: none;
-            margin-top: 30px;
-        }
-        .logo {
-            text-align: center;
-            margin-bottom: 20px;
-        }
-        .logo img {
-            max-width: 150px;
-        }
-        footer {
-            margin-top: 40px;
-            text-align: center;
-            font-size: 14px;
-            color: #666;
-        }
-    </style>
-<link rel="apple-touch-icon" sizes="180x180" href="/apple-touch-icon.png">
-<link rel="icon" type="image/png" sizes="32x32" href="/favicon-32x32.png">
-<link rel="icon" type="image/png" sizes="16x16" href="/favicon-16x16.png">
-<link rel="manifest" href="/site.webmanifest">
-</head>
-<body>
-    <div class="container">
-        <div class="logo">
-            <img src="/static/brandon_logo.png" alt="Parkview Logo">
-        </div>
-        <h1>ResidenceReminder: Rent Notice Generator</h1>
-        
-        <form id="reminderForm">
-            <div class="form-group">
-                <label for="resident_name">Resident Name:</label>
-                <input type="text" id="resident_name" name="resident_name" placeholder="Enter resident name" value="Resident">
-            </div>
-            
-            <div class="form-group">
-                <label for="unit_number">Unit Number:</label>
-                <input type="text" id="unit_number" name="unit_number" placeholder="e.g. 204">
-            </div>
-            
-            <div class="form-group">
-                <label for="amount_due">Amount Due (KSH):</label>
-                <input type="text" id="amount_due" name="amount_due" placeholder="e.g. 11,500">
-            </div>
-            
-            <div class="form-group">
-                <label for="due_date">Due Date:</label>
-                <select id="due_date" name="due_date">
-                    <option value="1st" selected>1st</option>
-                    <option value="5th">5th</option>
-                    <option value="10th">10th</option>
-                    <option value="15th">15th</option>
-                    <option value="end of the month">End of the month</option>
-                </select>
-            </div>
-            
-            <div class="buttons">
-                <button type="button" onclick="previewReminder()">Preview Notice</button>
-                <button type="button" onclick="downloadReminder()">Download Notice</button>
-            </div>
-        </form>
-        
-        <div id="previewContainer" class="preview-container">
-            <h3>Preview:</h3>
-            <div class="preview">
-                <img id="previewImage" src="" alt="Rent Reminder Preview">
-            </div>
-        </div>
-        
-        <footer>
-            &copy; {{ now.year }} ResidenceReminder. All rights reserved.
-        </footer>
-    </div>
-    
-    <script>
-        function getFormData() {
-            return {
-                resident_name: document.getElementById('resident_name').value || 'Resident',
-                unit_number: document.getElementById('unit_number').value,
-                amount_due: document.getElementById('amount_due').value,
-                due_date: document.getElementById('due_date').value
-            };
-        }
-        
-        function previewReminder() {
-            const formData = getFormData();
-            
-            // Create form data for submission
-            const data = new FormData();
-            Object.keys(formData).forEach(key => {
-                data.append(key, formData[key]);
-            });
-            
-            // Generate a unique cache-busting parameter
-            const cacheBuster = new Date().getTime();
-            
-            // Set preview image source with form data as query params
-            const previewContainer = document.getElementById('previewContainer');
-            const previewImage = document.getElementById('previewImage');
-            
-            // Submit form to preview endpoint
-            fetch('/preview', {
-                method: 'POST',
-                body: data
-            })
-            .then(response => response.blob())
-            .then(blob => {
-                const imageUrl = URL.createObjectURL(blob);
-                previewImage.src = imageUrl;
-                previewContainer.style.display = 'block';
-                
-                // Scroll to preview
-                previewContainer.scrollIntoView({ behavior: 'smooth' });
-            })
-            .catch(error => {
-                console.error('Error generating preview:', error);
-                alert('Error generating preview. Please try again.');
-            });
-        }
-        
-        function downloadReminder() {
-            const formData = getFormData();
-            
-            // Create a hidden form for submission
-            const form = document.createElement('form');
-            form.method = 'POST';
-            form.action = '/generate';
-            form.style.display = 'none';
-            
-            // Add form fields
-            Object.keys(formData).forEach(key => {
-                const input = document.createElement('input');
-                input.type = 'hidden';
-                input.name = key;
-                input.value = formData[key];
-                form.appendChild(input);
-            });
-            
-            // Add form to document and submit
-            document.body.appendChild(form);
-            form.submit();
-            document.body.removeChild(form);
-        }
-    </script>
-</body>
-</html>
-        ''')
-    
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,213 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import csv
+import io
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+
+ROSTER_COLUMNS = ("resident_name", "unit_number", "amount_due", "due_date")
+
+# What the decoder puts in place of bytes that aren't UTF-8
+REPLACEMENT = "\ufffd"
+
+class RosterError(ValueError):
+    """
+    Raised when an uploaded roster is missing required columns.
+    """
+
+def spool_upload(stream, max_memory=1024 * 1024):
+    """
+    Copies an uploaded file into a temporary file owned by the caller.
+    Flask closes uploads when the view returns, so a streamed response
+    has to read the roster from its own copy; large rosters spill to disk.
+    """
+    spooled = tempfile.SpooledTemporaryFile(max_size=max_memory)
+    shutil.copyfileobj(stream, spooled)
+    spooled.seek(0)
+    return spooled
+
+class BadRow(dict):
+    """
+    A roster row that can't be rendered as read, with the reason in error.
+    render_in_order reports it like a failed render instead of rendering it.
+    """
+
+    def __init__(self, row, error):
+        super().__init__(row)
+        self.error = error
+
+def read_roster(stream, required=ROSTER_COLUMNS, aliases=None):
+    """
+    Returns an iterator of row dicts from a CSV roster, read lazily from a binary stream.
+    Header names are matched case-insensitively; aliases maps extra header names
+    onto the required ones (e.g. {"room_number": "unit_number"}).
+    Rows shorter than the header get '' for their missing required columns.
+    Raises RosterError if a required column is missing or the header isn't UTF-8.
+    Later rows with bytes that aren't UTF-8 (e.g. an accented name in a cp1252
+    export) come back as BadRow, so one bad row doesn't cut a streamed batch short.
+    """
+    aliases = aliases or {}
+    # Undecodable bytes become U+FFFD, so a bad row can be reported rather than
+    # raising halfway through a response that has already started
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", errors="replace", newline="")
+    reader = csv.reader(text)
+
+    try:
+        header = next(reader)
+    except StopIteration:
+        raise RosterError("The roster is empty")
+    except csv.Error as e:
+        raise RosterError(f"The roster could not be read as CSV: {e}")
+    if any(REPLACEMENT in name or "\0" in name for name in header):
+        raise RosterError("The roster isn't UTF-8 text; save it as \"CSV UTF-8\" and upload it again")
+
+    columns = []
+    for name in header:
+        name = name.strip().lower()
+        columns.append(aliases.get(name, name))
+
+    missing = [name for name in required if name not in columns]
+    if missing:
+        raise RosterError(f"The roster is missing column(s): {', '.join(missing)}")
+
+    def rows():
+        for values in reader:
+            if not any(value.strip() for value in values):
+                continue
+            row = dict.fromkeys(required, "")
+            row.update((name, value.strip()) for name, value in zip(columns, values))
+            if any(REPLACEMENT in value for value in values):
+                row = BadRow(row, "the row isn't UTF-8 text; save the roster as \"CSV UTF-8\"")
+            yield row
+
+    return rows()
+
+def notice_filename(index, resident_name, extension="png"):
+    """
+    Returns a safe, unique archive name for the notice at position index.
+    """
+    safe_name = re.sub(r"[^A-Za-z0-9_-]+", "_", resident_name or "Resident").strip("_")
+    return f"{index:05d}_rent_reminder_{safe_name or 'Resident'}.{extension}"
+
+class _ChunkWriter:
+    """
+    Write-only file object that collects what zipfile writes, so it can be yielded.
+    It has no tell() or seek(), which makes zipfile use data descriptors
+    and never go back over bytes that were already sent.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def render_in_order(rows, render, workers=None, window=None):
+    """
+    Renders rows on a thread pool and yields (index, row, result, error) in roster order.
+
+    render(index, row) is called with index counting rows from 1; a BadRow isn't
+    rendered and comes back with its error as a RosterError. At most `window`
+    rows are in flight or waiting to be consumed, so memory stays bounded however
+    many rows there are.
+    """
+    workers = workers or os.cpu_count() or 1
+    window = window or workers * 2
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        rows = iter(rows)
+        index = 0
+        exhausted = False
+
+        while pending or not exhausted:
+            # Keep the window full before waiting on the oldest notice
+            while not exhausted and len(pending) < window:
+                row = next(rows, None)
+                if row is None:
+                    exhausted = True
+                    break
+                index += 1
+                if isinstance(row, BadRow):
+                    pending.append((index, row, None))
+                else:
+                    pending.append((index, row, executor.submit(render, index, row)))
+
+            if not pending:
+                break
+
+            row_index, row, future = pending.popleft()
+            if future is None:
+                yield row_index, row, None, RosterError(row.error)
+                continue
+            try:
+                yield row_index, row, future.result(), None
+            except Exception as e:
+                yield row_index, row, None, e
+
+def stream_notices_zip(rows, render, workers=None, window=None):
+    """
+    Renders rows in parallel and yields a ZIP archive chunk by chunk as notices finish.
+
+    render(index, row) must return (filename, data).
+    Rows that fail to render are listed in errors.txt at the end of the archive.
+    """
+    writer = _ChunkWriter()
+    errors = []
+
+    with zipfile.ZipFile(writer, mode="w", compression=zipfile.ZIP_STORED) as archive:
+        for index, row, result, error in render_in_order(rows, render, workers, window):
+            if error is not None:
+                errors.append(f"Row {index} ({row.get('resident_name', '')}): {error}")
+                continue
+
+            # PNGs are already compressed, so entries are stored as-is
+            filename, data = result
+            archive.writestr(filename, data)
+            yield writer.drain()
+
+        if errors:
+            archive.writestr("errors.txt", "\n".join(errors) + "\n")
+
+    yield writer.drain()
+
+def stream_notices_pdf(rows, render, base, workers=None, window=None):
+    """
+    Renders rows in parallel and yields one multi-page PDF chunk by chunk.
+
+    render(index, row) must return the page_strips of the notice drawn over base,
+    which is embedded once and shared by every page: the letterhead image, or
+    (width, height, stream) of it encoded by png_stream. Rows that fail to render are
+    listed on pages at the end of the PDF, as errors.txt lists them in a ZIP.
+    """
+    from fonts import font_registry
+    from pdf import NoticePdf
+
+    writer = _ChunkWriter()
+    document = NoticePdf(writer, base)
+    errors = []
+
+    for index, row, strips, error in render_in_order(rows, render, workers, window):
+        if error is not None:
+            errors.append(f"Row {index} ({row.get('resident_name', '')}): {error}")
+            continue
+        document.add_strips(strips)
+        yield writer.drain()
+
+    if errors:
+        document.add_text_pages([f"{len(errors)} notice(s) could not be rendered:", ""] + errors,
+                                font_registry.get(40))
+    document.close()
+    yield writer.drain()
@@ -0,0 +1,44 @@
+"""
+Measures encode time and output size of every encoder profile, for each render mode.
+The numbers documented next to ENCODER_PROFILES in encoders.py come from this script.
+
+Usage: python benchmarks/bench_encoders.py [iterations]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from encoders import ENCODER_PROFILES, encode_notice, profile_format
+from notice import render_rent_reminder
+from render_modes import RENDER_MODES
+from tenants import tenant_registry
+
+def time_profile(image, profile, iterations):
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        data = encode_notice(image, profile)
+        timings.append(time.perf_counter() - start)
+    return sorted(timings)[len(timings) // 2], len(data)
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+
+    print(f"{'mode':<4} {'profile':<8} {'format':<6} {'median':>10} {'size':>10}")
+    for mode in RENDER_MODES:
+        image = render_rent_reminder(
+            tenant_registry.require("brandon"),
+            resident_name="Jane Doe",
+            unit_number="A-12",
+            amount_due="11,500",
+            due_date="5th",
+            texture=True,
+            deterministic=True,
+            mode=mode
+        )
+        for profile in ENCODER_PROFILES:
+            seconds, size = time_profile(image, profile, iterations)
+            print(f"{mode:<4} {profile:<8} {profile_format(profile):<6} "
+                  f"{seconds * 1000:7.0f} ms {size / 1024:7.1f} KB")
@@ -0,0 +1,52 @@
+"""
+Times an incremental batch run against a full one: renders a roster into a
+fresh directory, re-runs it unchanged, then re-runs it with 1% of the amounts
+edited, and reports each run's time as a share of the full run.
+
+Usage: python benchmarks/bench_incremental.py [residents] [workers]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# Logo paths in the renderers are relative to the project root
+os.chdir(ROOT)
+
+from rent_reminder import render_rows
+
+ISSUE_DATE = date(2025, 1, 1)
+
+def roster(count, changed=()):
+    return [
+        {"resident_name": f"Resident {i}", "unit_number": f"A-{i}",
+         "amount_due": "99,999" if i in changed else "11,500", "due_date": "5th"}
+        for i in range(count)
+    ]
+
+def timed_run(rows, output_dir, workers):
+    start = time.perf_counter()
+    # render_rows reports on stdout; only the timing is wanted here
+    with contextlib.redirect_stdout(io.StringIO()):
+        render_rows(rows, output_dir, workers, tenant_id="brandon", issue_date=ISSUE_DATE)
+    return time.perf_counter() - start
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    changed = set(range(0, count, 100))
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        full = timed_run(roster(count), output_dir, workers)
+        unchanged = timed_run(roster(count), output_dir, workers)
+        edited = timed_run(roster(count, changed), output_dir, workers)
+
+    print(f"{'run':<22} {'seconds':>9} {'of full':>8}")
+    for name, seconds in ((f"full ({count} notices)", full), ("unchanged", unchanged),
+                          (f"{len(changed)} edited", edited)):
+        print(f"{name:<22} {seconds:9.2f} {seconds / full:8.1%}")
@@ -0,0 +1,63 @@
+"""
+Compares per-notice render time with a cold letterhead (redrawn every time,
+as before the cache existed) against the cached base layer.
+
+Usage: python benchmarks/bench_letterhead.py [iterations]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from letterhead import letterhead_cache, render_letterhead
+from notice import render_rent_reminder
+from tenants import tenant_registry
+
+TENANT = tenant_registry.require("brandon")
+BRANDING = TENANT["branding"]
+
+def time_renders(iterations, cold):
+    timings = []
+    for i in range(iterations):
+        if cold:
+            letterhead_cache.clear()
+        start = time.perf_counter()
+        render_rent_reminder(
+            TENANT,
+            resident_name=f"Resident {i}",
+            unit_number=f"A-{i}",
+            amount_due="11,500",
+            due_date="5th"
+        )
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def report(label, timings):
+    timings = sorted(timings)
+    mean = sum(timings) / len(timings)
+    median = timings[len(timings) // 2]
+    print(f"{label:<22} mean {mean * 1000:8.1f} ms   median {median * 1000:8.1f} ms")
+    return mean
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    # Warm the font registry and logo cache so only the letterhead differs
+    render_rent_reminder(TENANT)
+
+    cold = report("letterhead redrawn", time_renders(iterations, cold=True))
+    warm = report("cached letterhead", time_renders(iterations, cold=False))
+    print(f"speedup: {cold / warm:.1f}x")
+
+    # The fixed layers on their own: drawing them versus copying the cached base
+    base, _ = letterhead_cache.get(BRANDING)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        render_letterhead(BRANDING)
+    draw_ms = (time.perf_counter() - start) * 1000 / iterations
+    start = time.perf_counter()
+    for _ in range(iterations):
+        base.copy()
+    copy_ms = (time.perf_counter() - start) * 1000 / iterations
+    print(f"fixed layers: drawn {draw_ms:.1f} ms, copied {copy_ms:.1f} ms ({draw_ms / copy_ms:.1f}x)")
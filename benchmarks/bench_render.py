@@ -0,0 +1,401 @@
+"""
+Benchmark suite for the notice renderer.
+
+Times each phase of a notice on its own (font loading, logo loading, header
+drawing, body wrapping over several body lengths, template compile and replay,
+paper texture, encoding, vector PDF/SVG output), then end-to-end
+create_rent_reminder throughput and peak memory for the in-memory form the web
+app uses (notice.py), its vector PDF form, and the command-line script
+(rent_reminder.py) over several resident counts. Results can be written as JSON and compared against an earlier
+run, failing when anything got slower than the tolerance allows.
+
+Throughput is timed in this process. Peak memory is measured by running the same
+notices again in a fresh process with a fixed glibc mmap threshold, as
+bench_modes.py does: otherwise the warm-up's freed page buffers are reused and
+the peak barely moves whatever a notice allocates.
+
+Usage:
+  python benchmarks/bench_render.py [--iterations N] [--residents 1,10,50]
+                                    [--body-lengths 1,4,16] [--processes N]
+                                    [--json results.json] [--compare baseline.json]
+                                    [--tolerance 0.15]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# Logo paths in the renderers are relative to the project root
+os.chdir(ROOT)
+
+import PIL
+from PIL import ImageChops
+
+import notice
+import render_tasks
+import rent_reminder
+import text_layout
+from bench_modes import peak_rss_mb, reset_peak_rss
+from encoders import ENCODER_PROFILES, encode_notice
+from fonts import font_registry
+from layout import compile_layout
+from letterhead import A4_WIDTH, SCALE_FACTOR, letterhead_cache, render_letterhead
+from logo_cache import logo_cache
+from pdf import page_strips, paste_strips
+from render_pool import RenderPool
+from tenants import tenant_registry
+from texture import apply_texture, texture_tile
+from vector import VECTOR_FORMATS
+
+ISSUE_DATE = date(2025, 1, 1)
+
+# Notices are rendered with the Brandon Apartments profile
+TENANT = tenant_registry.require("brandon")
+LOGO_PATH = TENANT["branding"]["logo_path"]
+
+# The body paragraph of a notice; longer bodies repeat it
+BODY_TEXT = """This is a formal reminder that your rent payment for the current month is due by the 5th of this month. The amount due is KSH11,500.
+
+Please ensure your payment is submitted on time to avoid any late fee charges that may be applicable according to your lease agreement.
+
+Payment can be made through the following methods:
+• Online payment portal: www.brandonapts.com/pay
+• Direct deposit to our bank account
+• Check payment at the management office during office hours
+
+If you have already made your payment, kindly disregard this notice and provide proof of payment to the management office for our records.
+"""
+
+def summarize(timings):
+    """
+    Returns timing statistics in milliseconds.
+    """
+    timings = sorted(timings)
+    return {
+        "median_ms": timings[len(timings) // 2] * 1000,
+        "mean_ms": sum(timings) / len(timings) * 1000,
+        "min_ms": timings[0] * 1000,
+        "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000,
+        "runs": len(timings),
+    }
+
+def time_calls(func, iterations, setup=None):
+    """
+    Times func() iterations times, calling setup() untimed before each run.
+    """
+    timings = []
+    for _ in range(iterations):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return summarize(timings)
+
+def logo_size():
+    # The header logo box the letterhead scales logos into
+    return 120 * SCALE_FACTOR // 3, 50 * SCALE_FACTOR // 3
+
+def bench_phases(iterations, body_lengths):
+    phases = {}
+
+    phases["font_loading"] = time_calls(
+        lambda: font_registry.notice_fonts(SCALE_FACTOR), iterations, setup=font_registry.clear
+    )
+    phases["font_loading"]["family"] = font_registry.family
+
+    phases["logo_loading"] = time_calls(
+        lambda: logo_cache.get(LOGO_PATH, logo_size()), iterations, setup=logo_cache.clear
+    )
+    phases["logo_loading"]["found"] = logo_cache.get(LOGO_PATH, logo_size()) is not None
+
+    # Every fixed layer of the page, drawn from scratch with fonts and logo already loaded
+    phases["header_drawing"] = time_calls(lambda: render_letterhead(TENANT["branding"]), iterations)
+
+    text_font = font_registry.notice_fonts(SCALE_FACTOR)[2]
+    width = A4_WIDTH - 2 * (200 * SCALE_FACTOR // 4)
+    phases["body_wrapping"] = {}
+    for length in body_lengths:
+        body = "\n".join([BODY_TEXT] * length)
+        wrap = lambda: text_layout.layout_text(body, text_font, width, paragraph_gap=15 * SCALE_FACTOR // 3)
+        phases["body_wrapping"][f"{length}x"] = {
+            "cold": time_calls(wrap, iterations, setup=text_layout._measurers.clear),
+            "cached": time_calls(wrap, iterations),
+            "lines": len(wrap()[0]),
+        }
+
+    # Compiling the notice template into draw operations, and a whole untextured
+    # notice drawn from the compiled operations over a cached letterhead
+    base, layout = letterhead_cache.get(TENANT["branding"])
+    phases["layout"] = {
+        "compile": time_calls(
+            lambda: compile_layout(notice.RENT_REMINDER_LAYOUT, TENANT, layout, base.mode), iterations
+        ),
+        "replay": time_calls(
+            lambda: notice.render_rent_reminder(TENANT, texture=False, issue_date=ISSUE_DATE, deterministic=True),
+            iterations
+        ),
+    }
+
+    page = notice.render_rent_reminder(TENANT, texture=False, issue_date=ISSUE_DATE, deterministic=True)
+    phases["noise"] = {
+        "cold": time_calls(lambda: apply_texture(page.copy(), 1), iterations, setup=texture_tile.cache_clear),
+        "cached": time_calls(lambda: apply_texture(page.copy(), 1), iterations),
+        "copy_only": time_calls(page.copy, iterations),
+    }
+
+    page = notice.render_rent_reminder(TENANT, texture=True, issue_date=ISSUE_DATE, deterministic=True)
+    phases["encoding"] = {}
+    for profile in ENCODER_PROFILES:
+        result = time_calls(lambda: encode_notice(page, profile), iterations)
+        result["bytes"] = len(encode_notice(page, profile))
+        phases["encoding"][profile] = result
+
+    # The vector path draws the same layout without rasterizing: drawing plus writing the document
+    phases["vector"] = {}
+    for vector_format in VECTOR_FORMATS:
+        create = lambda: notice.create_rent_reminder_vector(
+            TENANT, issue_date=ISSUE_DATE, deterministic=True, vector_format=vector_format
+        )
+        result = time_calls(create, iterations)
+        result["bytes"] = len(create().getvalue())
+        phases["vector"][vector_format] = result
+
+    # A batch PDF page is the shared letterhead plus strips of what each notice changed;
+    # the strips pasted back over the letterhead must give the notice exactly
+    page = notice.render_rent_reminder(
+        TENANT, resident_name="Łukasz Brzęczyszczykiewicz", texture=False, issue_date=ISSUE_DATE, deterministic=True
+    )
+    strips = page_strips(page, base)
+    if ImageChops.difference(paste_strips(base, strips), page).getbbox() is not None:
+        raise AssertionError("batch PDF strips don't reproduce the page they were cut from")
+    phases["pdf_strips"] = time_calls(lambda: page_strips(page, base), iterations)
+    phases["pdf_strips"]["strips"] = len(strips)
+
+    return phases
+
+def app_notice(index):
+    notice.create_rent_reminder(
+        TENANT,
+        resident_name=f"Resident {index}",
+        unit_number=f"A-{index}",
+        amount_due="11,500",
+        due_date="5th",
+        issue_date=ISSUE_DATE,
+        deterministic=True
+    ).getvalue()
+
+def vector_notice(index):
+    notice.create_rent_reminder_vector(
+        TENANT,
+        resident_name=f"Resident {index}",
+        unit_number=f"A-{index}",
+        amount_due="11,500",
+        due_date="5th",
+        issue_date=ISSUE_DATE,
+        deterministic=True
+    ).getvalue()
+
+def script_notice(index, output_dir):
+    rent_reminder.create_rent_reminder(
+        resident_name=f"Resident {index}",
+        unit_number=f"B-{index}",
+        amount_due="15,000",
+        due_date="10th",
+        output_filename=os.path.join(output_dir, "notice.png"),
+        verbose=False,
+        issue_date=ISSUE_DATE,
+        deterministic=True
+    )
+
+def end_to_end_forms(output_dir):
+    # The renderers run end to end, by the names results are reported under
+    return {
+        "app": app_notice,
+        "app_vector_pdf": vector_notice,
+        "rent_reminder": lambda index: script_notice(index, output_dir),
+    }
+
+def run_end_to_end(render, count):
+    # Warm up outside the measurement, then time count distinct notices in a row
+    render(-1)
+    start = time.perf_counter()
+    for index in range(count):
+        render(index)
+    elapsed = time.perf_counter() - start
+    return {
+        "seconds": elapsed,
+        "notices_per_second": count / elapsed,
+        "ms_per_notice": elapsed * 1000 / count,
+    }
+
+def measure_peak_rss(form, count):
+    """
+    Runs in the child process started by peak_rss: renders count notices of form
+    after a warm-up and prints the peak RSS growth in MB.
+    """
+    with tempfile.TemporaryDirectory() as output_dir:
+        render = end_to_end_forms(output_dir)[form]
+        render(-1)
+        rss_before = reset_peak_rss()
+        for index in range(count):
+            render(index)
+        print(json.dumps({"peak_rss_mb": peak_rss_mb() - rss_before}))
+
+def peak_rss(form, count):
+    # A fixed mmap threshold makes glibc hand large image buffers back on free,
+    # so the peak reflects the notices rendered rather than memory kept from the warm-up
+    env = dict(os.environ, MALLOC_MMAP_THRESHOLD_="131072")
+    command = [sys.executable, os.path.abspath(__file__), "--peak-rss", form, str(count)]
+    output = subprocess.run(command, env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])["peak_rss_mb"]
+
+def run_pool(processes, count):
+    # Renders spread over a process pool, submitted from as many threads as there are workers
+    pool = RenderPool(processes=processes, initializer=render_tasks.warm_render_worker)
+    args = lambda index: ("brandon", f"Resident {index}", f"A-{index}", "11,500", "5th")
+    try:
+        with ThreadPoolExecutor(max_workers=processes) as threads:
+            list(threads.map(lambda i: pool.run(render_tasks.render_notice, *args(-1 - i)), range(processes)))
+            start = time.perf_counter()
+            list(threads.map(lambda i: pool.run(render_tasks.render_notice, *args(i)), range(count)))
+            elapsed = time.perf_counter() - start
+    finally:
+        pool.close()
+    return {
+        "processes": processes,
+        "seconds": elapsed,
+        "notices_per_second": count / elapsed,
+        "ms_per_notice": elapsed * 1000 / count,
+    }
+
+def bench_end_to_end(resident_counts, processes):
+    results = {}
+    with tempfile.TemporaryDirectory() as output_dir:
+        for form, render in end_to_end_forms(output_dir).items():
+            results[form] = {}
+            for count in resident_counts:
+                result = run_end_to_end(render, count)
+                result["peak_rss_mb"] = peak_rss(form, count)
+                results[form][str(count)] = result
+    if processes:
+        results["app_pool"] = {str(count): run_pool(processes, count) for count in resident_counts}
+    return results
+
+def flatten(results, prefix=""):
+    """
+    Yields (path, value) for every number in a nested result dict.
+    """
+    for key, value in results.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            yield from flatten(value, path)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield path, value
+
+def compare(current, baseline, tolerance):
+    """
+    Returns a list of regressions: medians and per-notice times that grew, and
+    throughputs that fell, by more than tolerance (a fraction) against baseline.
+    """
+    before = dict(flatten(baseline))
+    regressions = []
+    for path, value in flatten(current):
+        old = before.get(path)
+        if not old:
+            continue
+        if path.endswith(("median_ms", "ms_per_notice")) and value > old * (1 + tolerance):
+            regressions.append(f"{path}: {old:.1f} -> {value:.1f} ms (+{(value / old - 1) * 100:.0f}%)")
+        elif path.endswith("notices_per_second") and value < old / (1 + tolerance):
+            regressions.append(f"{path}: {old:.2f} -> {value:.2f}/s ({(value / old - 1) * 100:.0f}%)")
+    return regressions
+
+def print_report(results):
+    phases = results["phases"]
+    print("Phases (median, cold where marked)")
+    print(f"  font loading     {phases['font_loading']['median_ms']:9.2f} ms  ({phases['font_loading']['family']})")
+    print(f"  logo loading     {phases['logo_loading']['median_ms']:9.2f} ms"
+          f"{'' if phases['logo_loading']['found'] else '  (no logo file, fallback box)'}")
+    print(f"  header drawing   {phases['header_drawing']['median_ms']:9.2f} ms")
+    for length, result in phases["body_wrapping"].items():
+        print(f"  body wrap {length:<6} {result['cold']['median_ms']:9.2f} ms cold  "
+              f"{result['cached']['median_ms']:7.2f} ms cached  ({result['lines']} lines)")
+    layout = phases["layout"]
+    print(f"  layout compile   {layout['compile']['median_ms']:9.2f} ms       "
+          f"  replay {layout['replay']['median_ms']:.2f} ms per untextured notice")
+    noise = phases["noise"]
+    print(f"  noise            {noise['cold']['median_ms']:9.2f} ms cold  {noise['cached']['median_ms']:7.2f} ms cached"
+          f"  (page copy {noise['copy_only']['median_ms']:.2f} ms included)")
+    for profile, result in phases["encoding"].items():
+        print(f"  encode {profile:<9} {result['median_ms']:9.2f} ms  {result['bytes'] / 1024:8.1f} KB")
+    for vector_format, result in phases["vector"].items():
+        print(f"  vector {vector_format:<9} {result['median_ms']:9.2f} ms  {result['bytes'] / 1024:8.1f} KB  (draw and write)")
+    strips = phases["pdf_strips"]
+    print(f"  pdf strips       {strips['median_ms']:9.2f} ms  {strips['strips']:8d} strips (exact)")
+
+    print("End to end")
+    for form, runs in results["end_to_end"].items():
+        for count, result in runs.items():
+            memory = f"  peak +{result['peak_rss_mb']:.1f} MB" if "peak_rss_mb" in result else ""
+            print(f"  {form:<14} {count:>5} residents  {result['notices_per_second']:7.2f} notices/s  "
+                  f"{result['ms_per_notice']:8.1f} ms/notice{memory}")
+
+def parse_counts(value):
+    return [int(part) for part in value.split(",") if part]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the notice renderer phase by phase.")
+    parser.add_argument("--iterations", type=int, default=5, help="Runs per phase measurement (default: 5)")
+    parser.add_argument("--residents", type=parse_counts, default=[1, 10, 50],
+                        help="Comma-separated resident counts for end-to-end runs (default: 1,10,50)")
+    parser.add_argument("--body-lengths", type=parse_counts, default=[1, 4, 16],
+                        help="Comma-separated multiples of the standard body to wrap (default: 1,4,16)")
+    parser.add_argument("--processes", type=int, default=0,
+                        help="Also measure throughput through a render pool of this many processes")
+    parser.add_argument("--json", metavar="PATH", help="Write the results as JSON")
+    parser.add_argument("--compare", metavar="PATH", help="Compare against an earlier --json file")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="Allowed slowdown before --compare reports a regression (default: 0.15)")
+    parser.add_argument("--peak-rss", nargs=2, metavar=("FORM", "COUNT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.peak_rss:
+        measure_peak_rss(args.peak_rss[0], int(args.peak_rss[1]))
+        sys.exit()
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pillow": PIL.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "iterations": args.iterations,
+        },
+        "phases": bench_phases(args.iterations, args.body_lengths),
+        "end_to_end": bench_end_to_end(args.residents, args.processes),
+    }
+    print_report(results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.compare}")
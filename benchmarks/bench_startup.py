@@ -0,0 +1,106 @@
+"""
+Cold-start benchmark for the web app: how long a fresh server process takes to
+import app, whether Pillow was loaded by the import, and how long its first
+page (GET /) and first notice (POST /generate) take after that.
+
+Every run is a new interpreter, so nothing is warm: in-process renders
+(RENDER_PROCESSES=0) pay for importing the renderer and loading fonts and the
+letterhead on the first notice, and with one render worker the first notice
+also waits for the worker to start. The "eager" configuration imports the
+renderer before app, as a server that loads everything at startup would.
+Medians over the runs are reported.
+
+Usage: python benchmarks/bench_startup.py [--runs N] [--json results.json]
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (name, RENDER_PROCESSES, import the renderer before app)
+CONFIGURATIONS = (
+    ("lazy", "0", False),
+    ("lazy_worker", "1", False),
+    ("eager", "0", True),
+)
+
+def measure(eager):
+    """
+    Runs in the child process: imports app and sends it its first two requests,
+    printing the timings as JSON.
+    """
+    sys.path.insert(0, ROOT)
+    # Logo paths in the renderers are relative to the project root
+    os.chdir(ROOT)
+
+    start = time.perf_counter()
+    if eager:
+        importlib.import_module("notice")
+    import app
+    imported = time.perf_counter()
+    pil_loaded = "PIL" in sys.modules
+
+    client = app.app.test_client()
+    page = client.get("/")
+    paged = time.perf_counter()
+    generated = client.post("/generate", data={
+        "resident_name": "Jane Doe", "unit_number": "A-12", "amount_due": "11,500", "due_date": "5th"
+    })
+    done = time.perf_counter()
+    if page.status_code != 200 or generated.status_code != 200:
+        raise SystemExit(f"Unexpected status: GET / {page.status_code}, POST /generate {generated.status_code}")
+
+    print(json.dumps({
+        "import_ms": (imported - start) * 1000,
+        "pil_after_import": pil_loaded,
+        "first_page_ms": (paged - imported) * 1000,
+        "first_notice_ms": (done - paged) * 1000,
+    }))
+
+def run(processes, eager):
+    env = dict(os.environ, RENDER_PROCESSES=processes)
+    command = [sys.executable, os.path.abspath(__file__), "--measure"] + (["--eager"] if eager else [])
+    start = time.perf_counter()
+    output = subprocess.run(command, env=env, check=True, capture_output=True, text=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    # From launching the interpreter until the first notice is back
+    result["process_ms"] = (time.perf_counter() - start) * 1000
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the web app's cold start.")
+    parser.add_argument("--runs", type=int, default=5, help="fresh processes per configuration (default 5)")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--measure", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--eager", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(args.eager)
+        return
+
+    results = {}
+    print(f"{'configuration':<12} {'import':>10} {'Pillow':>7} {'first page':>11} {'first notice':>13} {'process':>10}")
+    for name, processes, eager in CONFIGURATIONS:
+        runs = [run(processes, eager) for _ in range(args.runs)]
+        summary = {key: statistics.median(r[key] for r in runs)
+                   for key in ("import_ms", "first_page_ms", "first_notice_ms", "process_ms")}
+        summary["pil_after_import"] = any(r["pil_after_import"] for r in runs)
+        summary["render_processes"] = int(processes)
+        results[name] = summary
+        print(f"{name:<12} {summary['import_ms']:8.1f}ms {'yes' if summary['pil_after_import'] else 'no':>7} "
+              f"{summary['first_page_ms']:9.1f}ms {summary['first_notice_ms']:11.1f}ms {summary['process_ms']:8.1f}ms")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"runs": args.runs, "python": platform.python_version(), "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Micro-benchmark of body-text wrapping: the original loop, which re-measures the
+whole growing line with textbbox for every word, against text_layout's linear
+wrapping from cached word metrics. Also checks both produce the same layout.
+
+Usage: python benchmarks/bench_wrap.py [paragraph words ...]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw
+
+from fonts import font_registry
+from text_layout import get_measurer, layout_text
+
+MAX_WIDTH = 2480 - 200 - 200
+LINE_GAP = 5
+PARAGRAPH_GAP = 15 * 4 // 3
+
+VOCABULARY = (
+    "rent payment month due amount please ensure submitted on time avoid late fee charges "
+    "applicable according lease agreement management office records proof disregard notice "
+    "kindly resident unit balance outstanding account M-Pesa Paybill 11,500 KSH www.brandonapts.com/pay"
+).split()
+
+def legacy_layout(text, font, draw):
+    """
+    The wrapping loop create_rent_reminder used before text_layout, returning
+    (y_offset, line) pairs instead of drawing them.
+    """
+    positioned = []
+    y = 0
+    for line in text.split('\n'):
+        if not line:
+            y += PARAGRAPH_GAP
+            continue
+        words = line.split()
+        if words:
+            current_line = words[0]
+            for word in words[1:]:
+                test_line = current_line + " " + word
+                bbox = draw.textbbox((0, 0), test_line, font=font)
+                if bbox[2] - bbox[0] <= MAX_WIDTH:
+                    current_line = test_line
+                else:
+                    positioned.append((y, current_line))
+                    bbox = draw.textbbox((0, 0), current_line, font=font)
+                    y += bbox[3] - bbox[1] + LINE_GAP
+                    current_line = word
+            positioned.append((y, current_line))
+            bbox = draw.textbbox((0, 0), current_line, font=font)
+            y += bbox[3] - bbox[1] + LINE_GAP
+    return positioned, y
+
+def make_body(words, paragraphs=3, seed=1):
+    rng = random.Random(seed)
+    return "\n\n".join(
+        " ".join(rng.choice(VOCABULARY) for _ in range(words)) for _ in range(paragraphs)
+    )
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [50, 200, 800, 3200]
+    font = font_registry.notice_fonts(4)[2]
+    draw = ImageDraw.Draw(Image.new('RGB', (1, 1)))
+
+    print(f"{'words/paragraph':>16} {'legacy ms':>10} {'cold ms':>10} {'warm ms':>10} {'speedup':>8}")
+    for words in sizes:
+        body = make_body(words, seed=words)
+        legacy_time, expected = best_of(lambda: legacy_layout(body, font, draw), 3)
+
+        # Cold: empty word cache; warm: every word already measured
+        get_measurer(font)._words.clear()
+        cold_time, _ = best_of(lambda: layout_text(body, font, MAX_WIDTH, LINE_GAP, PARAGRAPH_GAP), 1)
+        warm_time, result = best_of(lambda: layout_text(body, font, MAX_WIDTH, LINE_GAP, PARAGRAPH_GAP), 3)
+
+        if result != expected:
+            sys.exit(f"Layout mismatch at {words} words per paragraph")
+        print(f"{words:>16} {legacy_time * 1000:>10.2f} {cold_time * 1000:>10.2f} "
+              f"{warm_time * 1000:>10.2f} {legacy_time / warm_time:>7.1f}x")
@@ -0,0 +1,200 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: evictions aren't serialized between processes, which only wastes a scan
+    fcntl = None
+
+# Share of the budget a process may write before it scans the directory and evicts
+SCAN_EVERY = 0.05
+
+# Evictions go down to this share of the budget, so a full cache isn't scanned on every write
+LOW_WATER = 0.9
+
+# Temporary files older than this are left over from a crashed writer
+STALE_TEMP_SECONDS = 3600
+
+class DiskCache:
+    """
+    Encoded notices in a directory shared by every server process on a machine,
+    so a notice one process rendered is served by all the others.
+
+    Entries are addressed by a hash of their key; notices are deterministic, so
+    the key fixes the bytes. Writes go to a temporary file renamed into place,
+    so readers never see a partial entry and reading takes no lock at all. A
+    hit refreshes the file's modification time, which eviction uses as the last
+    access: when a process has written SCAN_EVERY of max_bytes since its last
+    scan, it lists the directory and deletes the least recently used entries
+    down to LOW_WATER of the budget. A lock file keeps two processes from
+    scanning at once; an entry deleted under a reader is just a miss.
+
+    Counters are per process; entries and bytes are as of this process's last
+    scan plus what it has written since.
+    """
+
+    def __init__(self, directory, max_bytes=1024 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.entries = 0
+        self.bytes = 0
+        self._written = None
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        digest = hashlib.sha256(json.dumps(key, default=str).encode()).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest[2:])
+
+    def get(self, key):
+        """
+        Returns the bytes stored under key, or None.
+        """
+        path = self.path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            # Evicted or read-only since the read; the entry just ages as if unused
+            pass
+        self.hits += 1
+        return data
+
+    def put(self, key, data):
+        """
+        Stores data under key, replacing any earlier entry in one step.
+        Entries larger than the whole budget are not stored.
+        """
+        if len(data) > self.max_bytes:
+            return
+        path = self.path(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temporary = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temporary, path)
+        except OSError:
+            try:
+                os.remove(temporary)
+            except OSError:
+                pass
+            return
+
+        with self._lock:
+            self.writes += 1
+            self.entries += 1
+            self.bytes += len(data)
+            # The first write scans, so a restarted process learns the directory's size.
+            # Until a scan gets the lock, every write tries again
+            if self._written is not None:
+                self._written += len(data)
+            due = self._written is None or self._written > self.max_bytes * SCAN_EVERY
+        if due:
+            self.evict()
+
+    def evict(self):
+        """
+        Scans the directory and deletes the least recently used entries until
+        it is within LOW_WATER of max_bytes. Skipped if another process is scanning.
+        """
+        with open(os.path.join(self.directory, ".lock"), "a") as lock:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    return
+            entries, total = self._scan()
+            evicted = 0
+            if total > self.max_bytes:
+                # Oldest access first
+                entries.sort()
+                for _, size, path in entries:
+                    if total <= self.max_bytes * LOW_WATER:
+                        break
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        continue
+                    total -= size
+                    evicted += 1
+
+        with self._lock:
+            self.evictions += evicted
+            self.entries = len(entries) - evicted
+            self.bytes = total
+            self._written = 0
+
+    def _scan(self):
+        # Returns [(mtime, size, path)] of every entry and their total size,
+        # removing temporary files abandoned by writers that died
+        entries = []
+        total = 0
+        now = time.time()
+        for bucket in os.scandir(self.directory):
+            if not bucket.is_dir() or bucket.name.startswith("."):
+                continue
+            for entry in os.scandir(bucket.path):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                if entry.name.startswith(".tmp-"):
+                    if now - stat.st_mtime > STALE_TEMP_SECONDS:
+                        try:
+                            os.remove(entry.path)
+                        except OSError:
+                            pass
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        return entries, total
+
+    def stats(self):
+        """
+        Returns this process's hit/miss/write/eviction counters and the entries and
+        bytes in the directory as of its last scan, scanning first if it hasn't yet.
+        """
+        if self._written is None:
+            self.evict()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "entries": self.entries,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+    def clear(self):
+        """
+        Deletes every entry, for every process, and resets this process's counters.
+        """
+        for _, _, path in self._scan()[0]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.writes = 0
+            self.evictions = 0
+            self.entries = 0
+            self.bytes = 0
+            self._written = None
@@ -0,0 +1,173 @@
+from io import BytesIO
+import struct
+import zlib
+
+from preview import PRINT_DPI, can_write_webp, scale_to_dpi
+
+# PNG color type and bit depth for each image mode unfiltered_png writes
+PNG_MODES = {"1": (0, 1), "L": (0, 8), "P": (3, 8), "RGB": (2, 8)}
+
+# unfiltered_png reads the page this many rows at a time and writes an IDAT
+# chunk whenever this much compressed data has built up
+BAND_ROWS = 64
+IDAT_SIZE = 64 * 1024
+
+def _write_chunk(fp, chunk_type, data):
+    fp.write(struct.pack(">I", len(data)) + chunk_type)
+    fp.write(data)
+    fp.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(chunk_type))))
+
+def unfiltered_png(image, fp, dpi=PRINT_DPI, compress_level=1):
+    """
+    Writes a PNG with every row left unfiltered, compressed at compress_level, to fp.
+    Pillow picks a filter for each row, which takes longer than compressing
+    the page itself at a low level; a notice is mostly flat white, so skipping
+    the filters costs little in size. The page is read in bands and written out
+    as it is compressed, so neither the raw pixels nor the whole file are ever
+    held as one buffer.
+    """
+    color_type, bit_depth = PNG_MODES[image.mode]
+    width, height = image.size
+
+    ppm = round(dpi / 0.0254)  # pHYs takes pixels per metre
+    fp.write(b"\x89PNG\r\n\x1a\n")
+    _write_chunk(fp, b"IHDR", struct.pack(">IIBBBBB", width, height, bit_depth, color_type, 0, 0, 0))
+    if image.mode == "P":
+        _write_chunk(fp, b"PLTE", bytes(image.getpalette()))
+    _write_chunk(fp, b"pHYs", struct.pack(">IIB", ppm, ppm, 1))
+
+    compressor = zlib.compressobj(compress_level)
+    pending = []
+    for top in range(0, height, BAND_ROWS):
+        bottom = min(top + BAND_ROWS, height)
+        band = memoryview(image.crop((0, top, width, bottom)).tobytes())
+        stride = len(band) // (bottom - top)
+        for offset in range(0, len(band), stride):
+            pending.append(compressor.compress(b"\0"))  # filter type None
+            pending.append(compressor.compress(band[offset:offset + stride]))
+        if sum(map(len, pending)) >= IDAT_SIZE:
+            _write_chunk(fp, b"IDAT", b"".join(pending))
+            pending.clear()
+    pending.append(compressor.flush())
+    _write_chunk(fp, b"IDAT", b"".join(pending))
+    _write_chunk(fp, b"IEND", b"")
+
+# Named output profiles for finished notices. Median encode time and size per
+# notice, from benchmarks/bench_encoders.py (2480 x 3508, textured):
+#
+#            encoder                               RGB              L / P / 1
+#   print    Pillow PNG, zlib level 6, 300 dpi     ~350 ms  157 KB   146 / 73 / 44 ms   89 / 57 / 23 KB
+#            The original output: lossless and ready to print.
+#   fast     unfiltered PNG, zlib level 1          ~90 ms   247 KB   38 / 39 / 36 ms   127 / 109 / 29 KB
+#            Lossless in about a quarter of the time, with ~1.5x the bytes. For on-demand downloads.
+#   archive  Pillow PNG, optimize (level 9)        ~630 ms  151 KB   416 / 245 / 85 ms  81 / 47 / 19 KB
+#            Smallest lossless file, for long-term storage where time is cheap.
+#   email    WebP (JPEG without WebP) at 150 dpi   ~220 ms   36 KB   about the same for every mode
+#            Quality drops step by step until the file fits max_bytes. For attachments.
+ENCODER_PROFILES = {
+    "print": {
+        "format": "PNG",
+        "options": {"compress_level": 6},
+        "dpi": PRINT_DPI,
+    },
+    "fast": {
+        "format": "PNG",
+        "options": {"compress_level": 1},
+        "dpi": PRINT_DPI,
+        "writer": unfiltered_png,
+    },
+    "archive": {
+        "format": "PNG",
+        "options": {"optimize": True},
+        "dpi": PRINT_DPI,
+    },
+    "email": {
+        "format": "WEBP",
+        "options": {},
+        "dpi": 150,
+        "max_bytes": 100 * 1024,
+        "qualities": (85, 70, 55, 40),
+    },
+}
+
+DEFAULT_PROFILE = "print"
+
+FORMAT_TYPES = {
+    "PNG": ("image/png", "png"),
+    "WEBP": ("image/webp", "webp"),
+    "JPEG": ("image/jpeg", "jpg"),
+}
+
+def resolve_profile(profile=None):
+    """
+    Returns profile if it names an encoder profile, the default for None,
+    and raises ValueError for anything else.
+    """
+    if profile is None:
+        return DEFAULT_PROFILE
+    if profile not in ENCODER_PROFILES:
+        raise ValueError(f"Unknown encoder profile {profile!r}; expected one of {', '.join(ENCODER_PROFILES)}")
+    return profile
+
+def profile_format(profile=None, webp=None):
+    """
+    Returns the Pillow format a profile writes, falling back to JPEG when Pillow
+    can't write WebP. webp says whether it can; None checks this process's Pillow,
+    which the web server leaves to a render worker (see preview.can_write_webp).
+    """
+    pil_format = ENCODER_PROFILES[resolve_profile(profile)]["format"]
+    if pil_format == "WEBP":
+        if webp is None:
+            webp = can_write_webp()
+        if not webp:
+            return "JPEG"
+    return pil_format
+
+def profile_type(profile=None, webp=None):
+    """
+    Returns (mimetype, file extension) of what a profile produces; webp as for profile_format.
+    """
+    return FORMAT_TYPES[profile_format(profile, webp)]
+
+def write_notice(image, fp, profile=None):
+    """
+    Encodes a rendered notice with a named profile straight into the binary file fp.
+    Profiles with a size cap rewind fp and try again at a lower quality, so fp
+    must be seekable for those.
+    """
+    settings = ENCODER_PROFILES[resolve_profile(profile)]
+    pil_format = profile_format(profile)
+    dpi = settings["dpi"]
+
+    if pil_format != "PNG" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    image = scale_to_dpi(image, dpi)
+
+    writer = settings.get("writer")
+    if writer is not None:
+        writer(image, fp, dpi, **settings["options"])
+        return
+
+    max_bytes = settings.get("max_bytes")
+    if max_bytes is None:
+        image.save(fp, pil_format, dpi=(dpi, dpi), **settings["options"])
+        return
+
+    # Lossy profiles step down in quality until the file fits; the last step is kept regardless
+    start = fp.tell()
+    for quality in settings["qualities"]:
+        fp.seek(start)
+        fp.truncate()
+        image.save(fp, pil_format, dpi=(dpi, dpi), quality=quality, **settings["options"])
+        if fp.tell() - start <= max_bytes:
+            break
+
+def encode_notice(image, profile=None):
+    """
+    Encodes a rendered notice with a named profile and returns the bytes.
+    BytesIO.getvalue() hands over the buffer the encoder wrote into instead of
+    copying it, so the encoded notice exists only once.
+    """
+    img_io = BytesIO()
+    write_notice(image, img_io, profile)
+    return img_io.getvalue()
@@ -0,0 +1,101 @@
+from PIL import ImageFont
+import threading
+
+# Preferred serif families, tried in order: Windows/Mac first, then common Linux fonts
+FONT_FALLBACK_CHAIN = ("Times New Roman.ttf", "DejaVuSerif.ttf")
+
+class FontRegistry:
+    """
+    Process-wide cache of loaded fonts.
+    The fallback chain is resolved once; after that fonts are kept per (family, size)
+    so steady-state renders never open or parse a font file.
+    """
+
+    def __init__(self, families=FONT_FALLBACK_CHAIN):
+        self.families = tuple(families)
+        self.hits = 0
+        self.misses = 0
+        self._fonts = {}
+        self._family = None
+        self._lock = threading.Lock()
+
+    @property
+    def family(self):
+        """
+        The first family in the fallback chain that can be opened,
+        or None when only Pillow's built-in default font is available.
+        """
+        if self._family is None:
+            with self._lock:
+                if self._family is None:
+                    self._family = self._resolve_family()
+        return self._family or None
+
+    def _resolve_family(self):
+        for family in self.families:
+            try:
+                ImageFont.truetype(family, 12)
+                return family
+            except IOError:
+                continue
+        print("Warning: Preferred fonts not found, using default fonts")
+        return ""
+
+    def get(self, size, family=None):
+        """
+        Returns the font for (family, size), loading it on first use only.
+        When family is omitted the resolved fallback family is used.
+        """
+        key = (family or self.family, size)
+        font = self._fonts.get(key)
+        if font is not None:
+            self.hits += 1
+            return font
+
+        with self._lock:
+            font = self._fonts.get(key)
+            if font is None:
+                self.misses += 1
+                if key[0]:
+                    font = ImageFont.truetype(key[0], size)
+                else:
+                    font = ImageFont.load_default()
+                self._fonts[key] = font
+            else:
+                self.hits += 1
+        return font
+
+    def notice_fonts(self, scale_factor):
+        """
+        Returns the (header, subheader, text, footer, small) fonts used by the notice layout.
+        """
+        return (
+            self.get(24 * scale_factor // 3),
+            self.get(16 * scale_factor // 3),
+            self.get(16 * scale_factor // 3),
+            self.get(14 * scale_factor // 3),
+            self.get(12 * scale_factor // 3),
+        )
+
+    def stats(self):
+        """
+        Returns hit/miss counters and the number of loaded fonts.
+        """
+        return {
+            "family": self.family,
+            "hits": self.hits,
+            "misses": self.misses,
+            "loaded": len(self._fonts),
+        }
+
+    def clear(self):
+        """
+        Drops every loaded font and resets the counters.
+        """
+        with self._lock:
+            self._fonts.clear()
+            self._family = None
+            self.hits = 0
+            self.misses = 0
+
+font_registry = FontRegistry()
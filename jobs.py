@@ -0,0 +1,187 @@
+from collections import OrderedDict
+import math
+import queue
+import threading
+import time
+import traceback
+import uuid
+
+# How long a finished job's result is kept for the client to collect
+DEFAULT_RESULT_TTL = 10 * 60
+
+# Finished jobs kept at most, whatever their age; the oldest go first
+DEFAULT_MAX_RESULTS = 128
+
+# Assumed render time until the first job has finished
+INITIAL_JOB_SECONDS = 1.0
+
+class QueueFullError(Exception):
+    """
+    Raised by JobQueue.submit when the queue is at capacity.
+    retry_after is the estimated number of seconds until there is room again.
+    """
+
+    def __init__(self, retry_after):
+        super().__init__(f"The render queue is full; retry in {retry_after}s")
+        self.retry_after = retry_after
+
+class Job:
+    """
+    One queued render. status goes from "queued" to "running" to "done" or "failed".
+    When done, result holds what the job function returned.
+    """
+
+    def __init__(self, func, args, kwargs, meta):
+        self.id = uuid.uuid4().hex
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.meta = meta
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+
+    def to_dict(self):
+        """
+        Returns the job's public state for status responses.
+        """
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+class JobQueue:
+    """
+    Bounded queue of render jobs processed by a fixed pool of worker threads.
+    submit() returns straight away with a Job whose status callers poll; once the
+    queue holds max_pending jobs it raises QueueFullError instead of accepting more,
+    so load spikes turn into explicit backpressure rather than piling up.
+    Finished jobs are kept for result_ttl seconds, and no more than max_results
+    of them at once: past that the oldest finished ones are dropped early, so
+    retained results stay bounded however many jobs go through.
+    """
+
+    def __init__(self, workers=4, max_pending=32, result_ttl=DEFAULT_RESULT_TTL, max_results=DEFAULT_MAX_RESULTS):
+        self.workers = max(1, workers)
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self.max_results = max_results
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._jobs = OrderedDict()
+        # Ids of finished jobs, in the order they finished
+        self._finished = OrderedDict()
+        self._threads = []
+        self._running = 0
+        self._average_seconds = INITIAL_JOB_SECONDS
+        self._lock = threading.Lock()
+
+    def _start_workers(self):
+        # Workers start with the first job, so importing the app doesn't spawn threads
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"render-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            with self._lock:
+                job.status = "running"
+                job.started = time.time()
+                self._running += 1
+            try:
+                result = job.func(*job.args, **job.kwargs)
+            except Exception as e:
+                traceback.print_exc()
+                with self._lock:
+                    job.status, job.error = "failed", str(e)
+                    self.failed += 1
+            else:
+                with self._lock:
+                    job.status, job.result = "done", result
+                    self.completed += 1
+            finally:
+                with self._lock:
+                    job.finished = time.time()
+                    job.func = job.args = job.kwargs = None
+                    self._finished[job.id] = job
+                    self._running -= 1
+                    # Smoothed render time, used to estimate Retry-After
+                    self._average_seconds += 0.2 * (job.finished - job.started - self._average_seconds)
+                    self._expire(job.finished)
+                self._queue.task_done()
+
+    def _expire(self, now):
+        # Finished jobs are kept in the order they finished, so the expired ones,
+        # and the oldest beyond max_results, are at the front
+        while self._finished:
+            job = next(iter(self._finished.values()))
+            if now - job.finished < self.result_ttl and len(self._finished) <= self.max_results:
+                break
+            self._finished.popitem(last=False)
+            del self._jobs[job.id]
+
+    def retry_after(self):
+        """
+        Estimated seconds until a queued job would start: the jobs ahead of it
+        divided over the workers, times the average render time.
+        """
+        waiting = self._queue.qsize() + self._running
+        return max(1, math.ceil(self._average_seconds * waiting / self.workers))
+
+    def submit(self, func, *args, meta=None, **kwargs):
+        """
+        Queues func(*args, **kwargs) and returns its Job. meta is kept on the job
+        for the caller (e.g. the mimetype and download name of the result).
+        Raises QueueFullError when max_pending jobs are already waiting.
+        """
+        job = Job(func, args, kwargs, meta or {})
+        with self._lock:
+            if not self._threads:
+                self._start_workers()
+            self._expire(time.time())
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                self.rejected += 1
+                raise QueueFullError(self.retry_after())
+            self._jobs[job.id] = job
+            self.submitted += 1
+        return job
+
+    def get(self, job_id):
+        """
+        Returns the Job with this id, or None if it is unknown or has expired.
+        """
+        with self._lock:
+            self._expire(time.time())
+            return self._jobs.get(job_id)
+
+    def stats(self):
+        """
+        Returns queue depth, worker activity and job counters.
+        """
+        return {
+            "workers": self.workers,
+            "running": self._running,
+            "queued": self._queue.qsize(),
+            "max_pending": self.max_pending,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "completed": self.completed,
+            "failed": self.failed,
+            "retained": len(self._finished),
+            "max_results": self.max_results,
+            "average_seconds": self._average_seconds,
+        }
@@ -0,0 +1,226 @@
+from PIL import Image, ImageDraw
+from collections import OrderedDict
+import threading
+
+from fonts import font_registry
+from letterhead import A4_WIDTH
+from render_modes import ink
+from text_layout import layout_text
+
+# Font names a template element can use, in the order font_registry.notice_fonts returns them
+FONT_NAMES = ("header", "subheader", "text", "footer", "small")
+
+# Operations a template compiles to; see replay_layout for their fields
+MOVE, TEXT, SLOT, BOX, PARAGRAPHS = "move", "text", "slot", "box", "paragraphs"
+
+def units(value, scale_factor):
+    """
+    Converts a template length, given in thirds of the scale factor like the
+    rest of the notice layout, to pixels.
+    """
+    return value * scale_factor // 3
+
+def compile_layout(template, tenant, layout, mode):
+    """
+    Turns a declarative notice template into a flat list of draw operations for
+    one tenant, letterhead layout (from letterhead_cache) and canvas mode.
+
+    A template is {"name": ..., "elements": (...)}. Elements are drawn top to
+    bottom along a vertical cursor; each is a dict with:
+      draw          "text", "box" (text in a shaded box) or "paragraphs" (wrapped text)
+      text / slot   fixed text, formatted with the tenant's notice wording, or the
+                    name of a value passed to replay_layout on every render;
+                    elements whose slot is empty are skipped
+      at            layout key to move the cursor to before drawing
+      before        space above the element, in template units (before_px: pixels)
+      font, color   a name from FONT_NAMES (default "text") and an RGB colour (default black)
+      align         "left" (default, at the left margin) or "right" (ending at the right margin)
+      advance       for text, move the cursor below it; after adds more space
+      line_below_px for text, draw it its own height plus this many pixels below the cursor
+    plus padding, extra_height, fill and outline for boxes, and line_gap_px and
+    paragraph_gap for paragraphs. Lengths are in template units unless named _px.
+
+    Everything that doesn't depend on a slot is resolved here: fonts, ink values,
+    fixed strings and their measurements, margins and the offsets between
+    elements, so rendering is a single pass over the operations.
+    """
+    scale_factor = layout["scale_factor"]
+    fonts = dict(zip(FONT_NAMES, font_registry.notice_fonts(scale_factor)))
+    left = layout["margin_left"]
+    right = A4_WIDTH - layout["margin_right"]
+    wording = tenant["notice"]
+    # Fixed strings are measured on a canvas of the same mode, as the render would measure them
+    measure = ImageDraw.Draw(Image.new(mode, (1, 1)))
+
+    ops = []
+    # Offset of the next element from the cursor, while it is known in advance
+    offset = 0
+    for element in template["elements"]:
+        if "at" in element:
+            ops.append((MOVE, layout[element["at"]]))
+            offset = 0
+        offset += units(element.get("before", 0), scale_factor) + element.get("before_px", 0)
+        font = fonts[element.get("font", "text")]
+        fill = ink(element.get("color", (0, 0, 0)), mode)
+        after = units(element.get("after", 0), scale_factor)
+        kind = element["draw"]
+
+        if kind == "text" and "text" in element:
+            text = element["text"].format_map(wording)
+            bbox = measure.textbbox((0, 0), text, font=font)
+            x = right - (bbox[2] - bbox[0]) if element.get("align") == "right" else left
+            y = offset
+            if "line_below_px" in element:
+                y += bbox[3] - bbox[1] + element["line_below_px"]
+            ops.append((TEXT, x, y, text, font, fill))
+            if element.get("advance"):
+                offset += bbox[3] - bbox[1] + after
+
+        elif kind == "text":
+            advance = element.get("advance", False)
+            align_right = element.get("align") == "right"
+            ops.append((
+                SLOT, element["slot"], right if align_right else left, align_right, offset,
+                element.get("line_below_px"), after if advance else None, font, fill
+            ))
+            if advance:
+                offset = 0
+
+        elif kind == "box":
+            padding = units(element.get("padding", 0), scale_factor)
+            ops.append((
+                BOX, element["slot"], left, right, offset, padding,
+                units(element.get("extra_height", 0), scale_factor), after, font, fill,
+                ink(element.get("fill", (255, 255, 255)), mode), ink(element.get("outline", (0, 0, 0)), mode)
+            ))
+            offset = 0
+
+        elif kind == "paragraphs":
+            ops.append((
+                PARAGRAPHS, element["slot"], left, right - left, offset, element.get("line_gap_px", 0),
+                units(element.get("paragraph_gap", 0), scale_factor), font, fill
+            ))
+            offset = 0
+
+        else:
+            raise ValueError(f"Unknown draw {kind!r} in layout template {template['name']!r}")
+    return ops
+
+def layout_inks(template):
+    """
+    Returns the RGB colours a template draws with, for a palette that keeps them exact.
+    """
+    inks = []
+    for element in template["elements"]:
+        inks.append(element.get("color", (0, 0, 0)))
+        if element["draw"] == "box":
+            inks += [element.get("fill", (255, 255, 255)), element.get("outline", (0, 0, 0))]
+    return tuple(dict.fromkeys(map(tuple, inks)))
+
+def replay_layout(ops, draw, slots):
+    """
+    Draws compiled operations onto draw, filling each slot from the slots dict.
+    Only slot text is measured here; everything else was fixed by compile_layout.
+    """
+    y = 0
+    for op in ops:
+        kind = op[0]
+        if kind == TEXT:
+            _, x, dy, text, font, fill = op
+            draw.text((x, y + dy), text, fill=fill, font=font)
+
+        elif kind == MOVE:
+            y = op[1]
+
+        elif kind == SLOT:
+            _, slot, x, align_right, dy, line_below, after, font, fill = op
+            text = slots.get(slot)
+            if not text:
+                continue
+            top = y + dy
+            if align_right or line_below is not None or after is not None:
+                bbox = draw.textbbox((0, 0), text, font=font)
+                if align_right:
+                    x -= bbox[2] - bbox[0]
+                if line_below is not None:
+                    top += bbox[3] - bbox[1] + line_below
+            draw.text((x, top), text, fill=fill, font=font)
+            if after is not None:
+                y = top + bbox[3] - bbox[1] + after
+
+        elif kind == BOX:
+            _, slot, left, right, dy, padding, extra_height, after, font, fill, box_fill, outline = op
+            text = slots.get(slot)
+            if not text:
+                continue
+            top = y + dy
+            bbox = draw.multiline_textbbox((0, 0), text, font=font)
+            height = bbox[3] - bbox[1] + extra_height
+            draw.rectangle([(left, top), (right, top + height)], fill=box_fill, outline=outline)
+            draw.multiline_text((left + padding, top + padding), text, fill=fill, font=font)
+            y = top + height + after
+
+        elif kind == PARAGRAPHS:
+            _, slot, x, width, dy, line_gap, paragraph_gap, font, fill = op
+            text = slots.get(slot)
+            if not text:
+                continue
+            top = y + dy
+            lines, height = layout_text(text, font, width, line_gap=line_gap, paragraph_gap=paragraph_gap)
+            for line_y, line in lines:
+                draw.text((x, top + line_y), line, fill=fill, font=font)
+            y = top + height
+
+class LayoutCache:
+    """
+    Keeps compiled layouts, one per template, tenant profile revision, letterhead
+    layout and canvas mode. A compiled layout is a few dozen tuples, so at most
+    max_entries are kept, dropping the least recently used.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, template, tenant, layout, mode="RGB"):
+        """
+        Returns the operations compile_layout produces for these arguments,
+        compiling them on first use. The list is shared; callers must not modify it.
+        """
+        key = (template["name"], tenant["id"], tenant.get("revision"), tuple(sorted(layout.items())), mode)
+        with self._lock:
+            ops = self._entries.get(key)
+            if ops is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return ops
+
+            self.misses += 1
+            ops = compile_layout(template, tenant, layout, mode)
+            self._entries[key] = ops
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return ops
+
+    def stats(self):
+        """
+        Returns hit/miss/eviction counters and the number of compiled layouts.
+        """
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "entries": len(self._entries)}
+
+    def clear(self):
+        """
+        Drops every compiled layout and resets the counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+layout_cache = LayoutCache()
@@ -0,0 +1,140 @@
+from collections import OrderedDict
+import os
+import tempfile
+import threading
+import urllib.request
+from io import BytesIO
+
+def fetch_logo(local_path, download_url):
+    """
+    Downloads the logo to local_path if the file doesn't exist yet.
+    Returns True when a logo file is available afterwards.
+    """
+    if os.path.exists(local_path):
+        return True
+
+    directory = os.path.dirname(local_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    from PIL import Image
+
+    temporary = None
+    try:
+        with urllib.request.urlopen(download_url, timeout=10) as response:
+            logo_data = response.read()
+        logo = Image.open(BytesIO(logo_data)).convert('RGBA')
+        # Every render worker may be fetching the same logo while others read it, so it
+        # is written beside the final path and renamed into place: nobody sees half a file
+        fd, temporary = tempfile.mkstemp(dir=directory or ".", prefix=".tmp-",
+                                         suffix=os.path.splitext(local_path)[1])
+        os.close(fd)
+        logo.save(temporary)
+        os.replace(temporary, local_path)
+        return True
+    except Exception as e:
+        print(f"Could not download logo from URL: {e}")
+        if temporary is not None:
+            try:
+                os.remove(temporary)
+            except OSError:
+                pass
+        return False
+
+def logo_revision(local_path):
+    """
+    Returns the logo file's modification time in nanoseconds, or None while it is
+    missing, so caches of whole notices change when a logo arrives or is replaced.
+    """
+    try:
+        return os.stat(local_path).st_mtime_ns
+    except OSError:
+        return None
+
+class LogoCache:
+    """
+    Keeps logos already sized for the letterhead, as an RGB image plus its alpha mask.
+    Entries are keyed by (path, size) and invalidated when the file's mtime changes,
+    so a render only has to paste. Nothing in here touches the network.
+    At most max_entries logos are kept, dropping the least recently used.
+    """
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, local_path, max_size):
+        """
+        Returns (rgb, mask) for the logo thumbnailed to fit max_size,
+        or None if the file is missing or unreadable.
+        """
+        try:
+            mtime = os.stat(local_path).st_mtime_ns
+        except OSError:
+            return None
+
+        key = (local_path, tuple(max_size))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == mtime:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+            self.misses += 1
+            # Imported here so loading tenant profiles, which prefetches logos, doesn't load Pillow
+            from PIL import Image
+            try:
+                logo = Image.open(local_path).convert("RGBA")
+            except Exception as e:
+                print(f"Error opening local logo file '{local_path}': {e}")
+                return None
+
+            # Resize logo to fit nicely in the header
+            logo.thumbnail(max_size, resample=Image.LANCZOS)
+            # Composite for handling transparency
+            logo_bg = Image.new('RGBA', logo.size, (255, 255, 255, 0))  # Transparent background
+            logo_composite = Image.alpha_composite(logo_bg, logo)
+            prepared = (logo_composite.convert('RGB'), logo_composite.getchannel('A'))
+            self._entries[key] = (mtime, prepared)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return prepared
+
+    def prefetch(self, local_path, download_url, background=True):
+        """
+        Makes sure the logo file exists, downloading it once if needed.
+        By default the download runs on a daemon thread so startup never blocks on it.
+        """
+        if os.path.exists(local_path):
+            return None
+        if not background:
+            return fetch_logo(local_path, download_url)
+
+        thread = threading.Thread(target=fetch_logo, args=(local_path, download_url), daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self):
+        """
+        Returns hit/miss/eviction counters and the number of prepared logos.
+        """
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "entries": len(self._entries)}
+
+    def clear(self):
+        """
+        Drops every prepared logo and resets the counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+logo_cache = LogoCache()
@@ -0,0 +1,108 @@
+import hashlib
+import json
+import os
+
+from notice_layout import RENDERER_VERSION, RENT_REMINDER_LAYOUT
+
+# Written into a batch's output directory, next to the notices it describes
+MANIFEST_NAME = "manifest.json"
+
+def _digest(*parts):
+    payload = json.dumps(parts, sort_keys=True, default=str).encode()
+    return hashlib.sha256(payload).hexdigest()
+
+def file_digest(path):
+    """
+    Returns the SHA-256 of a file's contents, or None if it can't be read.
+    """
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+def template_version():
+    """
+    Identifies how notices are drawn: the notice template plus RENDERER_VERSION,
+    which is bumped by hand for changes to the drawing code itself.
+    """
+    return _digest(RENDERER_VERSION, RENT_REMINDER_LAYOUT)
+
+def run_fingerprint(tenant, issue_date, mode="RGB", profile=None, vector_format=None):
+    """
+    Returns a hash of everything a batch's notices share: the template version,
+    the tenant's letterhead and wording, its logo file, the issue date printed on
+    the notices and the output options. Combined with each row by notice_digest.
+    """
+    return _digest(
+        template_version(),
+        tenant["branding"],
+        tenant["notice"],
+        file_digest(tenant["branding"]["logo_path"]),
+        issue_date,
+        mode,
+        profile,
+        vector_format
+    )
+
+def notice_digest(fingerprint, row):
+    """
+    Returns the input hash of one notice: the run's fingerprint and the row's fields.
+    """
+    return _digest(fingerprint, row.get("resident_name"), row.get("unit_number"), row.get("amount_due"),
+                   row.get("due_date"))
+
+class Manifest:
+    """
+    Maps each notice file in a batch's output directory to the input hash it was
+    rendered from, so a re-run only renders the rows whose inputs, branding or
+    template changed and keeps every other file as it is.
+
+    Files are named by roster position (see batch.notice_filename), so inserting
+    a row re-renders the rows after it; editing a row re-renders only that one.
+    """
+
+    def __init__(self, directory):
+        self.path = os.path.join(directory, MANIFEST_NAME)
+        self.directory = directory
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self.previous = json.load(f).get("notices", {})
+        except (OSError, ValueError):
+            self.previous = {}
+        self.current = {}
+
+    def is_current(self, filename, digest):
+        """
+        Returns True if filename was rendered from digest by an earlier run and is
+        still there, and keeps its entry for this run.
+        """
+        if self.previous.get(filename) != digest or not os.path.exists(os.path.join(self.directory, filename)):
+            return False
+        self.current[filename] = digest
+        return True
+
+    def record(self, filename, digest):
+        """
+        Notes that filename has just been rendered from digest.
+        """
+        self.current[filename] = digest
+
+    def save(self):
+        """
+        Writes this run's entries, replacing the old manifest in one step, and
+        deletes the notices earlier runs wrote that this run no longer has a row
+        for. Returns the number of files deleted.
+        """
+        stale = [name for name in self.previous if name not in self.current]
+        for name in stale:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+        temporary = self.path + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump({"notices": self.current}, f, indent=1, sort_keys=True)
+        os.replace(temporary, self.path)
+        return len(stale)
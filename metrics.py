@@ -0,0 +1,236 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+import math
+import threading
+import time
+
+# Content type of the Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Histogram buckets: seconds for latencies, bytes for encoded notice sizes
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = tuple(1024 * 2 ** i for i in range(4, 13))  # 16 KB to 4 MB
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+def _escape(value, quotes=True):
+    value = str(value).replace("\\", "\\\\").replace("\n", "\\n")
+    return value.replace('"', '\\"') if quotes else value
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {', '.join(self.labelnames) or '(none)'}, got {', '.join(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key):
+        return tuple(zip(self.labelnames, key))
+
+    def samples(self):
+        """
+        Yields (sample name, labels, value) for every label combination seen so far.
+        """
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield self.name, self._labels(key), value
+
+class Counter(_Metric):
+    """
+    A count that only goes up, per label combination.
+    """
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(_Metric):
+    """
+    A value that goes up and down, per label combination.
+    """
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels):
+        """
+        Adds one to the gauge for the duration of the with block.
+        """
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values in fixed buckets, per label combination.
+    An observation increments a single bucket; the cumulative counts Prometheus
+    expects are only added up when the metrics are scraped.
+    """
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # Counts per bucket (the last one is +Inf), then sum and count
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observes how many seconds the with block took.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        with self._lock:
+            values = [(key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items()]
+        for key, (counts, total, count) in values:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket", labels + (("le", _format_value(float(bound))),), cumulative
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, count
+
+class MetricsRegistry:
+    """
+    Holds an app's metrics and renders them in the Prometheus text format.
+    Counters, gauges and histograms are updated as requests and renders happen;
+    collectors are called at scrape time for values that already live elsewhere,
+    such as cache and queue statistics, so keeping those costs nothing per request.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _add(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._add(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._add(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, help_text, labelnames, buckets))
+
+    def collector(self, func):
+        """
+        Registers func, called on every scrape; it returns an iterable of
+        (name, kind, help, samples) with samples as a list of (labels dict, value).
+        Can be used as a decorator.
+        """
+        with self._lock:
+            self._collectors.append(func)
+        return func
+
+    def cache(self, name, cache, prefix="notice_cache"):
+        """
+        Exposes the hits, misses, hit ratio and size of any cache with a stats()
+        method returning "hits", "misses" and "entries", labelled cache=name.
+        cache may also be a function returning the cache, or None while there
+        is none yet; nothing is reported for it until there is.
+        """
+        def collect():
+            target = cache() if callable(cache) else cache
+            if target is None:
+                return []
+            stats = target.stats()
+            labels = {"cache": name}
+            lookups = stats["hits"] + stats["misses"]
+            families = [
+                (f"{prefix}_hits_total", "counter", "Cache lookups that found an entry.", [(labels, stats["hits"])]),
+                (f"{prefix}_misses_total", "counter", "Cache lookups that had to build the entry.", [(labels, stats["misses"])]),
+                (f"{prefix}_hit_ratio", "gauge", "Share of cache lookups that were hits.",
+                 [(labels, stats["hits"] / lookups if lookups else 0.0)]),
+                (f"{prefix}_entries", "gauge", "Entries currently held by the cache.", [(labels, stats["entries"])]),
+            ]
+            if "bytes" in stats:
+                families.append((f"{prefix}_bytes", "gauge", "Bytes currently held by the cache.", [(labels, stats["bytes"])]))
+            if "evictions" in stats:
+                families.append((f"{prefix}_evictions_total", "counter", "Entries evicted to stay within the size bound.",
+                                 [(labels, stats["evictions"])]))
+            return families
+        return self.collector(collect)
+
+    def render(self):
+        """
+        Returns every metric in the Prometheus text exposition format.
+        Families reported by several collectors (e.g. one per cache) are merged.
+        """
+        families = {}
+        with self._lock:
+            metrics = list(self._metrics)
+            collectors = list(self._collectors)
+        for metric in metrics:
+            families[metric.name] = (metric.kind, metric.help, list(metric.samples()))
+        for collect in collectors:
+            for name, kind, help_text, samples in collect():
+                rendered = [(name, tuple(labels.items()), value) for labels, value in samples]
+                if name in families:
+                    families[name][2].extend(rendered)
+                else:
+                    families[name] = (kind, help_text, rendered)
+
+        lines = []
+        for name, (kind, help_text, samples) in families.items():
+            lines.append(f"# HELP {name} {_escape(help_text, quotes=False)}")
+            lines.append(f"# TYPE {name} {kind}")
+            for sample_name, labels, value in samples:
+                lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,166 @@
+from PIL import ImageDraw
+from io import BytesIO
+from datetime import datetime
+import random
+
+from encoders import encode_notice
+from layout import layout_cache, layout_inks, replay_layout
+from letterhead import A4_HEIGHT, A4_WIDTH, draw_letterhead, letterhead_cache
+from notice_layout import RENT_REMINDER_LAYOUT
+from render_cache import notice_seed
+from render_modes import canvas_mode, finish_canvas
+from texture import DEFAULT_TEXTURE_DENSITY, apply_texture
+from vector import VectorCanvas, encode_vector
+
+def notice_slots(tenant, resident_name, unit_number, amount_due, due_date, issue_date, rng):
+    """
+    Returns the resident-specific text RENT_REMINDER_LAYOUT is filled with.
+    Reference numbers are drawn from rng, the notice's random source.
+    """
+    text = tenant["notice"]
+    ref_num = f"{text['reference_prefix']}/{rng.randint(1000, 9999)}/{issue_date.year}"
+    
+    resident_info = ""
+    if unit_number:
+        resident_info = f"{text['unit_label']}: {unit_number}"
+        if resident_name and resident_name.lower() != "resident":
+            resident_info = f"Resident: {resident_name}\n{resident_info}"
+    
+    # Body text - create more professional and detailed message
+    body_text = f"""This is a formal reminder that your rent payment for the current month is due by the {due_date} of this month."""
+    
+    if amount_due:
+        body_text += f" The amount due is {text['amount_format'].format(amount=amount_due)}."
+    
+    payment_methods = "\n".join(f"• {method}" for method in text["payment_methods"])
+    body_text += f"""
+
+Please ensure your payment is submitted on time to avoid any late fee charges that may be applicable according to your {text['agreement']}.
+
+Payment can be made through the following methods:
+{payment_methods}
+
+If you have already made your payment, kindly disregard this notice and provide proof of payment to the management office for our records.
+"""
+    
+    return {
+        "date": f"Date: {issue_date.strftime('%d/%m/%Y')}",
+        "reference": f"Reference: {ref_num}",
+        "resident_info": resident_info,
+        "greeting": f"Dear {resident_name},",
+        "body": body_text,
+        "footer_reference": f"Ref: {text['footer_reference_prefix']}-{issue_date.year}-{rng.randint(100, 999)}",
+    }
+
+def render_rent_reminder(tenant, resident_name="Resident", unit_number="", amount_due="", due_date=None,
+                         texture=None, issue_date=None, deterministic=False,
+                         texture_density=DEFAULT_TEXTURE_DENSITY, texture_seed=None, mode="RGB"):
+    """
+    Draws a formal rent reminder notice styled like an A4 letter, branded and
+    worded for tenant (a profile from tenants.tenant_registry).
+    due_date defaults to the tenant's usual due date.
+    texture forces the paper texture on or off; None leaves it to chance.
+    issue_date is the date printed on the notice (default: today). With deterministic,
+    reference numbers and texture come from the inputs and issue date, so the same
+    notice always renders to the same pixels. texture_density (dots per megapixel)
+    and texture_seed control the paper texture; by default the seed is drawn from
+    the same random source as the reference numbers.
+    mode is the image mode to render in: "RGB", "L" (grayscale), "P" (palette)
+    or "1" (black and white); see render_modes.
+    Returns the PIL image.
+    """
+    # The header, address block and footer disclaimer come from the cached letterhead,
+    # the positions of everything else from the compiled RENT_REMINDER_LAYOUT;
+    # only the resident-specific text is worked out here
+    branding = tenant["branding"]
+    text = tenant["notice"]
+    due_date = due_date or text["default_due_date"]
+    base, layout = letterhead_cache.get(branding, canvas_mode(mode))
+    ops = layout_cache.get(RENT_REMINDER_LAYOUT, tenant, layout, base.mode)
+    
+    # Reference numbers and texture are random unless the notice must be reproducible
+    issue_date = issue_date or datetime.now().date()
+    if deterministic:
+        rng = random.Random(notice_seed(branding, resident_name, unit_number, amount_due, due_date, issue_date))
+    else:
+        rng = random
+    slots = notice_slots(tenant, resident_name, unit_number, amount_due, due_date, issue_date, rng)
+    
+    image = base.copy()
+    replay_layout(ops, ImageDraw.Draw(image), slots)
+    
+    # Optional: Add subtle texture or noise for a more printed look
+    if texture is None:
+        texture = rng.random() > 0.5  # 50% chance to add noise
+    if texture:
+        # Add very slight noise to simulate paper texture, as one cached dot layer
+        if texture_seed is None:
+            texture_seed = rng.getrandbits(64)
+        apply_texture(image, texture_seed, density=texture_density)
+    
+    palette = letterhead_cache.palette(branding, layout_inks(RENT_REMINDER_LAYOUT)) if mode == "P" else None
+    return finish_canvas(image, mode, palette)
+
+def create_rent_reminder(tenant, resident_name="Resident", unit_number="", amount_due="", due_date=None,
+                         issue_date=None, deterministic=False, mode="RGB", profile=None):
+    """
+    Creates a formal rent reminder notice styled like an A4 letter for tenant.
+    issue_date, deterministic and mode are passed on to render_rent_reminder;
+    profile names the encoder profile (see encoders.ENCODER_PROFILES, default "print").
+    Returns the encoded image as a BytesIO object.
+    """
+    image = render_rent_reminder(
+        tenant,
+        resident_name=resident_name,
+        unit_number=unit_number,
+        amount_due=amount_due,
+        due_date=due_date,
+        issue_date=issue_date,
+        deterministic=deterministic,
+        mode=mode
+    )
+    
+    # Encode the image into a BytesIO object for direct serving
+    img_io = BytesIO(encode_notice(image, profile))
+    
+    return img_io
+
+def render_rent_reminder_vector(tenant, resident_name="Resident", unit_number="", amount_due="", due_date=None,
+                                issue_date=None, deterministic=False):
+    """
+    Draws the same notice as render_rent_reminder without rasterizing it: the
+    letterhead and RENT_REMINDER_LAYOUT are drawn onto a VectorCanvas, at the
+    positions the RGB notice uses. There is no paper texture.
+    Returns the VectorCanvas, for vector.encode_vector or vector.VectorPdf.
+    """
+    branding = tenant["branding"]
+    due_date = due_date or tenant["notice"]["default_due_date"]
+    canvas = VectorCanvas((A4_WIDTH, A4_HEIGHT))
+    layout = draw_letterhead(canvas, branding, canvas.paste_logo)
+    ops = layout_cache.get(RENT_REMINDER_LAYOUT, tenant, layout, "RGB")
+    
+    issue_date = issue_date or datetime.now().date()
+    if deterministic:
+        rng = random.Random(notice_seed(branding, resident_name, unit_number, amount_due, due_date, issue_date))
+    else:
+        rng = random
+    replay_layout(ops, canvas, notice_slots(tenant, resident_name, unit_number, amount_due, due_date, issue_date, rng))
+    return canvas
+
+def create_rent_reminder_vector(tenant, resident_name="Resident", unit_number="", amount_due="", due_date=None,
+                                issue_date=None, deterministic=False, vector_format="pdf"):
+    """
+    Creates the notice create_rent_reminder would, as a vector PDF or SVG
+    (vector_format, see vector.VECTOR_FORMATS) with the text kept as text.
+    Returns the document as a BytesIO object.
+    """
+    canvas = render_rent_reminder_vector(
+        tenant,
+        resident_name=resident_name,
+        unit_number=unit_number,
+        amount_due=amount_due,
+        due_date=due_date,
+        issue_date=issue_date,
+        deterministic=deterministic
+    )
+    return BytesIO(encode_vector(canvas, vector_format))
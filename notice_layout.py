@@ -0,0 +1,33 @@
+"""
+The notice template and renderer version, kept apart from notice.py so the web
+server can key its caches on them without loading Pillow.
+"""
+
+# Bump when a change to the drawing code, rather than to RENT_REMINDER_LAYOUT or a
+# tenant profile, changes how notices look, so incremental batch runs redraw them
+# and the server's render caches stop serving notices drawn by the old code
+RENDERER_VERSION = 3
+
+# Everything drawn over the letterhead, top to bottom (see layout.compile_layout).
+# Lengths are in thirds of the scale factor unless named _px; fixed text in braces
+# comes from the tenant's notice wording, slots are filled on every render
+RENT_REMINDER_LAYOUT = {
+    "name": "rent_reminder",
+    "elements": (
+        # Date and reference number at the top right of the content area
+        {"draw": "text", "slot": "date", "align": "right", "at": "content_start_y"},
+        {"draw": "text", "slot": "reference", "align": "right", "at": "content_start_y", "line_below_px": 10},
+        # Resident details in a subtle box, below the address block
+        {"draw": "box", "slot": "resident_info", "at": "body_start_y", "padding": 10, "extra_height": 20,
+         "after": 20, "fill": (248, 248, 248), "outline": (220, 220, 220)},
+        {"draw": "text", "slot": "greeting", "advance": True, "after": 15},
+        {"draw": "paragraphs", "slot": "body", "line_gap_px": 5, "paragraph_gap": 15},
+        # Closing, signature space, then the manager's name and title
+        {"draw": "text", "text": "Thank you for your prompt attention to this matter.", "before": 30},
+        {"draw": "text", "text": "{signature}", "before": 80},
+        {"draw": "text", "text": "{manager}", "font": "small", "before": 25},
+        # Reference number next to the footer disclaimer
+        {"draw": "text", "slot": "footer_reference", "align": "right", "at": "footer_bottom", "before_px": 10,
+         "font": "footer", "color": (100, 100, 100)},
+    ),
+}
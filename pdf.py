@@ -0,0 +1,302 @@
+from PIL import Image, ImageChops, ImageDraw
+import functools
+import io
+import struct
+import zlib
+
+# Rows of unchanged pixels shorter than this are folded into the surrounding strip
+STRIP_GAP = 40
+
+def png_stream(image, compress_level=6):
+    """
+    Encodes an L, RGB or 1 image for a PDF image XObject.
+    Pillow's PNG encoder already produces a zlib stream of PNG-filtered rows, which
+    PDF reads directly through FlateDecode with a PNG predictor, so the IDAT chunks
+    are reused as-is. Returns (data, colors, bits_per_component).
+    """
+    png = io.BytesIO()
+    image.save(png, 'PNG', compress_level=compress_level)
+    data = png.getvalue()
+
+    pos = 8  # PNG signature
+    idat = []
+    bit_depth = color_type = None
+    while pos < len(data):
+        length, chunk_type = struct.unpack(">I4s", data[pos:pos + 8])
+        chunk = data[pos + 8:pos + 8 + length]
+        if chunk_type == b"IHDR":
+            bit_depth, color_type = chunk[8], chunk[9]
+        elif chunk_type == b"IDAT":
+            idat.append(chunk)
+        pos += length + 12
+
+    colors = {0: 1, 2: 3}[color_type]
+    return b"".join(idat), colors, bit_depth
+
+def page_strips(page, base, compress_level=6):
+    """
+    Finds the bands of page that differ from the shared letterhead base and
+    encodes each as a cropped image. Returns a list of
+    (x, y, width, height, (data, colors, bits_per_component)) tuples in pixels.
+    """
+    diff = ImageChops.difference(page, base)
+    # The largest change in any channel, so a faint one-channel change isn't
+    # rounded down to zero the way a conversion to L would
+    if diff.mode != 'L':
+        diff = functools.reduce(ImageChops.lighter, diff.split())
+
+    # One value per row: 1 wherever the row has any changed pixel, however few
+    rows = diff.getprojection()[1]
+
+    bands = []
+    start = None
+    for y, value in enumerate(rows):
+        if value and start is None:
+            start = y
+        elif not value and start is not None:
+            bands.append([start, y])
+            start = None
+    if start is not None:
+        bands.append([start, len(rows)])
+
+    merged = []
+    for band in bands:
+        if merged and band[0] - merged[-1][1] < STRIP_GAP:
+            merged[-1][1] = band[1]
+        else:
+            merged.append(band)
+
+    strips = []
+    for top, bottom in merged:
+        bbox = diff.crop((0, top, diff.width, bottom)).getbbox()
+        if bbox is None:
+            continue
+        box = (bbox[0], top + bbox[1], bbox[2], top + bbox[3])
+        strip = page.crop(box)
+        # The variable fields are all black and greys, so most strips fit in one channel
+        if strip.mode == 'RGB':
+            gray = strip.convert('L')
+            if ImageChops.difference(strip, gray.convert('RGB')).getbbox() is None:
+                strip = gray
+        strips.append((box[0], box[1], strip.width, strip.height, png_stream(strip, compress_level)))
+    return strips
+
+def paste_strips(base, strips):
+    """
+    Returns base with the strips from page_strips pasted back in, the page a
+    viewer shows; it should equal the page the strips were cut from.
+    """
+    page = base.copy()
+    for x, y, width, height, (data, colors, bits) in strips:
+        # The strip's stream is the IDAT of a PNG, so a PNG is rebuilt around it
+        header = struct.pack(">IIBBBBB", width, height, bits, 2 if colors == 3 else 0, 0, 0, 0)
+        png = b"\x89PNG\r\n\x1a\n" + b"".join(
+            struct.pack(">I", len(chunk)) + kind + chunk + struct.pack(">I", zlib.crc32(kind + chunk))
+            for kind, chunk in ((b"IHDR", header), (b"IDAT", data), (b"IEND", b""))
+        )
+        page.paste(Image.open(io.BytesIO(png)).convert(page.mode), (x, y))
+    return page
+
+class PdfWriter:
+    """
+    Minimal streaming PDF writer for raster notices.
+    Objects are written as soon as they are added, so pages can be sent while
+    later pages are still rendering; the page tree and xref go out on close().
+    """
+
+    def __init__(self, fp, dpi=300):
+        self.fp = fp
+        self.dpi = dpi
+        self._offset = 0
+        self._offsets = {}
+        self._next_id = 3  # 1 is the catalog, 2 the page tree
+        self._pages = []
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _write(self, data):
+        self.fp.write(data)
+        self._offset += len(data)
+
+    def _add_object(self, body, stream=None, obj_id=None):
+        if obj_id is None:
+            obj_id = self._next_id
+            self._next_id += 1
+        self._offsets[obj_id] = self._offset
+        self._write(f"{obj_id} 0 obj\n".encode())
+        if stream is None:
+            self._write(body + b"\nendobj\n")
+        else:
+            self._write(body[:-2] + f" /Length {len(stream)} >>\nstream\n".encode())
+            self._write(stream)
+            self._write(b"\nendstream\nendobj\n")
+        return obj_id
+
+    def add_image(self, image_or_stream, width=None, height=None, mask=None):
+        """
+        Embeds an image once and returns its object id, for use on any number of pages.
+        Accepts a PIL image or a (data, colors, bits_per_component) tuple from png_stream.
+        mask, an L image of the same size, is embedded as the image's soft mask (alpha).
+        """
+        if isinstance(image_or_stream, Image.Image):
+            width, height = image_or_stream.size
+            image_or_stream = png_stream(image_or_stream)
+        data, colors, bits = image_or_stream
+        color_space = "/DeviceRGB" if colors == 3 else "/DeviceGray"
+        smask = f" /SMask {self.add_image(mask)} 0 R" if mask is not None else ""
+        body = (
+            f"<< /Type /XObject /Subtype /Image /Width {width} /Height {height} "
+            f"/ColorSpace {color_space} /BitsPerComponent {bits} /Filter /FlateDecode "
+            f"/DecodeParms << /Predictor 15 /Colors {colors} /BitsPerComponent {bits} /Columns {width} >>{smask} >>"
+        ).encode()
+        return self._add_object(body, data)
+
+    def add_font(self, font):
+        """
+        Adds a reference to the TrueType font of a Pillow FreeTypeFont, with WinAnsi
+        encoding, and returns its object id. The font file isn't embedded; its
+        advance widths are, so viewers that substitute another font still place
+        every glyph where it was laid out.
+        """
+        family, style = font.getname()
+        base_font = family.replace(" ", "")
+        if style and style not in ("Regular", "Book", "Roman"):
+            base_font += f",{style.replace(' ', '')}"
+
+        # Widths and metrics in the 1/1000 em units PDF fonts use
+        metrics = font.font_variant(size=1000)
+        ascent, descent = metrics.getmetrics()
+        widths = []
+        for code in range(32, 256):
+            try:
+                char = bytes([code]).decode("cp1252")
+            except UnicodeDecodeError:
+                widths.append("0")
+                continue
+            widths.append(f"{metrics.getlength(char):.0f}")
+
+        descriptor_id = self._add_object((
+            f"<< /Type /FontDescriptor /FontName /{base_font} /Flags 34 "
+            f"/FontBBox [0 {-descent} 1000 {ascent}] /ItalicAngle 0 /Ascent {ascent} /Descent {-descent} "
+            f"/CapHeight {ascent} /StemV 80 >>"
+        ).encode())
+        return self._add_object((
+            f"<< /Type /Font /Subtype /TrueType /BaseFont /{base_font} /Encoding /WinAnsiEncoding "
+            f"/FirstChar 32 /LastChar 255 /Widths [{' '.join(widths)}] /FontDescriptor {descriptor_id} 0 R >>"
+        ).encode())
+
+    def add_content_page(self, size, content, images=(), fonts=(), compress=True):
+        """
+        Adds a page of the given size in points, drawn by the PDF content stream
+        content (bytes), Flate-compressed unless compress is false. images and
+        fonts are the object ids the content refers to as /Im0, /Im1, ... and /F0, /F1, ...
+        """
+        resources = []
+        if images:
+            resources.append("/XObject << " + " ".join(f"/Im{i} {image_id} 0 R" for i, image_id in enumerate(images)) + " >>")
+        if fonts:
+            resources.append("/Font << " + " ".join(f"/F{i} {font_id} 0 R" for i, font_id in enumerate(fonts)) + " >>")
+        if compress:
+            content_id = self._add_object(b"<< /Filter /FlateDecode >>", zlib.compress(content))
+        else:
+            content_id = self._add_object(b"<< >>", content)
+
+        page_id = self._add_object((
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {size[0]:.2f} {size[1]:.2f}] "
+            f"/Resources << {' '.join(resources)} >> /Contents {content_id} 0 R >>"
+        ).encode())
+        self._pages.append(page_id)
+        return page_id
+
+    def add_page(self, size, placements):
+        """
+        Adds a page of the given pixel size. placements is a list of
+        (image_id, x, y, width, height) in pixels from the top-left corner,
+        drawn in order.
+        """
+        scale = 72 / self.dpi
+        page_w, page_h = size[0] * scale, size[1] * scale
+
+        ops = []
+        for i, (image_id, x, y, w, h) in enumerate(placements):
+            ops.append(
+                f"q {w * scale:.3f} 0 0 {h * scale:.3f} {x * scale:.3f} "
+                f"{page_h - (y + h) * scale:.3f} cm /Im{i} Do Q"
+            )
+        return self.add_content_page(
+            (page_w, page_h), "\n".join(ops).encode(), images=[placement[0] for placement in placements],
+            compress=False
+        )
+
+    def close(self):
+        """
+        Writes the page tree, catalog, xref table and trailer.
+        """
+        kids = " ".join(f"{page_id} 0 R" for page_id in self._pages)
+        self._add_object(f"<< /Type /Pages /Kids [{kids}] /Count {len(self._pages)} >>".encode(), obj_id=2)
+        self._add_object(b"<< /Type /Catalog /Pages 2 0 R >>", obj_id=1)
+
+        xref_offset = self._offset
+        count = self._next_id
+        lines = [f"xref\n0 {count}\n", "0000000000 65535 f \n"]
+        for obj_id in range(1, count):
+            lines.append(f"{self._offsets[obj_id]:010d} 00000 n \n")
+        lines.append(f"trailer\n<< /Size {count} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n")
+        self._write("".join(lines).encode())
+
+class NoticePdf:
+    """
+    Multi-page PDF of notices sharing one letterhead.
+    The base image is embedded once and every page draws it, then overlays only
+    the strips that differ for that resident.
+    """
+
+    def __init__(self, fp, base, dpi=300):
+        """
+        base is the letterhead image, or (width, height, stream) of one already
+        encoded by png_stream, e.g. in a render worker; add_page needs the image.
+        """
+        self.writer = PdfWriter(fp, dpi=dpi)
+        if isinstance(base, tuple):
+            width, height, self._base_stream = base
+            self.size = (width, height)
+            self.base = None
+        else:
+            self.size = base.size
+            self.base = base
+            self._base_stream = None
+        self._base_id = None
+
+    def add_strips(self, strips):
+        """
+        Adds a page from the output of page_strips.
+        """
+        if self._base_id is None:
+            self._base_id = self.writer.add_image(self._base_stream or self.base, *self.size)
+        placements = [(self._base_id, 0, 0, self.size[0], self.size[1])]
+        for x, y, w, h, stream in strips:
+            placements.append((self.writer.add_image(stream, w, h), x, y, w, h))
+        return self.writer.add_page(self.size, placements)
+
+    def add_page(self, page):
+        """
+        Adds a rendered notice drawn over the same base.
+        """
+        return self.add_strips(page_strips(page, self.base))
+
+    def add_text_pages(self, lines, font, margin=150):
+        """
+        Adds plain pages without the letterhead listing lines of text in font (a
+        Pillow font), e.g. the rows of a batch that failed to render, on as many
+        pages as they take.
+        """
+        line_height = int(font.size * 1.5)
+        per_page = max(1, (self.size[1] - 2 * margin) // line_height)
+        for start in range(0, len(lines), per_page):
+            page = Image.new('L', self.size, 255)
+            draw = ImageDraw.Draw(page)
+            for i, line in enumerate(lines[start:start + per_page]):
+                draw.text((margin, margin + i * line_height), line, font=font, fill=0)
+            self.writer.add_page(self.size, [(self.writer.add_image(page), 0, 0, self.size[0], self.size[1])])
+
+    def close(self):
+        self.writer.close()
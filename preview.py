@@ -0,0 +1,70 @@
+from io import BytesIO
+
+# Pillow is imported by the functions that use it; the web server reads the
+# constants here at startup, long before it renders anything
+
+PRINT_DPI = 300
+
+# Roughly the 800 px the preview pane shows an A4 page at
+DEFAULT_PREVIEW_DPI = 100
+MIN_PREVIEW_DPI, MAX_PREVIEW_DPI = 50, PRINT_DPI
+
+PREVIEW_FORMATS = {
+    "webp": ("WEBP", "image/webp"),
+    "jpeg": ("JPEG", "image/jpeg"),
+}
+
+def can_write_webp():
+    """
+    Returns whether this Pillow build can write WebP. This loads Pillow, so the
+    web server asks a render worker instead (see render_tasks.warm_render_worker).
+    """
+    from PIL import features
+    return features.check("webp")
+
+def resolve_preview_format(image_format=None, webp=None):
+    """
+    Returns image_format if it is a known preview format, otherwise the default:
+    WebP when Pillow can write it, JPEG when it can't. webp says whether it can;
+    None checks this process's Pillow.
+    """
+    if image_format in PREVIEW_FORMATS:
+        return image_format
+    if webp is None:
+        webp = can_write_webp()
+    return "webp" if webp else "jpeg"
+
+def clamp_dpi(dpi):
+    """
+    Returns dpi limited to MIN_PREVIEW_DPI..MAX_PREVIEW_DPI, the resolution a preview
+    requested at dpi is actually rendered at.
+    """
+    return max(MIN_PREVIEW_DPI, min(MAX_PREVIEW_DPI, int(dpi)))
+
+def scale_to_dpi(image, dpi):
+    """
+    Scales a print-resolution notice down to dpi.
+    The page is laid out once at print resolution and only resampled, so the
+    preview shows exactly the line breaks and spacing that will be printed.
+    """
+    dpi = clamp_dpi(dpi)
+    if dpi == PRINT_DPI:
+        return image
+    if PRINT_DPI % dpi == 0:
+        return image.reduce(PRINT_DPI // dpi)
+    from PIL import Image
+
+    size = (round(image.width * dpi / PRINT_DPI), round(image.height * dpi / PRINT_DPI))
+    return image.resize(size, Image.LANCZOS, reducing_gap=2.0)
+
+def encode_preview(image, dpi=DEFAULT_PREVIEW_DPI, image_format=None, quality=80):
+    """
+    Returns (data, mimetype) for a compact screen preview of a rendered notice.
+    image_format is "webp" or "jpeg"; unknown or missing values fall back to the default.
+    """
+    pil_format, mimetype = PREVIEW_FORMATS[resolve_preview_format(image_format)]
+
+    preview = scale_to_dpi(image, dpi)
+    img_io = BytesIO()
+    preview.convert("RGB").save(img_io, pil_format, quality=quality)
+    return img_io.getvalue(), mimetype
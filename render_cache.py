@@ -0,0 +1,117 @@
+from collections import OrderedDict
+import hashlib
+import json
+import threading
+
+def notice_seed(*fields):
+    """
+    Derives a stable 64-bit seed from a notice's inputs (including its issue date),
+    used for the reference numbers and paper texture in deterministic renders.
+    """
+    payload = json.dumps(fields, sort_keys=True, default=str).encode()
+    return int.from_bytes(hashlib.sha256(payload).digest()[:8], "big")
+
+def content_etag(data):
+    """
+    Returns a strong HTTP entity tag for data: a hash of the bytes themselves, so
+    every process that renders the same notice (or reads the same file) agrees on it.
+    """
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+class RenderCache:
+    """
+    Size-bounded LRU cache of encoded notices.
+    Only deterministic renders belong in here: the same key must always
+    produce the same bytes.
+
+    The content ETag of each entry is kept too, and outlives the bytes: the
+    max_etags most recently stored ones are remembered after their notice is
+    evicted, so a client revalidating a notice it already has can be answered
+    without rendering it again.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_etags=65536):
+        self.max_bytes = max_bytes
+        self.max_etags = max_etags
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._etags = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Returns the cached bytes for key, or None.
+        """
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def etag(self, key):
+        """
+        Returns the content ETag of the bytes stored under key, or None if they
+        were never stored or have been forgotten. Doesn't count as a lookup.
+        """
+        with self._lock:
+            return self._etags.get(key)
+
+    def put(self, key, data):
+        """
+        Stores data under key, evicting least recently used entries to stay within max_bytes,
+        and returns its content ETag. Entries larger than the whole budget only have
+        their ETag remembered.
+        """
+        etag = content_etag(data)
+        size = len(data)
+        with self._lock:
+            self._etags[key] = etag
+            self._etags.move_to_end(key)
+            while len(self._etags) > self.max_etags:
+                self._etags.popitem(last=False)
+            if size > self.max_bytes:
+                return etag
+
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= len(previous)
+            self._entries[key] = data
+            self.current_bytes += size
+
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= len(evicted)
+                self.evictions += 1
+        return etag
+
+    def stats(self):
+        """
+        Returns hit/miss/eviction counters, the current size and the number of remembered ETags.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "etags": len(self._etags),
+        }
+
+    def clear(self):
+        """
+        Drops every entry and resets the counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._etags.clear()
+            self.current_bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
@@ -0,0 +1,91 @@
+
+# Modes a notice can be rendered in:
+#   RGB - full colour, as printed originally
+#   L   - 8-bit grayscale, a third of the memory; the accent colour becomes grey
+#   P   - 8-bit palette fixed per letterhead, keeping the accent colour; drawn in RGB
+#   1   - bilevel black and white, for laser printers and fax
+RENDER_MODES = ("RGB", "L", "P", "1")
+
+# Palette notices keep pure black, white and the greys in steps of this for the
+# edges of text exactly; the letterhead's most common colours fill the rest
+PALETTE_GREY_STEP = 8
+
+# Letterhead colours in the palette differ from every other entry by at least this in some channel
+PALETTE_SPACING = 10
+
+# Bilevel notices are thresholded from grayscale at this level
+BILEVEL_THRESHOLD = 128
+
+def check_mode(mode):
+    """
+    Returns mode if it is one of RENDER_MODES, otherwise raises ValueError.
+    """
+    if mode not in RENDER_MODES:
+        raise ValueError(f"Unknown render mode {mode!r}; expected one of {', '.join(RENDER_MODES)}")
+    return mode
+
+def canvas_mode(mode):
+    """
+    Returns the mode a notice is drawn in for a given output mode.
+    Bilevel notices are drawn in grayscale so text keeps smooth edges until the
+    final threshold, and palette notices in RGB so text is antialiased and measured
+    as in RGB before they are quantized; L and RGB are drawn as-is.
+    """
+    return {"1": "L", "P": "RGB"}.get(check_mode(mode), mode)
+
+def convert_base(image, mode):
+    """
+    Converts an RGB letterhead to the canvas mode notices are drawn on.
+    """
+    if mode == "L":
+        return image.convert("L")
+    return image
+
+def notice_palette(letterhead, inks=()):
+    """
+    Returns the palette image finish_canvas quantizes palette notices to, for a
+    letterhead (RGB) and the colours the notice draws over it. The inks, black,
+    white and a ramp of greys are kept exactly; the letterhead's most common other
+    colours fill the palette up to 256.
+    """
+    from PIL import Image
+
+    greys = ((value, value, value) for value in range(0, 256, PALETTE_GREY_STEP))
+    colors = dict.fromkeys([(255, 255, 255), (0, 0, 0), *map(tuple, inks), *greys])
+    # Most common first, ties in colour order, so the palette is the same in every process.
+    # Pillow maps a pixel to the entry nearest the low corner of its 4x4x4 cell of
+    # colours, so an entry within a few values of another can take that one's pixels
+    # (white would turn into a 252 grey); letterhead colours that close are left out
+    for _, color in sorted(letterhead.getcolors(letterhead.width * letterhead.height), reverse=True):
+        if len(colors) >= 256:
+            break
+        if all(max(abs(a - b) for a, b in zip(color, kept)) >= PALETTE_SPACING for kept in colors):
+            colors[color] = None
+
+    palette = Image.new("P", (1, 1))
+    palette.putpalette([value for color in colors for value in color])
+    return palette
+
+def ink(color, mode):
+    """
+    Returns the fill value for an RGB colour on a canvas of the given mode.
+    RGB canvases take the colour itself; grayscale takes its luma, the same value Image.convert("L") gives for greys.
+    """
+    if mode == "L":
+        r, g, b = color
+        return (r * 299 + g * 587 + b * 114) // 1000
+    return color
+
+def finish_canvas(image, mode, palette=None):
+    """
+    Turns a drawn canvas into the requested output mode. Palette notices are
+    quantized to palette, from notice_palette.
+    """
+    if mode == "1":
+        return image.point(lambda value: 255 if value >= BILEVEL_THRESHOLD else 0, "1")
+    if mode == "P":
+        from PIL import Image
+
+        # Undithered, so white paper and flat fills map to one exact palette entry
+        return image.quantize(palette=palette, dither=Image.Dither.NONE)
+    return image
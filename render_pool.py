@@ -0,0 +1,205 @@
+import atexit
+import multiprocessing
+import queue
+import threading
+
+# Worker processes are started fresh rather than forked from a threaded web server
+DEFAULT_START_METHOD = "spawn"
+
+class RenderPoolError(RuntimeError):
+    """
+    Raised when a render worker dies before returning a result.
+    """
+
+class RenderTimeout(RenderPoolError):
+    """
+    Raised when no worker is free in time, or a render takes longer than the timeout.
+    """
+
+def _worker_main(conn, initializer):
+    """
+    Loop run by every worker process: warm up once, then render tasks until told to stop.
+    """
+    if initializer is not None:
+        initializer()
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        func, args, kwargs = task
+        try:
+            result = ("ok", func(*args, **kwargs))
+        except Exception as e:
+            result = ("error", e)
+        try:
+            conn.send(result)
+        except Exception as e:
+            # The exception itself couldn't be pickled; send its description instead
+            conn.send(("error", RenderPoolError(f"{type(e).__name__}: {e}")))
+
+class _Worker:
+    def __init__(self, context, initializer):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, initializer), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.renders = 0
+
+    def stop(self, timeout=1.0):
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+class RenderPool:
+    """
+    Persistent pool of render processes, so renders use every core instead of
+    sharing one interpreter with the web server's threads.
+
+    Each worker runs initializer once at start (to load fonts, logo and letterhead)
+    and keeps those warm across renders. A worker is replaced by a fresh one after
+    max_renders renders, so memory growth in long-lived workers is bounded, and
+    also when a render exceeds its timeout or the worker dies. With processes=0
+    every render runs in the calling thread instead.
+    Workers are started by the first render.
+    """
+
+    def __init__(self, processes=None, initializer=None, max_renders=500, timeout=30.0,
+                 start_method=DEFAULT_START_METHOD):
+        self.processes = multiprocessing.cpu_count() if processes is None else processes
+        self.initializer = initializer
+        self.max_renders = max_renders
+        self.timeout = timeout
+        self.renders = 0
+        self.recycled = 0
+        self.timeouts = 0
+        self.wait_timeouts = 0
+        self.crashes = 0
+        self._context = multiprocessing.get_context(start_method)
+        self._idle = queue.Queue()
+        self._workers = set()
+        self._started = False
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def _spawn(self):
+        worker = _Worker(self._context, self.initializer)
+        with self._lock:
+            self._workers.add(worker)
+        return worker
+
+    def _discard(self, worker, kill):
+        with self._lock:
+            self._workers.discard(worker)
+        if kill:
+            worker.kill()
+        else:
+            worker.stop()
+
+    def _start(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        for _ in range(self.processes):
+            self._idle.put(self._spawn())
+
+    def run(self, func, *args, timeout=None, **kwargs):
+        """
+        Runs func(*args, **kwargs) in a worker process and returns its result.
+        func, its arguments and its result must be picklable; func must be a
+        module-level function. Exceptions raised by func are re-raised here.
+        Raises RenderTimeout if no worker is free within timeout seconds, or the
+        render itself takes longer (the worker is then killed and replaced).
+        """
+        if self.processes <= 0:
+            return func(*args, **kwargs)
+        if not self._started:
+            self._start()
+        timeout = self.timeout if timeout is None else timeout
+
+        try:
+            worker = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            with self._lock:
+                self.wait_timeouts += 1
+            raise RenderTimeout(f"No render worker became free within {timeout}s")
+
+        replace = False
+        try:
+            try:
+                worker.conn.send((func, args, kwargs))
+                finished = worker.conn.poll(timeout)
+                if finished:
+                    status, value = worker.conn.recv()
+            except (EOFError, OSError) as e:
+                replace = True
+                with self._lock:
+                    self.crashes += 1
+                raise RenderPoolError(f"Render worker exited unexpectedly: {e}")
+
+            if not finished:
+                replace = True
+                with self._lock:
+                    self.timeouts += 1
+                raise RenderTimeout(f"Render did not finish within {timeout}s")
+
+            worker.renders += 1
+            with self._lock:
+                self.renders += 1
+            if status == "error":
+                raise value
+            return value
+        finally:
+            if replace:
+                self._discard(worker, kill=True)
+                worker = self._spawn()
+            elif worker.renders >= self.max_renders:
+                # Recycle: let the worker exit cleanly and start a fresh one in its place
+                self._discard(worker, kill=False)
+                worker = self._spawn()
+                with self._lock:
+                    self.recycled += 1
+            self._idle.put(worker)
+
+    def stats(self):
+        """
+        Returns the pool size and render, recycle, timeout and crash counters.
+        timeouts counts renders that ran out of time, whose workers were replaced;
+        wait_timeouts counts renders that never got a worker, which replace nothing.
+        """
+        return {
+            "processes": self.processes,
+            "alive": len(self._workers),
+            "idle": self._idle.qsize(),
+            "renders": self.renders,
+            "recycled": self.recycled,
+            "timeouts": self.timeouts,
+            "wait_timeouts": self.wait_timeouts,
+            "crashes": self.crashes,
+        }
+
+    def close(self):
+        """
+        Stops every worker. The pool starts again on the next render.
+        """
+        with self._lock:
+            workers = list(self._workers)
+            self._workers.clear()
+            self._started = False
+        for worker in workers:
+            worker.stop()
+        self._idle = queue.Queue()
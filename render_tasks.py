@@ -0,0 +1,168 @@
+"""
+The functions render worker processes run. They take and return only plain
+values so they can be sent through the pool, and each returns its result with
+the seconds spent per phase, for the serving process's metrics.
+
+Pillow and the renderer are imported inside the functions, so the web server,
+which imports this module only to hand the functions to the pool, never loads
+them. Workers are spawned, which re-imports the main module of the process that
+started them: under `python app.py` that is app.py, as __mp_main__, so each
+worker does load Flask and build an app it never serves. Under a WSGI server
+the main module is the server's launcher, which costs a worker next to nothing.
+"""
+import os
+import time
+
+from tenants import tenant_registry
+
+# Tenant whose letterhead a worker draws when it starts; the server's DEFAULT_TENANT
+DEFAULT_TENANT = os.environ.get('DEFAULT_TENANT', 'brandon')
+
+def get_tenant(tenant_id=None):
+    """
+    Returns the profile of tenant_id (default: DEFAULT_TENANT).
+    Raises TenantError if there is no such tenant.
+    """
+    return tenant_registry.require(tenant_id or DEFAULT_TENANT)
+
+class LetterheadChanged(RuntimeError):
+    """
+    Raised by render_notice_strips when the worker's letterhead isn't the one the
+    batch PDF embedded, because the tenant's branding or logo changed mid-batch.
+    """
+
+def letterhead_revision(tenant):
+    """
+    Returns what a letterhead drawn for tenant depends on besides the code: the
+    profile's revision and the logo file's.
+    """
+    from logo_cache import logo_revision
+
+    return tenant["revision"], logo_revision(tenant["branding"]["logo_path"])
+
+def warm_render_worker(tenant_id=None):
+    """
+    Loads fonts and tenant_id's (default: DEFAULT_TENANT's) logo and letterhead once
+    when a render worker starts. Other tenants are loaded by the first render for them.
+    Returns what the worker's Pillow can write, {"webp": bool}, which the web server
+    asks a worker for rather than loading Pillow itself.
+    """
+    from fonts import font_registry
+    from letterhead import SCALE_FACTOR, letterhead_cache
+    from preview import can_write_webp
+
+    letterhead_cache.get(get_tenant(tenant_id)["branding"])
+    font_registry.notice_fonts(SCALE_FACTOR)
+    return {"webp": can_write_webp()}
+
+def render_notice(tenant_id, resident_name, unit_number, amount_due, due_date, issue_date=None,
+                  deterministic=False, mode="RGB", profile=None):
+    """
+    Renders and encodes one notice, returning the encoded bytes and phase timings.
+    """
+    from encoders import encode_notice
+    from notice import render_rent_reminder
+
+    start = time.perf_counter()
+    image = render_rent_reminder(
+        get_tenant(tenant_id),
+        resident_name=resident_name,
+        unit_number=unit_number,
+        amount_due=amount_due,
+        due_date=due_date,
+        issue_date=issue_date,
+        deterministic=deterministic,
+        mode=mode
+    )
+    rendered = time.perf_counter()
+    data = encode_notice(image, profile)
+    return data, {"render": rendered - start, "encode": time.perf_counter() - rendered}
+
+def render_vector_notice(tenant_id, resident_name, unit_number, amount_due, due_date, issue_date=None,
+                         deterministic=False, vector_format="pdf"):
+    """
+    Draws one notice as a vector PDF or SVG, returning the document bytes and phase timings.
+    """
+    from notice import render_rent_reminder_vector
+    from vector import encode_vector
+
+    start = time.perf_counter()
+    canvas = render_rent_reminder_vector(
+        get_tenant(tenant_id),
+        resident_name=resident_name,
+        unit_number=unit_number,
+        amount_due=amount_due,
+        due_date=due_date,
+        issue_date=issue_date,
+        deterministic=deterministic
+    )
+    rendered = time.perf_counter()
+    data = encode_vector(canvas, vector_format)
+    return data, {"render": rendered - start, "encode": time.perf_counter() - rendered}
+
+def render_notice_preview(tenant_id, resident_name, unit_number, amount_due, due_date, issue_date, dpi, image_format):
+    """
+    Renders one deterministic notice and returns its encoded screen preview and phase timings.
+    """
+    from notice import render_rent_reminder
+    from preview import encode_preview
+
+    start = time.perf_counter()
+    image = render_rent_reminder(
+        get_tenant(tenant_id),
+        resident_name=resident_name,
+        unit_number=unit_number,
+        amount_due=amount_due,
+        due_date=due_date,
+        issue_date=issue_date,
+        deterministic=True
+    )
+    rendered = time.perf_counter()
+    data, _ = encode_preview(image, dpi=dpi, image_format=image_format)
+    return data, {"render": rendered - start, "encode": time.perf_counter() - rendered}
+
+def render_pdf_letterhead(tenant_id):
+    """
+    Encodes the tenant's letterhead for a batch PDF, returning
+    (revision, width, height, stream) and phase timings. The revision is passed to
+    render_notice_strips, so every page's strips are cut against this letterhead.
+    """
+    from letterhead import letterhead_cache
+    from pdf import png_stream
+
+    tenant = get_tenant(tenant_id)
+    start = time.perf_counter()
+    revision = letterhead_revision(tenant)
+    base, _ = letterhead_cache.get(tenant["branding"])
+    rendered = time.perf_counter()
+    letterhead = (revision, base.width, base.height, png_stream(base))
+    return letterhead, {"render": rendered - start, "encode": time.perf_counter() - rendered}
+
+def render_notice_strips(tenant_id, resident_name, unit_number, amount_due, due_date, issue_date=None,
+                         base_revision=None):
+    """
+    Renders one untextured notice dated issue_date (default: today) and returns the
+    strips that differ from the letterhead, for a batch PDF, with phase timings.
+    Raises LetterheadChanged if base_revision is given and the letterhead is no
+    longer that revision from render_pdf_letterhead.
+    """
+    from letterhead import letterhead_cache
+    from notice import render_rent_reminder
+    from pdf import page_strips
+
+    tenant = get_tenant(tenant_id)
+    if base_revision is not None and letterhead_revision(tenant) != base_revision:
+        raise LetterheadChanged("The letterhead changed while the PDF was being generated; generate it again")
+    start = time.perf_counter()
+    page = render_rent_reminder(
+        tenant,
+        resident_name=resident_name,
+        unit_number=unit_number,
+        amount_due=amount_due,
+        due_date=due_date,
+        issue_date=issue_date,
+        texture=False
+    )
+    rendered = time.perf_counter()
+    strips = page_strips(page, letterhead_cache.get(tenant["branding"])[0])
+    return strips, {"render": rendered - start, "encode": time.perf_counter() - rendered}
@@ -1,382 +1,298 @@
-from PIL import Image, ImageDraw, ImageFont
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from datetime import date
+from itertools import islice
+import argparse
 import os
-import urllib.request
-from io import BytesIO
-from datetime import datetime
-import random
+import sys
+import time
 
-def get_logo(local_path="ywca_logo.png", 
-             download_url="https://ywcanairobi.org/wp-content/uploads/2022/05/YWCA-logo.png"):
-    """
-    Attempts to load the logo from a local file.
-    If the file doesn't exist, tries to download it from the provided URL.
-    """
-    if os.path.exists(local_path):
-        try:
-            return Image.open(local_path).convert("RGBA")
-        except Exception as e:
-            print(f"Error opening local logo file '{local_path}': {e}")
-    
-    try:
-        with urllib.request.urlopen(download_url) as response:
-            logo_data = response.read()
-        logo = Image.open(BytesIO(logo_data)).convert('RGBA')
-        logo.save(local_path)
-        return logo
-    except Exception as e:
-        print(f"Could not download logo from URL: {e}")
-        return None
+from batch import BadRow, notice_filename, read_roster
+from encoders import ENCODER_PROFILES, profile_type, write_notice
+from letterhead import letterhead_cache
+from logo_cache import logo_cache
+from manifest import Manifest, notice_digest, run_fingerprint
+from notice import render_rent_reminder, render_rent_reminder_vector
+from pdf import NoticePdf
+from render_modes import RENDER_MODES
+from render_tasks import render_notice_strips, warm_render_worker
+from roster import RosterDbError, arrears_rows
+from tenants import TenantError, tenant_registry
+from vector import VECTOR_FORMATS, write_vector
+
+# Tenant whose branding the script uses unless --tenant names another
+DEFAULT_TENANT = "ywca"
 
-def create_rent_reminder(resident_name="Resident", room_number="", amount_due="", due_date="10th"):
+def create_rent_reminder(resident_name="Resident", unit_number="", amount_due="", due_date=None,
+                         output_filename="rent_reminder_notice.png", verbose=True,
+                         issue_date=None, deterministic=False, mode="RGB", profile=None, tenant_id=DEFAULT_TENANT,
+                         vector_format=None, room_number=None):
     """
-    Creates a formal rent reminder notice styled like an A4 letter.
+    Creates a formal rent reminder notice and saves it as a PNG.
     
     Parameters:
     - resident_name: Name of the resident
-    - room_number: Room or apartment number
+    - unit_number: Room or apartment number
     - amount_due: Amount of rent due
-    - due_date: Date when rent is due (default: 10th)
+    - due_date: Date when rent is due (default: the tenant's usual due date)
+    - output_filename: Where to save the notice
+    - verbose: Print a confirmation once the notice is saved
+    - issue_date: Date printed on the notice (default: today)
+    - deterministic: Derive reference numbers and texture from the inputs and issue date,
+      so the same notice always renders to the same pixels
+    - mode: Image mode to render in: "RGB", "L" (grayscale), "P" (palette) or "1" (black and white)
+    - profile: Encoder profile, see encoders.ENCODER_PROFILES (default: print)
+    - tenant_id: Whose branding to use, a profile in tenants/ (default: ywca)
+    - vector_format: Save a vector "pdf" or "svg" instead, with the text kept as text;
+      mode and profile are then ignored and the VectorCanvas is returned
+    - room_number: Former name of unit_number, still accepted; used when unit_number is empty
     """
-    # Approximate A4 size at 300 dpi for higher quality: 2480 x 3508 pixels
-    a4_width, a4_height = 2480, 3508
-    image = Image.new('RGB', (a4_width, a4_height), color='white')
-    draw = ImageDraw.Draw(image)
-    
-    # Scale all dimensions for higher resolution
-    scale_factor = 4  # Since we went from ~72dpi to 300dpi
-    
-    # Margins and Layout
-    margin_left   = 200 * scale_factor // 4
-    margin_right  = 200 * scale_factor // 4
-    margin_top    = 240 * scale_factor // 4
-    margin_bottom = 240 * scale_factor // 4
-    
-    # Colors
-    accent_color = (0, 85, 164)       # YWCA blue
-    light_gray   = (230, 230, 230)    # Divider lines
-    black        = (0, 0, 0)
-    
-    # Try to use professional serif fonts
-    try:
-        # For Windows/Mac common fonts
-        header_font = ImageFont.truetype("Times New Roman.ttf", 24 * scale_factor // 3)
-        subheader_font = ImageFont.truetype("Times New Roman.ttf", 16 * scale_factor // 3)
-        text_font = ImageFont.truetype("Times New Roman.ttf", 16 * scale_factor // 3)
-        footer_font = ImageFont.truetype("Times New Roman.ttf", 14 * scale_factor // 3)
-        small_font = ImageFont.truetype("Times New Roman.ttf", 12 * scale_factor // 3)
-    except IOError:
-        try:
-            # Try common Linux fonts
-            header_font = ImageFont.truetype("DejaVuSerif.ttf", 24 * scale_factor // 3)
-            subheader_font = ImageFont.truetype("DejaVuSerif.ttf", 16 * scale_factor // 3)
-            text_font = ImageFont.truetype("DejaVuSerif.ttf", 16 * scale_factor // 3)
-            footer_font = ImageFont.truetype("DejaVuSerif.ttf", 14 * scale_factor // 3)
-            small_font = ImageFont.truetype("DejaVuSerif.ttf", 12 * scale_factor // 3)
-        except IOError:
-            # Fallback to default
-            print("Warning: Preferred fonts not found, using default fonts")
-            header_font = ImageFont.load_default()
-            subheader_font = ImageFont.load_default()
-            text_font = ImageFont.load_default()
-            footer_font = ImageFont.load_default()
-            small_font = ImageFont.load_default()
-    
-    # ----------------------------
-    # 1) HEADER SECTION
-    # ----------------------------
-    header_height = 100 * scale_factor // 3
-    
-    # Create subtle letterhead with very light gray
-    draw.rectangle(
-        [(0, 0), (a4_width, header_height)],
-        fill=(248, 248, 248)  # very light gray for the header bar
-    )
-    
-    # Load/Insert Logo
-    logo = get_logo()
-    if logo:
-        # Resize logo to fit nicely in the header
-        max_logo_width, max_logo_height = 120 * scale_factor // 3, 50 * scale_factor // 3
-        logo.thumbnail((max_logo_width, max_logo_height), resample=Image.LANCZOS)
-        # Place the logo near the left margin, vertically centered in the header
-        logo_x = margin_left
-        logo_y = (header_height - logo.height) // 2
-        # Composite for handling transparency
-        logo_bg = Image.new('RGBA', logo.size, (255, 255, 255, 0))  # Transparent background
-        logo_composite = Image.alpha_composite(logo_bg, logo)
-        image.paste(logo_composite.convert('RGB'), (logo_x, logo_y), logo_composite.getchannel('A'))
-    else:
-        # Fallback if no logo
-        fallback_width, fallback_height = 120 * scale_factor // 3, 50 * scale_factor // 3
-        fallback_x = margin_left
-        fallback_y = (header_height - fallback_height) // 2
-        draw.rectangle(
-            [(fallback_x, fallback_y), (fallback_x + fallback_width, fallback_y + fallback_height)],
-            fill=accent_color
-        )
-        draw.text(
-            (fallback_x + 10, fallback_y + 10),
-            "YWCA",
-            fill='white',
-            font=subheader_font
+    if room_number is not None and not unit_number:
+        unit_number = room_number
+    if vector_format:
+        canvas = render_rent_reminder_vector(
+            tenant_registry.require(tenant_id),
+            resident_name=resident_name,
+            unit_number=unit_number,
+            amount_due=amount_due,
+            due_date=due_date,
+            issue_date=issue_date,
+            deterministic=deterministic
         )
-    
-    # Draw the main header text on the right
-    org_text = "YWCA Kenya\nEmpowering Women, Transforming Communities"
-    org_lines = org_text.split("\n")
-    line_y = margin_top - 30 * scale_factor // 3
-    for line in org_lines:
-        bbox = draw.textbbox((0, 0), line, font=subheader_font)
-        w, h = bbox[2] - bbox[0], bbox[3] - bbox[1]
-        draw.text(
-            (a4_width - margin_right - w, line_y),
-            line,
-            fill=black,
-            font=subheader_font
-        )
-        line_y += h + 5
-    
-    # Add a dividing line after the header
-    draw.line(
-        [(margin_left, header_height + 10 * scale_factor // 3), 
-         (a4_width - margin_right, header_height + 10 * scale_factor // 3)],
-        fill=light_gray, 
-        width=1
+        with open(output_filename, 'wb') as f:
+            write_vector(canvas, f, vector_format)
+        if verbose:
+            print(f"Official rent reminder notice created successfully! Saved as {output_filename}")
+        return canvas
+    
+    image = render_rent_reminder(
+        tenant_registry.require(tenant_id),
+        resident_name=resident_name,
+        unit_number=unit_number,
+        amount_due=amount_due,
+        due_date=due_date,
+        issue_date=issue_date,
+        deterministic=deterministic,
+        mode=mode
     )
     
-    # Add a large centered header text just below
-    header_str = "RENT REMINDER NOTICE"
-    bbox = draw.textbbox((0, 0), header_str, font=header_font)
-    w_header, h_header = bbox[2] - bbox[0], bbox[3] - bbox[1]
-    header_x = (a4_width - w_header) // 2
-    header_y = header_height + 60 * scale_factor // 3
-    draw.text((header_x, header_y), header_str, fill=black, font=header_font)
-    
     # ----------------------------
-    # 2) MAIN CONTENT
+    # 4) SAVE THE FINAL IMAGE
     # ----------------------------
-    # Start main content below header
-    content_start_y = header_y + h_header + 30 * scale_factor // 3
-    
-    # Add a reference number and date at the top right of content area
-    current_date = datetime.now().strftime("%d/%m/%Y")
-    ref_num = f"RMR/{random.randint(1000, 9999)}/{datetime.now().year}"
+    with open(output_filename, 'wb') as f:
+        write_notice(image, f, profile)
+    if verbose:
+        print(f"Official rent reminder notice created successfully! Saved as {output_filename}")
     
-    date_text = f"Date: {current_date}"
-    ref_text = f"Reference: {ref_num}"
-    
-    # Position these elements on the right side
-    bbox = draw.textbbox((0, 0), date_text, font=text_font)
-    date_w = bbox[2] - bbox[0]
-    draw.text(
-        (a4_width - margin_right - date_w, content_start_y),
-        date_text,
-        fill=black,
-        font=text_font
+    # Return the image for potential further processing
+    return image
+
+def _render_roster_row(task):
+    """
+    Renders one roster row in a worker process.
+    Returns (output path, seconds spent, worker pid).
+    """
+    filename, row, output_dir, mode, profile, tenant_id, vector_format, issue_date = task
+    start = time.perf_counter()
+    output_filename = os.path.join(output_dir, filename)
+    create_rent_reminder(
+        resident_name=row['resident_name'] or "Resident",
+        unit_number=row['unit_number'],
+        amount_due=row['amount_due'],
+        due_date=row['due_date'] or None,
+        output_filename=output_filename,
+        verbose=False,
+        issue_date=issue_date,
+        mode=mode,
+        profile=profile,
+        tenant_id=tenant_id,
+        vector_format=vector_format
     )
-    
-    bbox = draw.textbbox((0, 0), ref_text, font=text_font)
-    ref_w = bbox[2] - bbox[0]
-    ref_h = bbox[3] - bbox[1]
-    draw.text(
-        (a4_width - margin_right - ref_w, content_start_y + ref_h + 10),
-        ref_text,
-        fill=black,
-        font=text_font
+    return output_filename, time.perf_counter() - start, os.getpid()
+
+def _render_pdf_page(task):
+    """
+    Renders one roster row in a worker process and keeps only what differs
+    from the shared letterhead. Returns (page strips, seconds spent, worker pid).
+    """
+    _, row, _, _, _, tenant_id, _, issue_date = task
+    strips, timings = render_notice_strips(
+        tenant_id,
+        row['resident_name'] or "Resident",
+        row['unit_number'],
+        row['amount_due'],
+        row['due_date'] or None,
+        issue_date=issue_date
     )
-    
-    # Address block on left
-    address_start_y = content_start_y + 40 * scale_factor // 3
-    
-    address_lines = [
-        "YWCA Hostels",
-        "Mamlaka Road, Nairobi",
-        "P.O. Box 40112-00100, Nairobi, Kenya",
-        "Tel: +254 (0) 20 2724789",
-        "Email: info@ywcahostels.co.ke"
-    ]
-    
-    for line in address_lines:
-        bbox = draw.textbbox((0, 0), line, font=text_font)
-        h_line = bbox[3] - bbox[1]
-        draw.text((margin_left, address_start_y), line, fill=black, font=text_font)
-        address_start_y += h_line + 5
-    
-    # Add some space
-    content_start_y = address_start_y + 60 * scale_factor // 3
-    
-    # Resident information in a subtle box
-    if room_number:
-        resident_info = f"Room/Unit: {room_number}"
-        if resident_name and resident_name.lower() != "resident":
-            resident_info = f"Resident: {resident_name}\n{resident_info}"
-        
-        # Draw a light box around resident info
-        bbox = draw.multiline_textbbox((0, 0), resident_info, font=text_font)
-        info_height = bbox[3] - bbox[1] + 20 * scale_factor // 3
-        info_width = a4_width - margin_left - margin_right
-        
-        draw.rectangle(
-            [(margin_left, content_start_y), 
-             (margin_left + info_width, content_start_y + info_height)],
-            fill=(248, 248, 248),  # Very light gray
-            outline=(220, 220, 220)  # Slightly darker for border
-        )
-        
-        # Draw the resident info text
-        draw.multiline_text(
-            (margin_left + 10 * scale_factor // 3, content_start_y + 10 * scale_factor // 3),
-            resident_info,
-            fill=black,
-            font=text_font
-        )
-        
-        content_start_y += info_height + 20 * scale_factor // 3
-    
-    # Greeting
-    greeting_text = f"Dear {resident_name},"
-    draw.text((margin_left, content_start_y), greeting_text, fill=black, font=text_font)
-    bbox = draw.textbbox((0, 0), greeting_text, font=text_font)
-    g_h = bbox[3] - bbox[1]
-    content_start_y += g_h + 15 * scale_factor // 3
-    
-    # Body text - create more professional and detailed message
-    body_text = f"""This is a formal reminder that your rent payment for the current month is due by the {due_date} of this month."""
-    
-    if amount_due:
-        body_text += f" The amount due is KES {amount_due}."
-    
-    body_text += """
+    return strips, sum(timings.values()), os.getpid()
 
-Please ensure your payment is submitted on time to avoid any late fee charges that may be applicable according to your tenancy agreement.
+def run_batch(roster_path, output_dir, workers=None, pdf_path=None, mode="RGB", profile=None,
+              tenant_id=DEFAULT_TENANT, vector_format=None, issue_date=None, incremental=True):
+    """
+    Renders a notice for every row of a CSV roster with tenant_id's branding; see render_rows.
+    """
+    with open(roster_path, 'rb') as roster:
+        rows = read_roster(roster, aliases={'room_number': 'unit_number'})
+        render_rows(rows, output_dir, workers, pdf_path, mode, profile, tenant_id, vector_format, issue_date,
+                    incremental)
 
-Payment can be made through the following methods:
-• M-Pesa Paybill: 123456, Account: Your Room Number
-• Direct deposit to our bank account
-• Cash payment at the management office during office hours
+def render_rows(rows, output_dir, workers=None, pdf_path=None, mode="RGB", profile=None,
+                tenant_id=DEFAULT_TENANT, vector_format=None, issue_date=None, incremental=True):
+    """
+    Renders a notice for every roster row dict with tenant_id's branding, fanned out over a process pool.
+    With pdf_path the notices go into one multi-page PDF instead of separate PNGs;
+    with vector_format each notice is saved as a vector PDF or SVG; otherwise each
+    notice is rendered in the given image mode and encoded with the given encoder profile.
+    Every notice is dated issue_date (default: today).
+    Rows are read as they are handed to the pool, a few hundred at a time, so a
+    roster file or database cursor is never loaded whole.
 
-If you have already made your payment, kindly disregard this notice and provide proof of payment to the management office for our records.
-"""
-    
-    # Draw body text with proper line spacing
-    lines = body_text.split('\n')
-    for line in lines:
-        if not line:  # Empty line for paragraph break
-            content_start_y += 15 * scale_factor // 3
-            continue
-            
-        # Handle text wrapping for long lines
-        words = line.split()
-        if words:
-            current_line = words[0]
-            for word in words[1:]:
-                test_line = current_line + " " + word
-                bbox = draw.textbbox((0, 0), test_line, font=text_font)
-                test_width = bbox[2] - bbox[0]
-                
-                if test_width <= a4_width - margin_left - margin_right:
-                    current_line = test_line
+    Separate files are tracked in a manifest in output_dir (see manifest.py): with
+    incremental, a notice whose row, branding, template, options and issue date
+    are unchanged since the last run is kept rather than drawn again, and the
+    files of rows that are gone are deleted. A PDF is always written in full.
+    Prints overall throughput and per-worker timing when done.
+    """
+    workers = workers or os.cpu_count() or 1
+    issue_date = issue_date or date.today()
+    tenant = tenant_registry.require(tenant_id)
+    manifest = None
+    if pdf_path:
+        render_task = _render_pdf_page
+        output_dir = pdf_path
+    else:
+        render_task = _render_roster_row
+        os.makedirs(output_dir, exist_ok=True)
+        manifest = Manifest(output_dir)
+        fingerprint = run_fingerprint(tenant, issue_date.isoformat(), mode, profile, vector_format)
+        _, extension = VECTOR_FORMATS[vector_format] if vector_format else profile_type(profile)
+
+    count = kept = 0
+    # Input hashes of the notices handed to the pool and not yet back
+    digests = {}
+
+    def pending():
+        nonlocal kept
+        for index, row in enumerate(rows, start=1):
+            if isinstance(row, BadRow):
+                print(f"Skipping row {index} ({row.get('resident_name', '')}): {row.error}", file=sys.stderr)
+                continue
+            filename = None
+            if manifest is not None:
+                filename = notice_filename(index, row['resident_name'], extension)
+                digest = notice_digest(fingerprint, row)
+                if incremental and manifest.is_current(filename, digest):
+                    kept += 1
+                    continue
+                digests[filename] = digest
+            yield filename, row, output_dir, mode, profile, tenant_id, vector_format, issue_date
+
+    tasks = pending()
+    per_worker = {}
+    start = time.perf_counter()
+    with ExitStack() as stack:
+        executor = stack.enter_context(
+            ProcessPoolExecutor(max_workers=workers, initializer=warm_render_worker, initargs=(tenant_id,))
+        )
+        document = None
+        if pdf_path:
+            base, _ = letterhead_cache.get(tenant["branding"])
+            document = NoticePdf(stack.enter_context(open(pdf_path, 'wb')), base)
+
+        # executor.map takes all its tasks up front, so it is given them a window at a time
+        for window in iter(lambda: list(islice(tasks, workers * 64)), []):
+            chunksize = max(1, len(window) // (workers * 4))
+            for result, seconds, pid in executor.map(render_task, window, chunksize=chunksize):
+                if document is not None:
+                    document.add_strips(result)
                 else:
-                    # Draw current line and start a new one
-                    draw.text((margin_left, content_start_y), current_line, fill=black, font=text_font)
-                    bbox = draw.textbbox((0, 0), current_line, font=text_font)
-                    line_height = bbox[3] - bbox[1]
-                    content_start_y += line_height + 5
-                    current_line = word
-                    
-            # Draw the last line
-            draw.text((margin_left, content_start_y), current_line, fill=black, font=text_font)
-            bbox = draw.textbbox((0, 0), current_line, font=text_font)
-            line_height = bbox[3] - bbox[1]
-            content_start_y += line_height + 5
-    
-    # Closing and signature
-    content_start_y += 30 * scale_factor // 3
-    closing_text = "Thank you for your prompt attention to this matter."
-    draw.text((margin_left, content_start_y), closing_text, fill=black, font=text_font)
-    
-    # Add signature space
-    content_start_y += 80 * scale_factor // 3
-    signature_text = "YWCA Hostels Management"
-    draw.text((margin_left, content_start_y), signature_text, fill=black, font=text_font)
-    
-    # Add a manager name and title
-    content_start_y += 25 * scale_factor // 3
-    manager_text = "Mary Wanjiku\nHostel Manager"
-    draw.text((margin_left, content_start_y), manager_text, fill=black, font=small_font)
-    
-    # ----------------------------
-    # 3) FOOTER SECTION
-    # ----------------------------
-    footer_height = 50 * scale_factor // 3
-    footer_y = a4_height - footer_height - margin_bottom
-    
-    # Light gray line to separate content from footer
-    draw.line([(margin_left, footer_y), (a4_width - margin_right, footer_y)], fill=light_gray, width=1)
-    
-    # Footer text with disclaimer and reference number
-    footer_text = "This is an automated notice generated by our system. If you have questions, please contact the management office."
-    ref_str = f"Ref: YWCA-RR-{datetime.now().year}-{random.randint(100, 999)}"
-    
-    # Print date at bottom-left
-    bbox = draw.textbbox((0, 0), footer_text, font=footer_font)
-    footer_text_h = bbox[3] - bbox[1]
-    draw.text(
-        (margin_left, footer_y + (footer_height - footer_text_h) // 2),
-        footer_text,
-        fill=(100, 100, 100),  # Darker gray for footer text
-        font=footer_font
-    )
-    
-    # Print reference at bottom-right
-    bbox = draw.textbbox((0, 0), ref_str, font=footer_font)
-    ref_w, ref_h = bbox[2] - bbox[0], bbox[3] - bbox[1]
-    draw.text(
-        (a4_width - margin_right - ref_w, footer_y + footer_height + 10),
-        ref_str,
-        fill=(100, 100, 100),  # Darker gray
-        font=footer_font
-    )
-    
-    # Add a subtle watermark or background element for authenticity
-    watermark_text = "OFFICIAL NOTICE"
-    watermark_font = subheader_font
-    bbox = draw.textbbox((0, 0), watermark_text, font=watermark_font)
-    w_mark, h_mark = bbox[2] - bbox[0], bbox[3] - bbox[1]
-    
-    # Position at an angle in the background
-    # We'll just put it in the center, very light
-    draw.text(
-        ((a4_width - w_mark) // 2, (a4_height - h_mark) // 2),
-        watermark_text,
-        fill=(245, 245, 245),  # Very light gray
-        font=watermark_font
-    )
-    
-    # Optional: Add subtle texture or noise for a more printed look
-    if random.random() > 0.5:  # 50% chance to add noise
-        # Add very slight noise to simulate paper texture
-        for _ in range(5000):
-            x = random.randint(0, a4_width - 1)
-            y = random.randint(0, a4_height - 1)
-            # Very subtle light gray dots
-            image.putpixel((x, y), (240, 240, 240))
-    
-    # ----------------------------
-    # 4) SAVE THE FINAL IMAGE
-    # ----------------------------
-    output_filename = "rent_reminder_notice.png"
-    image.save(output_filename, dpi=(300, 300))
-    print(f"Official rent reminder notice created successfully! Saved as {output_filename}")
-    
-    # Return the image for potential further processing
-    return image
+                    filename = os.path.basename(result)
+                    manifest.record(filename, digests.pop(filename))
+                rendered, total = per_worker.get(pid, (0, 0.0))
+                per_worker[pid] = (rendered + 1, total + seconds)
+                count += 1
+
+        if document is not None:
+            document.close()
+    # Only after a complete run, so rows not reached yet are never taken for removed ones
+    removed = manifest.save() if manifest is not None else 0
+    elapsed = time.perf_counter() - start
+
+    print(f"Rendered {count} notices into {output_dir} in {elapsed:.2f}s "
+          f"({count / elapsed if elapsed else 0:.2f} notices/s, {workers} workers)")
+    if kept or removed:
+        print(f"  kept {kept} unchanged notices, removed {removed} for rows no longer in the roster")
+    for pid, (count, total) in sorted(per_worker.items()):
+        print(f"  worker {pid}: {count} notices, {total:.2f}s busy, {total / count * 1000:.0f} ms/notice")
 
 if __name__ == "__main__":
-    # Example usage with customization options
-    create_rent_reminder(
-        resident_name="Bran Don",  # Change to specific name or leave as "Resident"
-        room_number="B-204",       # Optional room number
-        amount_due="15,000",       # Optional amount due
-        due_date="10th"            # Default is 10th
-    )
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Generate rent reminder notices.")
+    parser.add_argument("roster", nargs="?",
+                        help="CSV roster with resident_name, unit_number (or room_number), amount_due and due_date columns; "
+                             "without it a single example notice is created")
+    parser.add_argument("-o", "--output-dir", default="notices",
+                        help="Directory the batch notices are written to (default: notices)")
+    parser.add_argument("--pdf", metavar="PATH",
+                        help="Write every notice into one multi-page PDF instead of separate PNGs")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="Number of worker processes (default: one per CPU core)")
+    parser.add_argument("--mode", choices=RENDER_MODES, default="RGB",
+                        help="Image mode of the PNG notices: RGB, L (grayscale), P (palette) "
+                             "or 1 (black and white); smaller modes render and encode faster")
+    parser.add_argument("--profile", choices=ENCODER_PROFILES, default="print",
+                        help="Encoder profile: print (PNG, default), fast (quicker, larger PNG), "
+                             "archive (smallest PNG, slowest) or email (compact WebP/JPEG)")
+    parser.add_argument("--vector", choices=VECTOR_FORMATS, default=None,
+                        help="Save vector PDF or SVG notices instead, with the text kept as text: "
+                             "much faster and smaller, sharp at any print resolution, without paper texture")
+    parser.add_argument("--tenant", default=DEFAULT_TENANT,
+                        help=f"Tenant whose branding to use, a profile in tenants/ (default: {DEFAULT_TENANT})")
+    parser.add_argument("--roster-db", metavar="PATH",
+                        help="Instead of a CSV roster, render a notice for every resident of the tenant's property "
+                             "who still owes rent for --month, from this SQLite roster (see roster.py)")
+    parser.add_argument("--month", metavar="YYYY-MM",
+                        help="Month whose arrears --roster-db renders (default: this month)")
+    parser.add_argument("--issue-date", metavar="YYYY-MM-DD", type=date.fromisoformat, default=None,
+                        help="Date printed on the batch notices (default: today); pass the first run's date "
+                             "when re-running on a later day to keep its unchanged notices")
+    parser.add_argument("--full", action="store_true",
+                        help="Redraw every notice instead of only those whose inputs changed since the last run")
+    args = parser.parse_args()
+    if args.vector and args.pdf:
+        parser.error("--vector writes one file per notice; it can't be combined with --pdf")
+    if args.roster and args.roster_db:
+        parser.error("give either a CSV roster or --roster-db, not both")
+    if args.roster_db and not os.path.exists(args.roster_db):
+        parser.error(f"no roster database at {args.roster_db}")
+
+    try:
+        tenant = tenant_registry.require(args.tenant)
+    except TenantError as e:
+        sys.exit(str(e))
+    if tenant.get("logo_url"):
+        logo_cache.prefetch(tenant["branding"]["logo_path"], tenant["logo_url"], background=False)
+
+    if args.roster:
+        run_batch(args.roster, args.output_dir, args.workers, args.pdf, args.mode, args.profile, args.tenant,
+                  args.vector, args.issue_date, not args.full)
+    elif args.roster_db:
+        try:
+            rows = arrears_rows(args.roster_db, args.tenant, args.month)
+        except RosterDbError as e:
+            parser.error(str(e))
+        render_rows(rows, args.output_dir, args.workers, args.pdf, args.mode, args.profile, args.tenant,
+                    args.vector, args.issue_date, not args.full)
+    else:
+        _, extension = VECTOR_FORMATS[args.vector] if args.vector else profile_type(args.profile)
+        # Example usage with customization options
+        create_rent_reminder(
+            resident_name="Bran Don",  # Change to specific name or leave as "Resident"
+            unit_number="B-204",       # Optional room number
+            amount_due="15,000",       # Optional amount due
+            due_date="10th",           # Default is the tenant's due date
+            output_filename=f"rent_reminder_notice.{extension}",
+            mode=args.mode,
+            profile=args.profile,
+            tenant_id=args.tenant,
+            vector_format=args.vector
+        )
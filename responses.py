@@ -0,0 +1,117 @@
+from flask import Response, abort, request, send_file
+from urllib.parse import quote
+from werkzeug.security import safe_join
+import os
+import threading
+import unicodedata
+
+from render_cache import content_etag
+
+def attachment_names(download_name):
+    """
+    Returns the Content-Disposition filename parameters for download_name,
+    adding an RFC 5987 filename* when the name isn't plain ASCII (as send_file does).
+    """
+    try:
+        download_name.encode("ascii")
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize("NFKD", download_name).encode("ascii", "ignore").decode("ascii")
+        return {"filename": simple, "filename*": f"UTF-8''{quote(download_name, safe='!#$&+-.^_`|~')}"}
+    return {"filename": download_name}
+
+def notice_validators(response, etag):
+    # Notices carry a resident's details, so only the browser may keep them, and
+    # it revalidates every time: an unchanged notice comes back as a bodiless 304
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+
+def notice_response(data, mimetype, download_name=None, etag=None):
+    """
+    Returns a response whose body is the encoded notice itself.
+    The bytes object is handed to the WSGI server in one piece, so it is neither
+    copied nor read back through a file wrapper, and Content-Length is its length.
+    With download_name the notice is sent as an attachment. With etag (its
+    content ETag) a GET whose If-None-Match already names it gets a 304 instead.
+    """
+    response = Response(data, mimetype=mimetype)
+    response.content_length = len(data)
+    if download_name is not None:
+        response.headers.set("Content-Disposition", "attachment", **attachment_names(download_name))
+    if etag is not None:
+        notice_validators(response, etag)
+        response.make_conditional(request)
+    return response
+
+def not_modified_response(etag):
+    """
+    Returns the 304 for a notice the client already holds, with the same validators
+    notice_response would have sent.
+    """
+    response = Response(status=304)
+    notice_validators(response, etag)
+    return response
+
+def client_has(etag):
+    """
+    Returns True when the request is a GET or HEAD whose If-None-Match names etag,
+    so it can be answered with a 304 before anything is rendered. Other methods
+    never get a 304.
+    """
+    return request.method in ("GET", "HEAD") and request.if_none_match.contains_weak(etag)
+
+class FileETags:
+    """
+    Content-hash ETags of files served as-is (logos, templates). A file is hashed
+    on first use and again only when its size or modification time changes.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == version:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        with open(path, "rb") as f:
+            etag = content_etag(f.read())
+        with self._lock:
+            self._entries[path] = (version, etag)
+        return etag
+
+    def stats(self):
+        """
+        Returns hit/miss counters and the number of hashed files.
+        """
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+    def clear(self):
+        """
+        Forgets every hash and resets the counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+file_etags = FileETags()
+
+def file_response(directory, path, max_age):
+    """
+    Sends directory/path with its content ETag and a public Cache-Control of
+    max_age seconds; If-None-Match and If-Modified-Since get a 304. Paths
+    outside directory and missing files are a 404.
+    """
+    full_path = safe_join(directory, path)
+    if full_path is None or not os.path.isfile(full_path):
+        abort(404)
+    return send_file(full_path, etag=file_etags.get(full_path), max_age=max_age)
@@ -0,0 +1,196 @@
+from datetime import date
+import calendar
+import re
+import sqlite3
+
+# Units per property, who lives in them, the rent charged each month and what was paid
+# against it. Amounts are whole currency units, as notices print them
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS units (
+    id INTEGER PRIMARY KEY,
+    property TEXT NOT NULL,
+    unit_number TEXT NOT NULL,
+    rent_amount INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS residents (
+    id INTEGER PRIMARY KEY,
+    unit_id INTEGER NOT NULL REFERENCES units(id),
+    name TEXT NOT NULL,
+    moved_in TEXT NOT NULL,
+    moved_out TEXT
+);
+CREATE TABLE IF NOT EXISTS charges (
+    id INTEGER PRIMARY KEY,
+    unit_id INTEGER NOT NULL REFERENCES units(id),
+    resident_id INTEGER NOT NULL REFERENCES residents(id),
+    due_date TEXT NOT NULL,
+    amount INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS payments (
+    id INTEGER PRIMARY KEY,
+    charge_id INTEGER NOT NULL REFERENCES charges(id),
+    paid_on TEXT NOT NULL,
+    amount INTEGER NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS units_property_unit ON units (property, unit_number);
+CREATE INDEX IF NOT EXISTS residents_unit ON residents (unit_id, moved_out);
+CREATE UNIQUE INDEX IF NOT EXISTS charges_unit_due ON charges (unit_id, due_date);
+CREATE INDEX IF NOT EXISTS charges_due ON charges (due_date);
+CREATE INDEX IF NOT EXISTS payments_charge ON payments (charge_id);
+"""
+
+# This month's charges for one property with what is still owed on each, in unit order.
+# Walks units_property_unit for the property and charges_unit_due for the month, so it
+# costs the same however many other properties and months the roster holds
+ARREARS_QUERY = """
+SELECT r.name AS resident_name, u.unit_number, c.due_date,
+       c.amount - COALESCE((SELECT SUM(p.amount) FROM payments p WHERE p.charge_id = c.id), 0) AS owed
+FROM units u
+JOIN charges c ON c.unit_id = u.id AND c.due_date >= ? AND c.due_date < ?
+JOIN residents r ON r.id = c.resident_id
+WHERE u.property = ? AND owed > 0
+ORDER BY u.unit_number
+"""
+
+MONTH = re.compile(r"^(\d{4})-(\d{2})$")
+
+class RosterDbError(ValueError):
+    """
+    Raised for a malformed month or a unit, resident or charge that doesn't exist.
+    """
+
+def connect(path, check_same_thread=True):
+    """
+    Opens the roster database at path, creating its tables and indexes if needed.
+    Rows come back as sqlite3.Row. WAL mode lets notices be generated from the
+    roster while payments are being recorded. The functions below that write
+    leave committing to the caller (with conn: ...).
+    """
+    conn = sqlite3.connect(path, check_same_thread=check_same_thread)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(SCHEMA)
+    return conn
+
+def month_range(month=None):
+    """
+    Returns (first day, first day of the next month) as ISO dates for a "YYYY-MM"
+    month, or for the current month when month is None.
+    """
+    if month is None:
+        today = date.today()
+        year, number = today.year, today.month
+    else:
+        match = MONTH.match(month)
+        if not match or not 1 <= int(match.group(2)) <= 12:
+            raise RosterDbError(f"Invalid month {month!r}; expected YYYY-MM")
+        year, number = int(match.group(1)), int(match.group(2))
+    start = date(year, number, 1)
+    end = date(year + 1, 1, 1) if number == 12 else date(year, number + 1, 1)
+    return start.isoformat(), end.isoformat()
+
+def ordinal(day):
+    """
+    Returns a day of the month as notices word it: 1st, 2nd, 3rd, 4th, 11th, 21st...
+    """
+    suffix = "th" if 10 <= day % 100 <= 20 else {1: "st", 2: "nd", 3: "rd"}.get(day % 10, "th")
+    return f"{day}{suffix}"
+
+def format_amount(amount):
+    # With thousands separators, like the amounts typed into the form
+    return f"{amount:,}"
+
+def add_unit(conn, property_id, unit_number, rent_amount):
+    """
+    Adds a unit to property_id (a tenant id) or updates its rent. Returns the unit id.
+    """
+    conn.execute(
+        "INSERT INTO units (property, unit_number, rent_amount) VALUES (?, ?, ?) "
+        "ON CONFLICT (property, unit_number) DO UPDATE SET rent_amount = excluded.rent_amount",
+        (property_id, unit_number, rent_amount)
+    )
+    return conn.execute(
+        "SELECT id FROM units WHERE property = ? AND unit_number = ?", (property_id, unit_number)
+    ).fetchone()["id"]
+
+def move_in(conn, unit_id, name, moved_in):
+    """
+    Records name moving into a unit on moved_in (an ISO date), moving out whoever
+    lived there before on the same day. Returns the resident id.
+    """
+    conn.execute("UPDATE residents SET moved_out = ? WHERE unit_id = ? AND moved_out IS NULL", (moved_in, unit_id))
+    return conn.execute(
+        "INSERT INTO residents (unit_id, name, moved_in) VALUES (?, ?, ?)", (unit_id, name, moved_in)
+    ).lastrowid
+
+def charge_rent(conn, property_id, month=None, due_day=1):
+    """
+    Charges every occupied unit of property_id its rent for month ("YYYY-MM",
+    default this month), due on due_day, to its current resident. Units already
+    charged for that day are left alone. Returns the number of charges added.
+    """
+    start, _ = month_range(month)
+    due_date = date.fromisoformat(start).replace(
+        day=min(due_day, calendar.monthrange(int(start[:4]), int(start[5:7]))[1])
+    ).isoformat()
+    cursor = conn.execute(
+        "INSERT OR IGNORE INTO charges (unit_id, resident_id, due_date, amount) "
+        "SELECT u.id, r.id, ?, u.rent_amount FROM units u "
+        "JOIN residents r ON r.unit_id = u.id AND r.moved_out IS NULL "
+        "WHERE u.property = ?",
+        (due_date, property_id)
+    )
+    return cursor.rowcount
+
+def record_payment(conn, property_id, unit_number, amount, paid_on, month=None):
+    """
+    Records a payment against the unit's rent charge for month (default this month).
+    Raises RosterDbError if the unit wasn't charged that month.
+    """
+    start, end = month_range(month)
+    charge = conn.execute(
+        "SELECT c.id FROM units u JOIN charges c ON c.unit_id = u.id AND c.due_date >= ? AND c.due_date < ? "
+        "WHERE u.property = ? AND u.unit_number = ?",
+        (start, end, property_id, unit_number)
+    ).fetchone()
+    if charge is None:
+        raise RosterDbError(f"Unit {unit_number!r} of {property_id!r} has no rent charge for {start[:7]}")
+    conn.execute(
+        "INSERT INTO payments (charge_id, paid_on, amount) VALUES (?, ?, ?)", (charge["id"], paid_on, amount)
+    )
+
+def arrears_rows(path, property_id, month=None, batch_size=500):
+    """
+    Yields a roster row dict (resident_name, unit_number, amount_due, due_date, as
+    batch.read_roster gives) for every resident of property_id who still owes part
+    of their rent for month ("YYYY-MM", default this month), in unit order.
+
+    Rows are fetched batch_size at a time from an open cursor on its own
+    connection, so tens of thousands of units never sit in memory at once; the
+    connection is closed when the rows run out or the generator is closed.
+    The month is checked straight away, so a malformed one raises RosterDbError
+    when this is called rather than when the first row is read.
+    """
+    start, end = month_range(month)
+
+    def rows():
+        # Read by whichever thread iterates the rows, e.g. the WSGI server's
+        conn = connect(path, check_same_thread=False)
+        try:
+            cursor = conn.execute(ARREARS_QUERY, (start, end, property_id))
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    break
+                for row in batch:
+                    yield {
+                        "resident_name": row["resident_name"],
+                        "unit_number": row["unit_number"],
+                        "amount_due": format_amount(row["owed"]),
+                        "due_date": ordinal(int(row["due_date"][8:10])),
+                    }
+        finally:
+            conn.close()
+
+    return rows()
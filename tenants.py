@@ -0,0 +1,152 @@
+from collections import OrderedDict
+import json
+import os
+import re
+import threading
+
+from logo_cache import logo_cache
+
+# Directory holding one <tenant id>.json branding profile per property
+TENANTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tenants")
+
+# Tenant ids are file names, so only plain lowercase names are accepted
+TENANT_ID = re.compile(r"^[a-z0-9][a-z0-9_-]*$")
+
+# Keys every profile section must have
+REQUIRED_KEYS = {
+    "branding": ("logo_path", "logo_text", "accent_color", "org_text", "address_lines"),
+    "notice": ("default_due_date", "unit_label", "amount_format", "agreement", "payment_methods",
+               "signature", "manager", "reference_prefix", "footer_reference_prefix"),
+    "page": ("title", "heading", "logo_alt", "accent", "accent_hover", "unit_label", "unit_placeholder",
+             "currency", "amount_placeholder", "copyright"),
+}
+
+class TenantError(ValueError):
+    """
+    Raised when a tenant's branding profile can't be read or is missing keys.
+    """
+
+def load_tenant(path, tenant_id):
+    """
+    Reads and checks one tenant profile. Returns it as a dict with the tenant id
+    added under "id". The "branding" section is what the letterhead is drawn from.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            tenant = json.load(f)
+    except (OSError, ValueError) as e:
+        raise TenantError(f"Could not read tenant profile {path}: {e}")
+
+    for section, keys in REQUIRED_KEYS.items():
+        values = tenant.get(section)
+        if not isinstance(values, dict):
+            raise TenantError(f"Tenant profile {path} has no {section!r} section")
+        missing = [key for key in keys if key not in values]
+        if missing:
+            raise TenantError(f"Tenant profile {path} is missing {section} key(s): {', '.join(missing)}")
+
+    tenant["id"] = tenant_id
+    tenant.setdefault("name", tenant_id)
+    return tenant
+
+class TenantRegistry:
+    """
+    Loads tenant branding profiles from directory/<tenant id>.json on first use
+    and keeps the max_tenants most recently used ones.
+    A profile is reloaded when its file changes, and loading one starts the
+    download of its logo if the file isn't there yet (see LogoCache.prefetch).
+    The letterhead and logo each tenant needs are kept by letterhead_cache and
+    logo_cache, which are bounded the same way, so any number of tenants can be
+    served from a fixed amount of memory.
+    Returned profiles are shared; callers must not modify them. Each carries
+    the file's mtime as "revision", for keying anything rendered from it.
+    """
+
+    def __init__(self, directory=TENANTS_DIR, max_tenants=256):
+        self.directory = directory
+        self.max_tenants = max_tenants
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def path(self, tenant_id):
+        return os.path.join(self.directory, f"{tenant_id}.json")
+
+    def get(self, tenant_id):
+        """
+        Returns the profile of tenant_id, or None if there is no such tenant.
+        Raises TenantError if its profile is malformed.
+        """
+        if not tenant_id or not TENANT_ID.match(tenant_id):
+            return None
+        path = self.path(tenant_id)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(tenant_id)
+            if entry is not None and entry[0] == mtime:
+                self._entries.move_to_end(tenant_id)
+                self.hits += 1
+                return entry[1]
+
+            self.misses += 1
+            tenant = load_tenant(path, tenant_id)
+            # Changes with every edit of the profile, so caches keyed on it never serve stale notices
+            tenant["revision"] = mtime
+            self._entries[tenant_id] = (mtime, tenant)
+            self._entries.move_to_end(tenant_id)
+            while len(self._entries) > self.max_tenants:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+        # Fetch a missing logo in the background; renders never touch the network
+        if tenant.get("logo_url"):
+            logo_cache.prefetch(tenant["branding"]["logo_path"], tenant["logo_url"])
+        return tenant
+
+    def require(self, tenant_id):
+        """
+        Returns the profile of tenant_id, raising TenantError if there is no such tenant.
+        """
+        tenant = self.get(tenant_id)
+        if tenant is None:
+            raise TenantError(f"Unknown tenant {tenant_id!r}; available: {', '.join(self.tenant_ids()) or 'none'}")
+        return tenant
+
+    def tenant_ids(self):
+        """
+        Returns the ids of every tenant profile in the directory, sorted.
+        """
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        return sorted(name[:-5] for name in names if name.endswith(".json") and TENANT_ID.match(name[:-5]))
+
+    def stats(self):
+        """
+        Returns hit/miss/eviction counters and the number of loaded profiles.
+        """
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "entries": len(self._entries), "max_tenants": self.max_tenants}
+
+    def clear(self):
+        """
+        Drops every loaded profile and resets the counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+# TENANTS_DIR and TENANT_CACHE_SIZE in the environment override the directory and bound
+tenant_registry = TenantRegistry(
+    directory=os.environ.get("TENANTS_DIR", TENANTS_DIR),
+    max_tenants=int(os.environ.get("TENANT_CACHE_SIZE", 256))
+)
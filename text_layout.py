@@ -0,0 +1,134 @@
+import threading
+import weakref
+
+# Width estimates closer than this to the limit are confirmed with a real measurement
+EXACT_MARGIN = 1.0
+
+# Per-font word caches are dropped wholesale once they grow past this many words
+MAX_CACHED_WORDS = 20000
+
+class TextMeasurer:
+    """
+    Caches per-word metrics for one font.
+    Each word is measured once: its advance and its ink box relative to the pen origin.
+    A line's width and height then follow from the metrics of its words, which is what
+    textbbox would return for the joined string.
+    """
+
+    def __init__(self, font):
+        self.font = font
+        self.space = font.getlength(" ")
+        self.hits = 0
+        self.misses = 0
+        self._words = {}
+
+    def word(self, word):
+        """
+        Returns (advance, left, top, right, bottom) for a single word.
+        """
+        metrics = self._words.get(word)
+        if metrics is not None:
+            self.hits += 1
+            return metrics
+
+        self.misses += 1
+        if len(self._words) >= MAX_CACHED_WORDS:
+            self._words.clear()
+        left, top, right, bottom = self.font.getbbox(word)
+        metrics = (self.font.getlength(word), left, top, right, bottom)
+        self._words[word] = metrics
+        return metrics
+
+    def width(self, line):
+        """
+        Exact width of a line, as the original textbbox-based wrapping measured it.
+        """
+        bbox = self.font.getbbox(line)
+        return bbox[2] - bbox[0]
+
+_measurers = weakref.WeakKeyDictionary()
+_measurers_lock = threading.Lock()
+
+def get_measurer(font):
+    """
+    Returns the shared TextMeasurer for font.
+    """
+    measurer = _measurers.get(font)
+    if measurer is None:
+        with _measurers_lock:
+            measurer = _measurers.get(font)
+            if measurer is None:
+                measurer = TextMeasurer(font)
+                _measurers[font] = measurer
+    return measurer
+
+def wrap_words(words, measurer, max_width):
+    """
+    Greedily wraps words into lines no wider than max_width.
+    Returns a list of (line, height) pairs, where height is the ink height of the line.
+
+    Widths are accumulated from cached word advances, so each line costs time linear
+    in its length. Only when an estimate lands within EXACT_MARGIN of the limit is
+    the candidate line measured for real, so the breaks match textbbox exactly.
+    """
+    lines = []
+    space = measurer.space
+
+    first = measurer.word(words[0])
+    line_words = [words[0]]
+    line_left = first[1]
+    line_top, line_bottom = first[2], first[4]
+    pen = first[0]
+
+    for word in words[1:]:
+        advance, left, top, right, bottom = measurer.word(word)
+        word_x = pen + space
+        width = word_x + right - line_left
+
+        if abs(width - max_width) < EXACT_MARGIN:
+            fits = measurer.width(" ".join(line_words) + " " + word) <= max_width
+        else:
+            fits = width <= max_width
+
+        if fits:
+            line_words.append(word)
+            line_top = min(line_top, top)
+            line_bottom = max(line_bottom, bottom)
+            pen = word_x + advance
+        else:
+            lines.append((" ".join(line_words), line_bottom - line_top))
+            line_words = [word]
+            line_left = left
+            line_top, line_bottom = top, bottom
+            pen = advance
+
+    lines.append((" ".join(line_words), line_bottom - line_top))
+    return lines
+
+def layout_text(text, font, max_width, line_gap=5, paragraph_gap=20):
+    """
+    Lays out multi-line text the way the notice body is drawn: every newline-separated
+    line is word-wrapped to max_width, lines advance by their ink height plus line_gap,
+    and empty lines add paragraph_gap.
+
+    Returns (positioned, height): a list of (y_offset, line) to draw and the total
+    vertical space used.
+    """
+    measurer = get_measurer(font)
+    positioned = []
+    y = 0
+
+    for line in text.split('\n'):
+        if not line:  # Empty line for paragraph break
+            y += paragraph_gap
+            continue
+
+        words = line.split()
+        if not words:
+            continue
+
+        for wrapped, height in wrap_words(words, measurer, max_width):
+            positioned.append((y, wrapped))
+            y += height + line_gap
+
+    return positioned, y
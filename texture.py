@@ -0,0 +1,44 @@
+from PIL import ImageDraw
+from array import array
+from functools import lru_cache
+import random
+
+from render_modes import ink
+
+# The original printed look: 5000 dots on a 2480 x 3508 page
+DEFAULT_TEXTURE_DENSITY = 5000 / (2480 * 3508 / 1_000_000)  # dots per megapixel
+
+# Very subtle light gray dots
+TEXTURE_COLOR = (240, 240, 240)
+
+@lru_cache(maxsize=8)
+def texture_tile(size, density=DEFAULT_TEXTURE_DENSITY):
+    """
+    Returns the dot positions of the paper texture for a page size as two lists,
+    xs and ys, drawn once per size and density and shared by every seed.
+    """
+    width, height = size
+    count = round(density * width * height / 1_000_000)
+
+    # Draw all the random numbers in one call, then fold them onto the page
+    raw = array('I')
+    raw.frombytes(random.Random(0).randbytes(2 * count * raw.itemsize))
+    return [x % width for x in raw[0::2]], [y % height for y in raw[1::2]]
+
+def texture_points(size, seed, density=DEFAULT_TEXTURE_DENSITY):
+    """
+    Returns the dot positions of the paper texture for a page size and seed: the
+    size's tile shifted by an offset the seed picks, wrapping around the page edges.
+    The same seed always gives the same dots, so textured notices stay reproducible.
+    """
+    width, height = size
+    xs, ys = texture_tile(size, density)
+    offset = random.Random(seed)
+    dx, dy = offset.randrange(width), offset.randrange(height)
+    return list(zip([(x + dx) % width for x in xs], [(y + dy) % height for y in ys]))
+
+def apply_texture(image, seed, density=DEFAULT_TEXTURE_DENSITY, color=TEXTURE_COLOR):
+    """
+    Adds very slight noise to simulate paper texture, drawing every dot in one call.
+    """
+    ImageDraw.Draw(image).point(texture_points(image.size, seed, density), fill=ink(color, image.mode))
@@ -0,0 +1,305 @@
+from io import BytesIO
+from xml.sax.saxutils import escape, quoteattr
+import base64
+
+from preview import PRINT_DPI
+
+# Vector formats a notice can be written in, with their mimetype and file extension
+VECTOR_FORMATS = {
+    "pdf": ("application/pdf", "pdf"),
+    "svg": ("image/svg+xml", "svg"),
+}
+
+def check_vector_format(vector_format):
+    """
+    Returns vector_format if it is one of VECTOR_FORMATS, otherwise raises ValueError.
+    """
+    if vector_format not in VECTOR_FORMATS:
+        raise ValueError(f"Unknown vector format {vector_format!r}; expected one of {', '.join(VECTOR_FORMATS)}")
+    return vector_format
+
+def _rgb(color):
+    # Fills come as RGB tuples, grey levels or Pillow colour names
+    if isinstance(color, str):
+        from PIL import ImageColor
+        return ImageColor.getrgb(color)[:3]
+    if isinstance(color, int):
+        return (color, color, color)
+    return tuple(color[:3])
+
+class VectorCanvas:
+    """
+    Stands in for an ImageDraw: records the text, rectangles, lines and logo that
+    draw_letterhead and replay_layout draw, so the same layout can be written as
+    PDF or SVG instead of being rasterized.
+    Text is measured with Pillow on an RGB canvas exactly as the raster notice is,
+    so positions and line breaks match the PNG. Coordinates stay in print pixels.
+    """
+
+    def __init__(self, size):
+        from PIL import Image, ImageDraw
+
+        self.size = size
+        self.ops = []
+        self._measure = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+        self._spacing = {}
+
+    def textbbox(self, xy, text, font=None):
+        return self._measure.textbbox(xy, text, font=font)
+
+    def multiline_textbbox(self, xy, text, font=None):
+        return self._measure.multiline_textbbox(xy, text, font=font)
+
+    def line_spacing(self, font):
+        """
+        Returns the distance between the lines of multiline text in font, as Pillow spaces them.
+        """
+        spacing = self._spacing.get(font)
+        if spacing is None:
+            spacing = self._spacing[font] = (
+                self._measure.multiline_textbbox((0, 0), "A\nA", font=font)[3]
+                - self._measure.textbbox((0, 0), "A", font=font)[3]
+            )
+        return spacing
+
+    def text(self, xy, text, fill=None, font=None):
+        self.ops.append(("text", xy[0], xy[1], text, _rgb(fill or (0, 0, 0)), font))
+
+    def multiline_text(self, xy, text, fill=None, font=None):
+        spacing = self.line_spacing(font)
+        for i, line in enumerate(text.split("\n")):
+            self.text((xy[0], xy[1] + i * spacing), line, fill=fill, font=font)
+
+    def rectangle(self, xy, fill=None, outline=None):
+        (x0, y0), (x1, y1) = xy
+        self.ops.append(("rect", x0, y0, x1, y1, fill and _rgb(fill), outline and _rgb(outline)))
+
+    def line(self, xy, fill=None, width=1):
+        (x0, y0), (x1, y1) = xy
+        self.ops.append(("line", x0, y0, x1, y1, _rgb(fill or (0, 0, 0)), width))
+
+    def paste_logo(self, logo, xy):
+        """
+        Places an (rgb, mask) logo from logo_cache; passed to draw_letterhead as paste_logo.
+        """
+        self.ops.append(("image", xy[0], xy[1], logo))
+
+def _winansi(text):
+    # Whether text can be set in the WinAnsi-encoded fonts PdfWriter.add_font adds
+    try:
+        text.encode("cp1252")
+    except UnicodeEncodeError:
+        return False
+    return True
+
+def _pdf_string(text):
+    # WinAnsi bytes, with delimiters escaped and everything outside printable ASCII as octal
+    out = []
+    for byte in text.encode("cp1252"):
+        if byte in b"()\\":
+            out.append("\\" + chr(byte))
+        elif 32 <= byte < 127:
+            out.append(chr(byte))
+        else:
+            out.append(f"\\{byte:03o}")
+    return "(" + "".join(out) + ")"
+
+def _pdf_color(color, operator):
+    return f"{color[0] / 255:.3f} {color[1] / 255:.3f} {color[2] / 255:.3f} {operator}"
+
+class VectorPdf:
+    """
+    Multi-page PDF of vector notices. Text stays text, and each font and logo is
+    added once per document however many pages use it, so a batch costs a few
+    kilobytes per page. Lines with characters outside WinAnsi are the exception:
+    they are drawn as images (see _text_image) rather than printed as "?".
+    """
+
+    def __init__(self, fp, dpi=PRINT_DPI):
+        from pdf import PdfWriter
+
+        self.writer = PdfWriter(fp, dpi=dpi)
+        self.scale = 72 / dpi
+        self._fonts = {}
+        self._images = {}
+
+    def _font(self, font):
+        key = (font.path, font.getname())
+        if key not in self._fonts:
+            self._fonts[key] = self.writer.add_font(font)
+        return self._fonts[key]
+
+    def _text_image(self, text, font, color):
+        """
+        Draws text that WinAnsi can't encode (e.g. "Łukasz") with Pillow, as the
+        raster notice does, and adds it as an image masked by the glyphs. Returns
+        (image_id, left, top, width, height) relative to where the text is placed,
+        or None if nothing is drawn.
+        """
+        from PIL import Image, ImageDraw
+
+        left, top, right, bottom = font.getbbox(text)
+        if right <= left or bottom <= top:
+            return None
+        mask = Image.new("L", (right - left, bottom - top), 0)
+        ImageDraw.Draw(mask).text((-left, -top), text, font=font, fill=255)
+        image_id = self.writer.add_image(Image.new("RGB", mask.size, color), mask=mask)
+        return image_id, left, top, mask.width, mask.height
+
+    def _image(self, logo):
+        # Keyed by the logo's identity; the reference kept here stops the id being reused
+        entry = self._images.get(id(logo[0]))
+        if entry is None:
+            rgb, mask = logo
+            entry = self._images[id(logo[0])] = (logo, self.writer.add_image(rgb, mask=mask))
+        return entry[1]
+
+    def add_page(self, canvas):
+        """
+        Adds a page drawn from a VectorCanvas.
+        """
+        scale = self.scale
+        page_h = canvas.size[1] * scale
+        fonts, images = [], []
+        content = []
+
+        for op in canvas.ops:
+            kind = op[0]
+            if kind == "text":
+                _, x, y, text, color, font = op
+                if not _winansi(text):
+                    # Kept as pixels rather than garbled: the fonts aren't embedded, so
+                    # text outside WinAnsi has no glyphs to refer to
+                    placed = self._text_image(text, font, color)
+                    if placed is not None:
+                        image_id, left, top, w, h = placed
+                        images.append(image_id)
+                        content.append(
+                            f"q {w * scale:.3f} 0 0 {h * scale:.3f} {(x + left) * scale:.3f} "
+                            f"{page_h - (y + top + h) * scale:.3f} cm /Im{len(images) - 1} Do Q"
+                        )
+                    continue
+                font_id = self._font(font)
+                if font_id not in fonts:
+                    fonts.append(font_id)
+                # Pillow places text by its ascender line; PDF by the baseline
+                baseline = page_h - (y + font.getmetrics()[0]) * scale
+                content.append(
+                    f"{_pdf_color(color, 'rg')} BT /F{fonts.index(font_id)} {font.size * scale:.3f} Tf "
+                    f"{x * scale:.3f} {baseline:.3f} Td {_pdf_string(text)} Tj ET"
+                )
+            elif kind == "rect":
+                _, x0, y0, x1, y1, fill, outline = op
+                # Pillow's rectangle covers both corner pixels
+                box = f"{x0 * scale:.3f} {page_h - (y1 + 1) * scale:.3f} {(x1 - x0 + 1) * scale:.3f} {(y1 - y0 + 1) * scale:.3f} re"
+                if fill is not None:
+                    content.append(f"{_pdf_color(fill, 'rg')} {box} f")
+                if outline is not None:
+                    inset = (f"{(x0 + 0.5) * scale:.3f} {page_h - (y1 + 0.5) * scale:.3f} "
+                             f"{(x1 - x0) * scale:.3f} {(y1 - y0) * scale:.3f} re")
+                    content.append(f"{_pdf_color(outline, 'RG')} {scale:.3f} w {inset} S")
+            elif kind == "line":
+                _, x0, y0, x1, y1, color, width = op
+                content.append(
+                    f"{_pdf_color(color, 'RG')} {width * scale:.3f} w "
+                    f"{x0 * scale:.3f} {page_h - (y0 + 0.5) * scale:.3f} m "
+                    f"{(x1 + 1) * scale:.3f} {page_h - (y1 + 0.5) * scale:.3f} l S"
+                )
+            elif kind == "image":
+                _, x, y, logo = op
+                image_id = self._image(logo)
+                if image_id not in images:
+                    images.append(image_id)
+                w, h = logo[0].size
+                content.append(
+                    f"q {w * scale:.3f} 0 0 {h * scale:.3f} {x * scale:.3f} {page_h - (y + h) * scale:.3f} cm "
+                    f"/Im{images.index(image_id)} Do Q"
+                )
+
+        return self.writer.add_content_page(
+            (canvas.size[0] * scale, page_h), "\n".join(content).encode("ascii"), images=images, fonts=fonts
+        )
+
+    def close(self):
+        self.writer.close()
+
+def _svg_color(color):
+    return "#%02x%02x%02x" % color
+
+def write_svg(canvas, fp, dpi=PRINT_DPI):
+    """
+    Writes a VectorCanvas to the binary file fp as an SVG document sized to print
+    at dpi. Text is left to the viewer's copy of the font; the logo is embedded as a PNG.
+    """
+    width, height = canvas.size
+    styles = {}
+    body = []
+    for op in canvas.ops:
+        kind = op[0]
+        if kind == "text":
+            _, x, y, text, color, font = op
+            family, _ = font.getname()
+            style = (family, font.size)
+            if style not in styles:
+                styles[style] = f"f{len(styles)}"
+            ascent = font.getmetrics()[0]
+            body.append(
+                f'<text class="{styles[style]}" x="{x}" y="{y + ascent}" fill="{_svg_color(color)}">{escape(text)}</text>'
+            )
+        elif kind == "rect":
+            _, x0, y0, x1, y1, fill, outline = op
+            if fill is not None:
+                body.append(
+                    f'<rect x="{x0}" y="{y0}" width="{x1 - x0 + 1}" height="{y1 - y0 + 1}" fill="{_svg_color(fill)}"/>'
+                )
+            if outline is not None:
+                body.append(
+                    f'<rect x="{x0 + 0.5}" y="{y0 + 0.5}" width="{x1 - x0}" height="{y1 - y0}" fill="none" '
+                    f'stroke="{_svg_color(outline)}" stroke-width="1"/>'
+                )
+        elif kind == "line":
+            _, x0, y0, x1, y1, color, line_width = op
+            body.append(
+                f'<line x1="{x0}" y1="{y0 + 0.5}" x2="{x1 + 1}" y2="{y1 + 0.5}" '
+                f'stroke="{_svg_color(color)}" stroke-width="{line_width}"/>'
+            )
+        elif kind == "image":
+            _, x, y, (rgb, mask) = op
+            logo = rgb.copy()
+            logo.putalpha(mask)
+            png = BytesIO()
+            logo.save(png, "PNG", optimize=True)
+            href = "data:image/png;base64," + base64.b64encode(png.getvalue()).decode("ascii")
+            body.append(f'<image x="{x}" y="{y}" width="{rgb.width}" height="{rgb.height}" xlink:href="{href}"/>')
+
+    css = " ".join(
+        f".{name} {{ font-family: {quoteattr(family)}, serif; font-size: {size}px }}"
+        for (family, size), name in styles.items()
+    )
+    fp.write((
+        f'<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" xml:space="preserve" '
+        f'width="{width / dpi * 25.4:.2f}mm" height="{height / dpi * 25.4:.2f}mm" viewBox="0 0 {width} {height}">\n'
+        f'<style>{css}</style>\n'
+        f'<rect width="{width}" height="{height}" fill="#ffffff"/>\n'
+        + "\n".join(body) + "\n</svg>\n"
+    ).encode("utf-8"))
+
+def write_vector(canvas, fp, vector_format="pdf"):
+    """
+    Writes a VectorCanvas to the binary file fp as a single-page PDF or an SVG.
+    """
+    if check_vector_format(vector_format) == "svg":
+        write_svg(canvas, fp)
+        return
+    document = VectorPdf(fp)
+    document.add_page(canvas)
+    document.close()
+
+def encode_vector(canvas, vector_format="pdf"):
+    """
+    Returns a VectorCanvas written as PDF or SVG bytes.
+    """
+    out = BytesIO()
+    write_vector(canvas, out, vector_format)
+    return out.getvalue()